@@ -0,0 +1,227 @@
+"""
+TV Capability Probe Module
+
+Works out which control transport a TV supports by checking the ports and
+APIs it actually exposes, instead of guessing from the model string. The
+result is cached per device so later invocations pick the right transport
+on the first attempt.
+"""
+
+import errno
+import json
+import logging
+import os
+import selectors
+import socket
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Set
+
+from helpers import httppool, tvinfo
+
+
+# Port of the legacy (pre-2014) remote control protocol
+LEGACY_PORT = 55000
+
+# Port of the websocket remote and the REST info endpoint on newer TVs
+WEBSOCKET_PORT = 8001
+
+# REST endpoint answered by TVs with the websocket remote API
+REST_PATH = '/api/v2/'
+
+# Time allowed for the whole probe in seconds
+PROBE_TIMEOUT = 1.0
+
+DEFAULT_PATH = Path(os.environ.get(
+    'SAMSUNG_REMOTE_CAPS_CACHE',
+    Path.home() / '.cache' / 'samsung_remote' / 'capabilities.json'
+))
+
+CACHE_VERSION = 1
+
+# Seconds a probe result is trusted (a TV's transport does not change, but
+# the address may be handed to another TV)
+DEFAULT_MAX_AGE = 7 * 24 * 3600
+
+
+def open_ports(host: str, ports: Iterable[int], timeout: float = PROBE_TIMEOUT) -> Set[int]:
+    """
+    Check which TCP ports accept connections, connecting to all in parallel.
+
+    Args:
+        host: TV IP address
+        ports: Ports to try
+        timeout: Time to wait for all connections in seconds
+
+    Returns:
+        Set of ports that accepted a connection within the timeout
+    """
+    selector = selectors.DefaultSelector()
+    found: Set[int] = set()
+    try:
+        for port in ports:
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.setblocking(False)
+            result = sock.connect_ex((host, port))
+            if result == 0:
+                found.add(port)
+                sock.close()
+            elif result in (errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN):
+                selector.register(sock, selectors.EVENT_WRITE, port)
+            else:
+                sock.close()
+
+        deadline = time.monotonic() + timeout
+        while selector.get_map():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            for key, _ in selector.select(remaining):
+                sock = key.fileobj
+                if sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR) == 0:
+                    found.add(key.data)
+                selector.unregister(sock)
+                sock.close()
+    finally:
+        for key in list(selector.get_map().values()):
+            key.fileobj.close()
+        selector.close()
+    return found
+
+
+def has_rest_api(host: str, timeout: float = PROBE_TIMEOUT) -> bool:
+    """Return True if the TV answers the REST info endpoint on WEBSOCKET_PORT."""
+    url = f'http://{host}:{WEBSOCKET_PORT}{REST_PATH}'
+    try:
+        with httppool.urlopen(url, timeout=timeout) as response:
+            return response.status == 200
+    except Exception:
+        return False
+
+
+def probe(host: str, timeout: float = PROBE_TIMEOUT) -> Optional[str]:
+    """
+    Determine the control method a TV supports.
+
+    Args:
+        host: TV IP address
+        timeout: Time allowed for the probe in seconds
+
+    Returns:
+        'websocket' if the REST endpoint answers (or only port 8001 is open),
+        'legacy' if only port 55000 is open, None if the TV did not answer
+    """
+    logger = logging.getLogger(__name__)
+
+    ports = open_ports(host, (WEBSOCKET_PORT, LEGACY_PORT), timeout)
+    if WEBSOCKET_PORT in ports and (LEGACY_PORT not in ports or has_rest_api(host, timeout)):
+        method = 'websocket'
+    elif LEGACY_PORT in ports:
+        method = 'legacy'
+    else:
+        method = None
+
+    logger.debug(f"Probed {host}: open ports {sorted(ports)}, method {method}")
+    return method
+
+
+def _read(path: Path) -> Dict[str, Dict]:
+    logger = logging.getLogger(__name__)
+
+    try:
+        with open(path, encoding='utf-8') as cache_file:
+            data = json.load(cache_file)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable capability cache {path}: {e}")
+        return {}
+
+    if not isinstance(data, dict) or data.get('version') != CACHE_VERSION:
+        return {}
+
+    now = time.time()
+    return {
+        host: entry for host, entry in data.get('hosts', {}).items()
+        if isinstance(entry, dict) and entry.get('method') and entry.get('expires', 0) > now
+    }
+
+
+def _write(hosts: Dict[str, Dict], path: Path) -> None:
+    logger = logging.getLogger(__name__)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Atomic replace, see ssdpcache.store
+        fd, tmp_name = tempfile.mkstemp(dir=str(path.parent), prefix='.caps-')
+        with os.fdopen(fd, 'w', encoding='utf-8') as tmp_file:
+            json.dump({'version': CACHE_VERSION, 'hosts': hosts}, tmp_file)
+        os.replace(tmp_name, path)
+    except OSError as e:
+        logger.warning(f"Failed to write capability cache {path}: {e}")
+
+
+def load(path: Optional[Path] = None) -> Dict[str, str]:
+    """
+    Load unexpired probe results.
+
+    Args:
+        path: Cache file path (defaults to DEFAULT_PATH)
+
+    Returns:
+        Dictionary mapping host to method
+    """
+    return {host: entry['method'] for host, entry in _read(Path(path or DEFAULT_PATH)).items()}
+
+
+def remember(host: str, method: str, path: Optional[Path] = None) -> None:
+    """Store the probe result for a host."""
+    path = Path(path or DEFAULT_PATH)
+    hosts = _read(path)
+    hosts[host] = {'method': method, 'expires': time.time() + DEFAULT_MAX_AGE}
+    _write(hosts, path)
+
+
+def forget(host: str, path: Optional[Path] = None) -> None:
+    """Drop the cached result for a host, e.g. after a failed send."""
+    path = Path(path or DEFAULT_PATH)
+    hosts = _read(path)
+    if hosts.pop(host, None) is not None:
+        _write(hosts, path)
+
+
+def detect(host: str, model: str = '', use_cache: bool = True,
+           timeout: float = PROBE_TIMEOUT, path: Optional[Path] = None) -> str:
+    """
+    Choose the control method for a TV.
+
+    The cached probe result is used if there is one; otherwise the TV is
+    probed and the result cached. If the TV does not answer the probe the
+    method is guessed from the model string with tvinfo.getMethod.
+
+    Args:
+        host: TV IP address
+        model: TV model string, used only as a fallback
+        use_cache: Consult and update the capability cache
+        timeout: Time allowed for the probe in seconds
+        path: Cache file path (defaults to DEFAULT_PATH)
+
+    Returns:
+        'legacy' or 'websocket'
+    """
+    logger = logging.getLogger(__name__)
+
+    if use_cache:
+        method = load(path).get(host)
+        if method:
+            logger.debug(f"Using cached method {method} for {host}")
+            return method
+
+    method = probe(host, timeout)
+    if method is None:
+        logger.debug(f"No answer from {host}, guessing method from model {model}")
+        return tvinfo.getMethod(model)
+
+    if use_cache:
+        remember(host, method, path)
+    return method
@@ -0,0 +1,207 @@
+"""
+Daemon Client Module
+
+Forwards command line requests to a running daemon. This module must stay
+cheap to import: it only uses the standard library so that a CLI call
+handled by the daemon costs little more than a socket round trip.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+DEFAULT_SOCKET = Path(os.environ.get(
+    'SAMSUNG_REMOTE_SOCKET',
+    Path.home() / '.cache' / 'samsung_remote' / 'daemon.sock'
+))
+
+# Options that make the CLI do something the daemon does not handle
+_LOCAL_ONLY = ('daemon', 'lint', 'sweep', 'no_cache')
+
+# Seconds a daemon has to answer the liveness check before the command
+# runs in-process instead
+PING_TIMEOUT = 2.0
+
+# Seconds a daemon has to answer a request other than a macro
+REQUEST_TIMEOUT = 30.0
+
+
+def request(message: Dict[str, Any], path: Optional[Path] = None,
+            timeout: Optional[float] = 30.0) -> Dict[str, Any]:
+    """
+    Send one request to the daemon and return its reply.
+
+    Args:
+        message: Request dictionary, e.g. {'op': 'send', 'key': 'KEY_MUTE'}
+        path: Socket path (defaults to DEFAULT_SOCKET)
+        timeout: Socket timeout in seconds
+
+    Raises:
+        OSError: If the daemon cannot be reached
+        ValueError: If the reply is not valid JSON
+    """
+    with Connection(path, timeout) as connection:
+        return connection.request(message)
+
+
+class Connection:
+    """A connection to the daemon that can carry several requests."""
+
+    def __init__(self, path: Optional[Path] = None, timeout: Optional[float] = 30.0):
+        """
+        Raises:
+            OSError: If the daemon cannot be reached
+        """
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        try:
+            self._sock.connect(str(path or DEFAULT_SOCKET))
+        except OSError:
+            self._sock.close()
+            raise
+        self._replies = self._sock.makefile('rb')
+
+    def settimeout(self, timeout: Optional[float]) -> None:
+        """Change the socket timeout used by later requests."""
+        self._sock.settimeout(timeout)
+
+    def request(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Send a request and wait for its reply."""
+        self._sock.sendall(json.dumps(message).encode('utf-8') + b'\n')
+        line = self._replies.readline()
+        if not line:
+            raise ConnectionError('daemon closed the connection')
+        return json.loads(line)
+
+    def close(self) -> None:
+        self._replies.close()
+        self._sock.close()
+
+    def __enter__(self) -> 'Connection':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class _QuietParser(argparse.ArgumentParser):
+    """Parser that leaves error reporting to the full CLI parser."""
+
+    def error(self, message):
+        raise ValueError(message)
+
+
+def _parse(argv: List[str]) -> Optional[argparse.Namespace]:
+    # Mirrors the options of samsung_remote.parse_arguments that the daemon
+    # can serve; anything else is left to the full parser
+    parser = _QuietParser(add_help=False)
+    tv_group = parser.add_mutually_exclusive_group()
+    tv_group.add_argument('-a', '--auto', action='store_true')
+    tv_group.add_argument('-i', '--ip')
+    parser.add_argument('-k', '--key')
+    parser.add_argument('-l', '--legacy', action='store_true')
+    parser.add_argument('-m', '--macro')
+    parser.add_argument('-p', '--power-off-all', action='store_true')
+    parser.add_argument('-q', '--quiet', action='store_true')
+    parser.add_argument('-s', '--scan', action='store_true')
+    parser.add_argument('--socket', default=str(DEFAULT_SOCKET))
+    parser.add_argument('--daemon', action='store_true')
+    parser.add_argument('--lint')
+    parser.add_argument('--sweep', action='append')
+    parser.add_argument('--no-cache', action='store_true')
+
+    try:
+        args, unknown = parser.parse_known_args(argv)
+    except ValueError:
+        return None
+    if unknown or any(getattr(args, option) for option in _LOCAL_ONLY):
+        return None
+    if not (args.key or args.macro or args.power_off_all or args.scan):
+        return None
+    # Without -i or -a the in-process CLI has no target for -k and -m, while
+    # the daemon would pick the first TV; keep the in-process behaviour
+    if (args.key or args.macro) and not (args.ip or args.auto):
+        return None
+    return args
+
+
+def _requests(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    """Translate parsed options into daemon requests, in CLI execution order."""
+    if args.scan:
+        return [{'op': 'scan'}]
+
+    target: Dict[str, Any] = {}
+    if args.ip:
+        # The in-process CLI does not probe a TV given with -i
+        target['host'] = args.ip
+        target['method'] = 'websocket'
+    if args.legacy:
+        target['method'] = 'legacy'
+
+    messages: List[Dict[str, Any]] = []
+    if args.power_off_all:
+        messages.append({'op': 'power_off_all'})
+    if args.key:
+        messages.append(dict(target, op='send', key=args.key))
+    if args.macro:
+        # The daemon may run from another directory
+        messages.append(dict(target, op='macro', file=str(Path(args.macro).resolve())))
+    return messages
+
+
+def forward(argv: List[str]) -> Optional[int]:
+    """
+    Run a command line through the daemon if one is listening.
+
+    Args:
+        argv: Command line arguments without the program name
+
+    Returns:
+        Exit status, or None if the command must run in-process (no daemon
+        listening, or options the daemon does not handle)
+    """
+    args = _parse(argv)
+    if args is None or not hasattr(socket, 'AF_UNIX'):
+        return None
+
+    try:
+        connection = Connection(Path(args.socket), timeout=PING_TIMEOUT)
+    except OSError:
+        return None
+    try:
+        # A wedged daemon must not hang the command
+        connection.request({'op': 'ping'})
+    except (OSError, ValueError):
+        connection.close()
+        return None
+
+    def report(message: str, error: bool = False) -> None:
+        if error or not args.quiet:
+            print(message, file=sys.stderr if error else sys.stdout)
+
+    status = 0
+    with connection:
+        for message in _requests(args):
+            # No timeout for macros: they may legitimately run for minutes
+            connection.settimeout(None if message['op'] == 'macro' else REQUEST_TIMEOUT)
+            try:
+                reply = connection.request(message)
+            except (OSError, ValueError) as e:
+                report(f"Daemon request failed: {e}", error=True)
+                return 1
+
+            if not reply.get('ok'):
+                report(f"Error: {reply.get('error', 'request failed')}", error=True)
+                status = 1
+            for tv in reply.get('tvs', []):
+                report(f"Found: {tv['fn']} ({tv['model']}) at {tv['ip']}")
+            for host, ok in reply.get('results', {}).items():
+                report(f"{'Turned off' if ok else 'Failed to turn off'} {host}", error=not ok)
+            if message['op'] == 'scan' and not reply.get('tvs') and reply.get('ok'):
+                report('No Samsung TVs found in the network')
+    return status
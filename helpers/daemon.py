@@ -0,0 +1,161 @@
+"""
+Daemon Module
+
+Serves RemoteService requests over a Unix domain socket, so discovery
+results, caches and TV connections stay warm between commands.
+
+The protocol is one JSON object per line in each direction; a client may
+send several requests over one connection.
+"""
+
+import json
+import logging
+import os
+import signal
+import socket
+import socketserver
+import threading
+from pathlib import Path
+from typing import Optional, Tuple
+
+from helpers import httpapi
+from helpers.client import DEFAULT_SOCKET, request  # noqa: F401 (re-exported)
+from helpers.service import RemoteService
+
+# Longest request line accepted from a client
+MAX_REQUEST = 64 * 1024
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def handle(self) -> None:
+        logger = logging.getLogger(__name__)
+
+        for line in iter(lambda: self.rfile.readline(MAX_REQUEST + 1), b''):
+            if len(line) > MAX_REQUEST:
+                reply = {'ok': False, 'error': 'request too long'}
+            else:
+                try:
+                    request = json.loads(line)
+                except ValueError as e:
+                    reply = {'ok': False, 'error': f'invalid JSON: {e}'}
+                else:
+                    if isinstance(request, dict):
+                        reply = self.server.service.handle(request)
+                    else:
+                        reply = {'ok': False, 'error': 'request must be a JSON object'}
+                logger.debug(f"Daemon request {line.strip()[:200]!r} -> {reply.get('ok')}")
+            self.wfile.write(json.dumps(reply).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Threaded Unix socket server dispatching to a RemoteService."""
+    daemon_threads = True
+
+    def __init__(self, path: Path, service: RemoteService):
+        self.service = service
+        super().__init__(str(path), _Handler)
+
+
+def is_running(path: Optional[Path] = None) -> bool:
+    """Return True if a daemon is accepting connections on the socket."""
+    path = Path(path or DEFAULT_SOCKET)
+    if not hasattr(socket, 'AF_UNIX') or not path.exists():
+        return False
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(str(path))
+        return True
+    except OSError:
+        return False
+    finally:
+        sock.close()
+
+
+def start(service: RemoteService, path: Optional[Path] = None) -> DaemonServer:
+    """
+    Bind the daemon socket and serve requests in a background thread.
+
+    A stale socket file left by a crashed daemon is replaced; a live one is
+    an error.
+
+    Args:
+        service: Service that executes the requests
+        path: Socket path (defaults to DEFAULT_SOCKET)
+
+    Returns:
+        The running server; call shutdown() and server_close() to stop it
+
+    Raises:
+        RuntimeError: If another daemon is already listening on the socket
+        OSError: If the socket cannot be created
+    """
+    path = Path(path or DEFAULT_SOCKET)
+    if is_running(path):
+        raise RuntimeError(f'A daemon is already running on {path}')
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
+
+    # Only the owner may send commands to the TVs
+    old_umask = os.umask(0o177)
+    try:
+        server = DaemonServer(path, service)
+    finally:
+        os.umask(old_umask)
+
+    threading.Thread(target=server.serve_forever, name='samsung-remote-daemon', daemon=True).start()
+    return server
+
+
+def run(path: Optional[Path] = None, name: str = 'python remote', use_cache: bool = True,
+        http: Optional[Tuple[str, int]] = None, macro_dir: Optional[Path] = None) -> None:
+    """
+    Run the daemon in the foreground until SIGINT or SIGTERM.
+
+    Args:
+        path: Socket path (defaults to DEFAULT_SOCKET)
+        name: Remote name shown by the TV when pairing
+        use_cache: Use the on-disk discovery caches
+        http: Also serve the HTTP API on this (host, port)
+        macro_dir: Directory HTTP /macro requests are limited to
+    """
+    logger = logging.getLogger(__name__)
+    path = Path(path or DEFAULT_SOCKET)
+
+    service = RemoteService(name=name, use_cache=use_cache)
+    server = start(service, path)
+    try:
+        api = httpapi.start(service, http, macro_dir) if http else None
+    except OSError:
+        server.shutdown()
+        server.server_close()
+        path.unlink()
+        raise
+    service.start()
+    logger.info(f'Daemon listening on {path}')
+
+    stop = threading.Event()
+    previous = signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        # Warm the registry and description cache before the first command
+        service.tvs()
+        stop.wait()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, previous)
+        if api is not None:
+            api.shutdown()
+            api.server_close()
+        server.shutdown()
+        server.server_close()
+        service.close()
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            pass
+        logger.info('Daemon stopped')
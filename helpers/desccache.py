@@ -0,0 +1,239 @@
+"""
+Device Description Cache Module
+
+Keeps the parsed UPnP device descriptions (friendly name, model) so repeat
+scans do not download and parse the description XML again. Entries live in
+a bounded in-memory LRU and are shared across processes through a JSON file.
+Once an entry is older than its max-age it is revalidated with a
+conditional GET (If-None-Match / If-Modified-Since) where the TV supports it.
+"""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Dict, Optional
+
+
+DEFAULT_PATH = Path(os.environ.get(
+    'SAMSUNG_REMOTE_DESC_CACHE',
+    Path.home() / '.cache' / 'samsung_remote' / 'descriptions.json'
+))
+
+CACHE_VERSION = 1
+
+# Maximum number of descriptions kept in memory
+DEFAULT_SIZE = 256
+
+# Seconds a description is trusted without contacting the TV, used when the
+# TV does not send a cache-control max-age of its own
+DEFAULT_MAX_AGE = 3600
+
+
+@dataclass
+class CachedDescription:
+    """A parsed device description and its HTTP validators."""
+    info: Dict[str, str]
+    usn: str = ''
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    expires: float = 0.0
+
+    @property
+    def is_fresh(self) -> bool:
+        return time.time() < self.expires
+
+    @property
+    def validators(self) -> Dict[str, str]:
+        """Request headers for a conditional GET of this description."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class DescriptionCache:
+    """
+    Thread-safe LRU of device descriptions keyed by description location.
+
+    The location is the key because the cached info includes the TV's IP;
+    the USN is stored alongside and a lookup with a different USN (another
+    device now answering at that address) is treated as a miss.
+
+    Example:
+        cache = DescriptionCache()
+        info = tvinfo.get(url, cache=cache)
+        cache.save()
+    """
+
+    def __init__(self, path: Optional[Path] = None, size: int = DEFAULT_SIZE):
+        """
+        Args:
+            path: Cache file path (defaults to DEFAULT_PATH)
+            size: Maximum number of descriptions kept in memory
+        """
+        self.path = Path(path or DEFAULT_PATH)
+        self.size = size
+        self._entries: 'OrderedDict[str, CachedDescription]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._dirty = False
+
+    def _read_file(self) -> Dict[str, CachedDescription]:
+        logger = logging.getLogger(__name__)
+
+        try:
+            with open(self.path, encoding='utf-8') as cache_file:
+                data = json.load(cache_file)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable description cache {self.path}: {e}")
+            return {}
+
+        if not isinstance(data, dict) or data.get('version') != CACHE_VERSION:
+            logger.debug(f"Ignoring description cache {self.path} with unknown format")
+            return {}
+
+        entries = {}
+        for location, entry in data.get('descriptions', {}).items():
+            try:
+                entries[location] = CachedDescription(**entry)
+            except TypeError:
+                continue
+        return entries
+
+    def _ensure_loaded(self) -> None:
+        # Caller holds the lock
+        if self._loaded:
+            return
+        self._loaded = True
+        for location, entry in self._read_file().items():
+            self._entries.setdefault(location, entry)
+        self._trim()
+
+    def _trim(self) -> None:
+        while len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+
+    def get(self, location: str, usn: Optional[str] = None) -> Optional[CachedDescription]:
+        """
+        Look up a description, fresh or stale.
+
+        Args:
+            location: Description URL
+            usn: USN of the device now at that location, if known
+
+        Returns:
+            The cached entry, or None on a miss or USN mismatch
+        """
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._entries.get(location)
+            if entry is None:
+                return None
+            if usn and entry.usn and usn != entry.usn:
+                return None
+            self._entries.move_to_end(location)
+            return entry
+
+    def put(self, location: str, info: Dict[str, str], usn: Optional[str] = None,
+            etag: Optional[str] = None, last_modified: Optional[str] = None,
+            max_age: int = DEFAULT_MAX_AGE) -> None:
+        """Store a freshly downloaded description."""
+        entry = CachedDescription(
+            info=dict(info),
+            usn=usn or '',
+            etag=etag,
+            last_modified=last_modified,
+            expires=time.time() + max_age
+        )
+        with self._lock:
+            self._ensure_loaded()
+            self._entries[location] = entry
+            self._entries.move_to_end(location)
+            self._trim()
+            self._dirty = True
+
+    def refresh(self, location: str, max_age: int = DEFAULT_MAX_AGE) -> None:
+        """Extend an entry after the TV answered 304 Not Modified."""
+        with self._lock:
+            entry = self._entries.get(location)
+            if entry is not None:
+                entry.expires = time.time() + max_age
+                self._dirty = True
+
+    def save(self) -> bool:
+        """
+        Merge the in-memory entries into the cache file.
+
+        Entries written by other processes are kept unless this process has
+        a newer entry for the same location.
+
+        Returns:
+            True if the file was written
+        """
+        logger = logging.getLogger(__name__)
+
+        with self._lock:
+            if not self._dirty:
+                return False
+            merged = self._read_file()
+            for location, entry in self._entries.items():
+                current = merged.get(location)
+                if current is None or current.expires <= entry.expires:
+                    merged[location] = entry
+            self._dirty = False
+
+        data = {
+            'version': CACHE_VERSION,
+            'descriptions': {location: asdict(entry) for location, entry in merged.items()}
+        }
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_name = tempfile.mkstemp(dir=str(self.path.parent), prefix='.desc-')
+            with os.fdopen(fd, 'w', encoding='utf-8') as tmp_file:
+                json.dump(data, tmp_file)
+            os.replace(tmp_name, self.path)
+        except OSError as e:
+            logger.warning(f"Failed to write description cache {self.path}: {e}")
+            return False
+
+        logger.debug(f"Stored {len(merged)} descriptions in {self.path}")
+        return True
+
+    def clear(self) -> None:
+        """Drop all entries from memory and disk."""
+        with self._lock:
+            self._entries.clear()
+            self._loaded = True
+            self._dirty = False
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._ensure_loaded()
+            return len(self._entries)
+
+
+_shared: Optional[DescriptionCache] = None
+_shared_lock = threading.Lock()
+
+
+def shared() -> DescriptionCache:
+    """Return the process-wide cache backed by DEFAULT_PATH."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            _shared = DescriptionCache()
+        return _shared
@@ -0,0 +1,252 @@
+"""
+HTTP API Module
+
+Embedded HTTP/JSON control API backed by a RemoteService, for dashboards
+and other clients that issue many requests and cannot spawn a CLI process
+for each one.
+
+Endpoints (request and response bodies are JSON objects):
+    GET  /tvs        Known TVs, optionally ?series=F&subnet=10.1.0.0/24
+    GET  /metrics    Counters and latencies in the Prometheus text format
+    POST /scan       {"wait": 1.0}
+    POST /send       {"key": "KEY_MUTE", "host": "192.168.1.100"}
+    POST /send_many  {"keys": ["KEY_VOLUP", "KEY_VOLUP"], "host": ...}
+    POST /macro      {"file": "/path/to/macro.csv", "host": ...}
+    POST /batch      {"commands": [{"host": ..., "keys": [...]}, ...]}
+
+"host" and "method" are optional everywhere; without a host the first TV
+found is used. Replies carry "ok" and, on failure, "error". Malformed
+requests get 400, failed TV commands 502.
+
+POST requests must be sent with "Content-Type: application/json" (which
+browsers cannot send cross-origin without a CORS preflight, never answered
+here) and a Host header naming the bound address, so web pages cannot
+drive the API through DNS rebinding.
+
+Macro files are read on the server: "file" is resolved inside the macro
+directory, and /macro is refused if the API has none.
+"""
+
+import ipaddress
+import json
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from helpers import metrics
+from helpers.service import RemoteService
+
+
+DEFAULT_ADDRESS = ('127.0.0.1', 8765)
+
+# Largest request body accepted in bytes
+MAX_BODY = 1024 * 1024
+
+_POST_OPS = frozenset(['scan', 'send', 'send_many', 'macro', 'batch', 'power_off_all'])
+_GET_OPS = frozenset(['tvs', 'ping'])
+
+# Query parameters passed through to GET requests
+_FILTERS = ('series', 'subnet')
+
+
+def parse_address(value: str) -> Tuple[str, int]:
+    """
+    Parse '[HOST:]PORT' into a bind address.
+
+    Raises:
+        ValueError: If the port is not a number between 0 and 65535
+    """
+    host, _, port = value.rpartition(':')
+    port_number = int(port)
+    if not 0 <= port_number <= 65535:
+        raise ValueError(f'port out of range: {port_number}')
+    return (host or DEFAULT_ADDRESS[0], port_number)
+
+
+def is_loopback(host: str) -> bool:
+    """Return True if a bind address only accepts local connections."""
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def host_allowed(header: Optional[str], address: Tuple[str, int]) -> bool:
+    """
+    Check a request's Host header against the address the API is bound to.
+
+    The host must be the bound IP address (any IP address on a wildcard
+    bind) or 'localhost' on a loopback or wildcard bind, and the port must
+    be the bound port. Other names are refused, as DNS rebinding relies on
+    them.
+
+    Args:
+        header: Host header value (e.g., '127.0.0.1:8765'), may be None
+        address: (host, port) the server is bound to
+    """
+    if not header:
+        return False
+    try:
+        parts = urlsplit('//' + header)
+        hostname, port = parts.hostname, parts.port
+    except ValueError:
+        return False
+    if not hostname or port != address[1]:
+        return False
+
+    bound = address[0]
+    try:
+        wildcard = ipaddress.ip_address(bound).is_unspecified
+    except ValueError:
+        wildcard = not bound
+    if hostname == 'localhost':
+        return wildcard or is_loopback(bound)
+    try:
+        ip = ipaddress.ip_address(hostname)
+    except ValueError:
+        return False
+    return wildcard or ip == ipaddress.ip_address(bound)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # Keep-alive, so a dashboard can reuse one connection for many requests
+    protocol_version = 'HTTP/1.1'
+    server_version = 'samsung-remote'
+
+    def _reply(self, status: int, body: Dict[str, Any]) -> None:
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _op(self, allowed) -> str:
+        op = self.path.split('?', 1)[0].strip('/')
+        return op if op in allowed else ''
+
+    def _execute(self, request: Dict[str, Any]) -> None:
+        reply = self.server.service.handle(request)
+        if reply.get('ok'):
+            status = 200
+        elif reply.get('invalid'):
+            status = 400
+        else:
+            # The request was valid but a TV failed or could not be found
+            status = 502
+        self._reply(status, reply)
+
+    def _macro_file(self, name: Any) -> Optional[str]:
+        """Return the macro path to run, or reply with an error and return None."""
+        macro_dir = self.server.macro_dir
+        if macro_dir is None:
+            self._reply(403, {'ok': False, 'error': 'macros are disabled without a macro directory'})
+            return None
+        if not isinstance(name, str) or not name:
+            self._reply(400, {'ok': False, 'error': 'file must be a non-empty string', 'invalid': True})
+            return None
+        path = (macro_dir / name).resolve()
+        try:
+            path.relative_to(macro_dir)
+        except ValueError:
+            self._reply(403, {'ok': False, 'error': f'{name} is outside the macro directory'})
+            return None
+        return str(path)
+
+    def _metrics(self) -> None:
+        data = metrics.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', metrics.CONTENT_TYPE)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        if self.path.split('?', 1)[0].strip('/') == 'metrics':
+            self._metrics()
+            return
+        op = self._op(_GET_OPS)
+        if not op:
+            self._reply(404 if not self._op(_POST_OPS) else 405, {'ok': False, 'error': 'not found'})
+            return
+        query = parse_qs(urlsplit(self.path).query)
+        request = {name: query[name][-1] for name in _FILTERS if name in query}
+        self._execute(dict(request, op=op))
+
+    def do_POST(self) -> None:
+        op = self._op(_POST_OPS)
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0 or length > MAX_BODY:
+            self.close_connection = True
+            self._reply(400, {'ok': False, 'error': 'invalid Content-Length'})
+            return
+        body = self.rfile.read(length)
+
+        if not op:
+            self._reply(404, {'ok': False, 'error': 'not found'})
+            return
+        if not host_allowed(self.headers.get('Host'), self.server.server_address[:2]):
+            self._reply(403, {'ok': False, 'error': 'Host header does not match the API address'})
+            return
+        content_type = (self.headers.get('Content-Type') or '').split(';', 1)[0].strip().lower()
+        if content_type != 'application/json':
+            self._reply(415, {'ok': False, 'error': 'Content-Type must be application/json'})
+            return
+        try:
+            request = json.loads(body) if body else {}
+        except ValueError as e:
+            self._reply(400, {'ok': False, 'error': f'invalid JSON: {e}'})
+            return
+        if not isinstance(request, dict):
+            self._reply(400, {'ok': False, 'error': 'request must be a JSON object'})
+            return
+        if op == 'macro':
+            request['file'] = self._macro_file(request.get('file'))
+            if request['file'] is None:
+                return
+        self._execute(dict(request, op=op))
+
+    def log_message(self, format: str, *args) -> None:
+        logging.getLogger(__name__).debug(f"{self.address_string()} {format % args}")
+
+
+class APIServer(ThreadingHTTPServer):
+    """Threaded HTTP server dispatching to a RemoteService."""
+    daemon_threads = True
+
+    def __init__(self, address: Tuple[str, int], service: RemoteService,
+                 macro_dir: Optional[Path] = None):
+        self.service = service
+        self.macro_dir = Path(macro_dir).resolve() if macro_dir is not None else None
+        super().__init__(address, _Handler)
+
+
+def start(service: RemoteService, address: Tuple[str, int] = DEFAULT_ADDRESS,
+          macro_dir: Optional[Path] = None) -> APIServer:
+    """
+    Serve the HTTP API in a background thread.
+
+    Args:
+        service: Service that executes the requests
+        address: (host, port) to bind; binds to localhost by default as the
+            API has no authentication
+        macro_dir: Directory /macro files are resolved in and limited to
+            (None refuses /macro)
+
+    Returns:
+        The running server; call shutdown() and server_close() to stop it
+    """
+    logger = logging.getLogger(__name__)
+
+    server = APIServer(address, service, macro_dir)
+    threading.Thread(target=server.serve_forever, name='samsung-remote-http', daemon=True).start()
+    logger.info(f'HTTP API listening on http://{server.server_address[0]}:{server.server_address[1]}/')
+    return server
@@ -0,0 +1,249 @@
+"""
+Pooled HTTP Client Module
+
+Keeps persistent (keep-alive) connections per TV host so repeated metadata
+requests, such as device descriptions and REST queries, skip the TCP
+handshake. The urlopen() function mirrors urllib.request.urlopen closely
+enough to be a drop-in replacement: it accepts a URL or a Request, follows
+redirects, returns a context-managed response and raises
+urllib.error.HTTPError/URLError.
+"""
+
+import http.client
+import logging
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from typing import Dict, List, Optional, Tuple, Union
+
+from helpers import metrics
+
+
+# Default socket timeout in seconds
+DEFAULT_TIMEOUT = 10
+
+# Idle connections kept per host
+MAX_IDLE_PER_HOST = 4
+
+# Idle connections older than this are closed instead of reused; TVs drop
+# idle keep-alive connections after a few seconds
+IDLE_TIMEOUT = 5.0
+
+# Unread body bytes drained so a connection can be reused; larger leftovers
+# close the connection instead
+DRAIN_LIMIT = 64 * 1024
+
+# Redirects followed per request, the same limit as urllib.request
+MAX_REDIRECTS = 10
+
+_Key = Tuple[str, str, int]
+
+# Errors showing that a reused connection was closed by the TV in the meantime
+_STALE_ERRORS = (http.client.RemoteDisconnected, http.client.BadStatusLine,
+                 ConnectionResetError, BrokenPipeError)
+
+_REDIRECT_CODES = frozenset([301, 302, 303, 307, 308])
+
+
+def _redirect(request: urllib.request.Request, url: str, status: int) -> urllib.request.Request:
+    """Build the request for a redirect target the way urllib.request does."""
+    method = request.get_method()
+    if status in (307, 308):
+        return urllib.request.Request(url, data=request.data, headers=dict(request.header_items()),
+                                      method=method)
+    # Other redirects turn the request into a GET without a body
+    headers = {name: value for name, value in request.header_items()
+               if name.lower() not in ('content-length', 'content-type')}
+    return urllib.request.Request(url, headers=headers, method='HEAD' if method == 'HEAD' else 'GET')
+
+
+class PooledResponse:
+    """HTTP response that hands its connection back to the pool when closed."""
+
+    def __init__(self, pool: 'HTTPPool', key: _Key, connection: http.client.HTTPConnection,
+                 response: http.client.HTTPResponse, url: str):
+        self._pool = pool
+        self._key = key
+        self._connection = connection
+        self._response = response
+        self.url = url
+        self.status = response.status
+        self.reason = response.reason
+        self.headers = response.headers
+
+    def read(self, amt: Optional[int] = None) -> bytes:
+        return self._response.read(amt)
+
+    def getcode(self) -> int:
+        return self.status
+
+    def close(self) -> None:
+        if self._connection is None:
+            return
+        connection, self._connection = self._connection, None
+        reusable = not self._response.will_close
+        if reusable and not self._response.isclosed():
+            try:
+                leftover = self._response.read(DRAIN_LIMIT + 1)
+                reusable = len(leftover) <= DRAIN_LIMIT and self._response.isclosed()
+            except (OSError, http.client.HTTPException):
+                reusable = False
+        self._response.close()
+        if reusable:
+            self._pool.release(self._key, connection)
+        else:
+            connection.close()
+
+    def __enter__(self) -> 'PooledResponse':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class HTTPPool:
+    """
+    Thread-safe pool of keep-alive connections keyed by scheme, host and port.
+
+    Example:
+        pool = HTTPPool()
+        with pool.urlopen('http://192.168.1.100:7676/smp_2_', timeout=2) as response:
+            body = response.read()
+        pool.close()
+    """
+
+    def __init__(self, max_idle_per_host: int = MAX_IDLE_PER_HOST,
+                 idle_timeout: float = IDLE_TIMEOUT):
+        """
+        Args:
+            max_idle_per_host: Idle connections kept per host
+            idle_timeout: Seconds an idle connection may be reused
+        """
+        self.max_idle_per_host = max_idle_per_host
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._idle: Dict[_Key, List[Tuple[http.client.HTTPConnection, float]]] = {}
+
+    def _acquire(self, key: _Key, timeout: float) -> Tuple[http.client.HTTPConnection, bool]:
+        now = time.monotonic()
+        with self._lock:
+            idle = self._idle.get(key, [])
+            while idle:
+                connection, released = idle.pop()
+                if now - released < self.idle_timeout:
+                    if connection.sock is not None:
+                        connection.sock.settimeout(timeout)
+                    connection.timeout = timeout
+                    return connection, True
+                connection.close()
+
+        scheme, host, port = key
+        if scheme == 'https':
+            return http.client.HTTPSConnection(host, port, timeout=timeout), False
+        return http.client.HTTPConnection(host, port, timeout=timeout), False
+
+    def release(self, key: _Key, connection: http.client.HTTPConnection) -> None:
+        """Return a connection whose response was fully read to the pool."""
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.max_idle_per_host:
+                idle.append((connection, time.monotonic()))
+                return
+        connection.close()
+
+    def urlopen(self, url: Union[str, urllib.request.Request],
+                timeout: float = DEFAULT_TIMEOUT) -> PooledResponse:
+        """
+        Send a GET (or the Request's method) over a pooled connection.
+
+        Redirects (301, 302, 303, 307 and 308) are followed up to
+        MAX_REDIRECTS times, rewriting the method as urllib.request does.
+
+        Args:
+            url: URL string or urllib.request.Request with extra headers
+            timeout: Socket timeout in seconds
+
+        Returns:
+            PooledResponse for a 2xx answer
+
+        Raises:
+            urllib.error.HTTPError: For 4xx and 5xx answers, 304, and other
+                3xx answers that cannot be followed
+            urllib.error.URLError: If the TV cannot be reached or sends an
+                invalid response
+        """
+        request = url if isinstance(url, urllib.request.Request) else urllib.request.Request(url)
+        redirects = 0
+        while True:
+            pooled = self._open(request, timeout)
+            location = pooled.headers.get('Location')
+            if pooled.status not in _REDIRECT_CODES or not location or redirects == MAX_REDIRECTS:
+                break
+            pooled.close()
+            redirects += 1
+            request = _redirect(request, urllib.parse.urljoin(pooled.url, location), pooled.status)
+
+        if not 200 <= pooled.status < 300:
+            pooled.close()
+            raise urllib.error.HTTPError(pooled.url, pooled.status, pooled.reason, pooled.headers, None)
+        return pooled
+
+    def _open(self, request: urllib.request.Request, timeout: float) -> PooledResponse:
+        """Send one request and return the response whatever its status."""
+        logger = logging.getLogger(__name__)
+
+        full_url = request.full_url
+        scheme = request.type
+        if scheme not in ('http', 'https'):
+            raise urllib.error.URLError(f'unsupported URL scheme {scheme!r}')
+        host, _, port = request.host.partition(':')
+        key = (scheme, host, int(port) if port else (443 if scheme == 'https' else 80))
+
+        path = request.selector or '/'
+        headers = dict(request.header_items())
+        method = request.get_method()
+
+        while True:
+            connection, reused = self._acquire(key, timeout)
+            try:
+                connection.request(method, path, body=request.data, headers=headers)
+                response = connection.getresponse()
+                break
+            except _STALE_ERRORS as e:
+                connection.close()
+                if not reused:
+                    raise urllib.error.URLError(e)
+                logger.debug(f"Reused connection to {host} was closed, reconnecting")
+            except (OSError, http.client.HTTPException) as e:
+                # Invalid responses (e.g. LineTooLong) leave the connection unusable
+                connection.close()
+                raise urllib.error.URLError(e)
+
+        logger.debug(f"{method} {full_url} -> {response.status} ({'reused' if reused else 'new'} connection)")
+
+        return PooledResponse(self, key, connection, response, full_url)
+
+    def close(self) -> None:
+        """Close all idle connections."""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection, _ in connections:
+                connection.close()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(connections) for connections in self._idle.values())
+
+
+_default = HTTPPool()
+
+metrics.gauge('samsung_remote_http_idle_connections',
+              'Idle keep-alive connections to TV description servers').set_function(lambda: len(_default))
+
+
+def urlopen(url: Union[str, urllib.request.Request], timeout: float = DEFAULT_TIMEOUT) -> PooledResponse:
+    """Open a URL over the process-wide connection pool (see HTTPPool.urlopen)."""
+    return _default.urlopen(url, timeout)
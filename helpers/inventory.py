@@ -0,0 +1,235 @@
+"""
+Fleet Inventory Module
+
+Named TVs and groups loaded from a JSON, TOML or YAML file, so commands
+can target known devices without network discovery.
+
+Example inventory (JSON; the TOML and YAML layouts are the same):
+    {
+        "defaults": {"method": "websocket"},
+        "tvs": {
+            "lobby-left": {"host": "10.1.0.21"},
+            "lobby-right": {"host": "10.1.0.22", "method": "legacy"},
+            "bar": {"host": "10.1.2.40", "port": 55001}
+        },
+        "groups": {
+            "lobby": ["lobby-left", "lobby-right"],
+            "ground-floor": ["lobby", "bar"]
+        }
+    }
+
+Groups may contain TV names and other groups.
+"""
+
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from helpers import tracing
+
+
+DEFAULT_PATH = Path(os.environ.get(
+    'SAMSUNG_REMOTE_INVENTORY',
+    Path.home() / '.config' / 'samsung_remote' / 'inventory.json'
+))
+
+DEFAULT_PORT = 55000
+
+# TVs controlled in parallel when a command targets a group
+DEFAULT_WORKERS = 16
+
+_METHODS = frozenset(['legacy', 'websocket'])
+
+
+@dataclass
+class Device:
+    """A TV defined in the inventory."""
+    name: str
+    host: str
+    method: Optional[str] = None
+    port: int = DEFAULT_PORT
+    model: str = ''
+
+
+def _parse(path: Path) -> Dict[str, Any]:
+    """Read an inventory file in the format given by its suffix."""
+    suffix = path.suffix.lower()
+    if suffix == '.json':
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    if suffix == '.toml':
+        try:
+            import tomllib
+        except ImportError:
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise ValueError("TOML inventories need Python 3.11 or: pip install tomli")
+        with open(path, 'rb') as f:
+            return tomllib.load(f)
+    if suffix in ('.yaml', '.yml'):
+        try:
+            import yaml
+        except ImportError:
+            raise ValueError("YAML inventories need PyYAML: pip install pyyaml")
+        with open(path, encoding='utf-8') as f:
+            return yaml.safe_load(f) or {}
+    raise ValueError(f"Unsupported inventory format '{path.suffix}' (use .json, .toml or .yaml)")
+
+
+class Inventory:
+    """
+    TVs and groups from an inventory file.
+
+    Example:
+        inventory = Inventory.load('fleet.toml')
+        for device in inventory.select(['lobby']):
+            print(device.host)
+    """
+
+    def __init__(self, devices: Dict[str, Device], groups: Dict[str, List[str]]):
+        """
+        Raises:
+            ValueError: If a group refers to an unknown name or a name is both
+                a TV and a group
+        """
+        self.devices = devices
+        self.groups = groups
+
+        for name in groups:
+            if name in devices:
+                raise ValueError(f"'{name}' is defined both as a TV and as a group")
+        for name, members in groups.items():
+            for member in members:
+                if member not in devices and member not in groups:
+                    raise ValueError(f"Group '{name}' refers to unknown TV or group '{member}'")
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Inventory':
+        """
+        Build an inventory from parsed file contents.
+
+        Raises:
+            ValueError: If the structure or a field is invalid
+        """
+        if not isinstance(data, dict):
+            raise ValueError('Inventory must be a mapping')
+        defaults = data.get('defaults') or {}
+        tvs = data.get('tvs') or {}
+        groups = data.get('groups') or {}
+        if not all(isinstance(section, dict) for section in (defaults, tvs, groups)):
+            raise ValueError("'defaults', 'tvs' and 'groups' must be mappings")
+
+        devices: Dict[str, Device] = {}
+        for name, entry in tvs.items():
+            if isinstance(entry, str):
+                entry = {'host': entry}
+            if not isinstance(entry, dict) or not entry.get('host'):
+                raise ValueError(f"TV '{name}' has no host")
+            entry = dict(defaults, **entry)
+            method = entry.get('method')
+            if method is not None and method not in _METHODS:
+                raise ValueError(f"TV '{name}' has invalid method '{method}'")
+            try:
+                port = int(entry.get('port', DEFAULT_PORT))
+            except (TypeError, ValueError):
+                raise ValueError(f"TV '{name}' has invalid port '{entry.get('port')}'")
+            devices[name] = Device(name=name, host=str(entry['host']), method=method,
+                                   port=port, model=str(entry.get('model', '')))
+
+        members: Dict[str, List[str]] = {}
+        for name, group in groups.items():
+            if not isinstance(group, list):
+                raise ValueError(f"Group '{name}' must be a list of names")
+            members[name] = [str(member) for member in group]
+
+        return cls(devices, members)
+
+    @classmethod
+    def load(cls, path: Optional[Path] = None) -> 'Inventory':
+        """
+        Load an inventory file.
+
+        Args:
+            path: JSON, TOML or YAML file (defaults to DEFAULT_PATH)
+
+        Raises:
+            OSError: If the file cannot be read
+            ValueError: If the file is malformed
+        """
+        path = Path(path or DEFAULT_PATH)
+        try:
+            data = _parse(path)
+        except OSError:
+            raise
+        except Exception as e:
+            # json, tomllib and yaml each raise their own error types
+            raise ValueError(f"Invalid inventory {path}: {e}")
+        return cls.from_dict(data)
+
+    def select(self, names: Iterable[str]) -> List[Device]:
+        """
+        Resolve TV and group names to devices.
+
+        Args:
+            names: TV or group names; groups are expanded recursively
+
+        Returns:
+            Matching devices in inventory order, each at most once
+
+        Raises:
+            LookupError: If a name is neither a TV nor a group
+        """
+        selected = set()
+        pending = list(names)
+        expanded = set()
+        while pending:
+            name = pending.pop()
+            if name in self.devices:
+                selected.add(name)
+            elif name in self.groups:
+                if name not in expanded:
+                    expanded.add(name)
+                    pending.extend(self.groups[name])
+            else:
+                raise LookupError(f"No TV or group named '{name}' in the inventory")
+        return [device for name, device in self.devices.items() if name in selected]
+
+    def all(self) -> List[Device]:
+        """Return every TV in the inventory."""
+        return list(self.devices.values())
+
+
+def run(devices: List[Device], task: Callable[[Device], bool],
+        max_workers: int = DEFAULT_WORKERS) -> List[Tuple[Device, bool]]:
+    """
+    Run a task for several TVs in parallel.
+
+    Args:
+        devices: TVs to control
+        task: Called once per device; returns True on success
+        max_workers: Maximum number of TVs controlled at the same time
+
+    Returns:
+        (device, success) pairs in the order of devices; a task that raises
+        counts as a failure
+    """
+    logger = logging.getLogger(__name__)
+
+    def guarded(device: Device) -> bool:
+        try:
+            return bool(task(device))
+        except Exception as e:
+            logger.error(f"Command for {device.name} ({device.host}) failed: {e}")
+            return False
+
+    if len(devices) == 1:
+        return [(devices[0], guarded(devices[0]))]
+    if not devices:
+        return []
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(devices)))) as executor:
+        return list(zip(devices, executor.map(tracing.bind(guarded), devices)))
@@ -0,0 +1,35 @@
+"""
+Key Names Module
+
+Remote key names documented for Samsung TVs, shared by the macro linter,
+the interactive shell and the send metrics.
+"""
+
+
+# Keys documented in SAMSUNG_TV_COMMANDS.md
+KNOWN_KEYS = frozenset([
+    'KEY_0', 'KEY_1', 'KEY_2', 'KEY_3', 'KEY_4',
+    'KEY_5', 'KEY_6', 'KEY_7', 'KEY_8', 'KEY_9',
+    'KEY_3D', 'KEY_3SPEED', 'KEY_AD', 'KEY_ANYNET', 'KEY_ANYVIEW',
+    'KEY_APPS', 'KEY_APPS_DOWN', 'KEY_APPS_LEFT', 'KEY_APPS_RIGHT', 'KEY_APPS_UP',
+    'KEY_ASPECT_RATIO', 'KEY_AUDIO', 'KEY_AV1', 'KEY_AV2', 'KEY_BACK', 'KEY_BLUE',
+    'KEY_BRIGHTNESS', 'KEY_BROWSER', 'KEY_CANCEL', 'KEY_CC', 'KEY_CHDOWN',
+    'KEY_CHUP', 'KEY_CH_LIST', 'KEY_COMPONENT1', 'KEY_COMPONENT2', 'KEY_CONTRAST',
+    'KEY_DASH', 'KEY_DOWN', 'KEY_DTV', 'KEY_DTV_LINK', 'KEY_ENTER', 'KEY_EPG',
+    'KEY_ESAVING', 'KEY_EXIT', 'KEY_FACTORY', 'KEY_FAST_FWD', 'KEY_FAVCH', 'KEY_FF',
+    'KEY_FM_RADIO', 'KEY_GAME', 'KEY_GREEN', 'KEY_GUIDE', 'KEY_HDMI1', 'KEY_HDMI2',
+    'KEY_HDMI3', 'KEY_HDMI4', 'KEY_HELP', 'KEY_HOME', 'KEY_INFO', 'KEY_INSREPEAT',
+    'KEY_INTERNET', 'KEY_IPLUS', 'KEY_LEFT', 'KEY_LINK', 'KEY_LIVE', 'KEY_MENU',
+    'KEY_MTS', 'KEY_MUTE', 'KEY_NEXT', 'KEY_OFF_TIMER', 'KEY_ON_TIMER',
+    'KEY_PANEL_CH_DOWN', 'KEY_PANEL_CH_LIST', 'KEY_PANEL_CH_UP', 'KEY_PANEL_DOWN',
+    'KEY_PANEL_ENTER', 'KEY_PANEL_FAVCH', 'KEY_PANEL_GUIDE', 'KEY_PANEL_INFO',
+    'KEY_PANEL_LEFT', 'KEY_PANEL_MENU', 'KEY_PANEL_POWER', 'KEY_PANEL_RETURN',
+    'KEY_PANEL_RIGHT', 'KEY_PANEL_SOURCE', 'KEY_PANEL_TOOLS', 'KEY_PANEL_UP',
+    'KEY_PANEL_VOL_DOWN', 'KEY_PANEL_VOL_UP', 'KEY_PAUSE', 'KEY_PICTURE_MODE',
+    'KEY_PICTURE_SIZE', 'KEY_PLAY', 'KEY_POWER', 'KEY_POWEROFF', 'KEY_POWERON',
+    'KEY_PREV', 'KEY_REC', 'KEY_RED', 'KEY_RETURN', 'KEY_REWIND', 'KEY_RIGHT',
+    'KEY_SCREEN_MODE', 'KEY_SEARCH', 'KEY_SMART_HUB', 'KEY_SOURCE',
+    'KEY_SOURCE_HDMI1', 'KEY_SOURCE_HDMI2', 'KEY_SOURCE_HDMI3', 'KEY_SOURCE_HDMI4',
+    'KEY_STOP', 'KEY_SUBTITLE', 'KEY_TOOLS', 'KEY_UP', 'KEY_VOLDOWN', 'KEY_VOLUP',
+    'KEY_YELLOW', 'KEY_ZOOM',
+])
@@ -0,0 +1,174 @@
+"""
+Macro Lint Module
+
+Static validation of macro files before they are sent to any TV.
+"""
+
+import csv
+import logging
+import math
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+from helpers.keys import KNOWN_KEYS
+from helpers.macro import DEFAULT_WAIT
+
+
+# File extensions picked up when linting a directory
+MACRO_SUFFIXES = ('.m', '.csv')
+
+# Estimated connect + send overhead per command in milliseconds
+DEFAULT_SEND_COST = 250.0
+
+
+@dataclass
+class LintIssue:
+    """A single problem found in a macro file."""
+    line: int
+    severity: str
+    message: str
+
+    def __str__(self) -> str:
+        return f"line {self.line}: {self.severity}: {self.message}"
+
+
+@dataclass
+class LintReport:
+    """Result of linting one macro file."""
+    filename: str
+    commands: int = 0
+    estimated_ms: float = 0.0
+    issues: List[LintIssue] = field(default_factory=list)
+
+    @property
+    def errors(self) -> List[LintIssue]:
+        return [issue for issue in self.issues if issue.severity == 'error']
+
+    @property
+    def ok(self) -> bool:
+        """True if the macro has no errors (warnings are allowed)."""
+        return not self.errors
+
+    def __str__(self) -> str:
+        lines = [
+            f"{self.filename}: {self.commands} commands, "
+            f"~{self.estimated_ms / 1000.0:.1f}s estimated"
+        ]
+        lines.extend(f"  {issue}" for issue in self.issues)
+        return '\n'.join(lines)
+
+
+def lint(filename: str, send_cost: float = DEFAULT_SEND_COST) -> LintReport:
+    """
+    Statically validate a macro file without contacting any TV.
+
+    Args:
+        filename: Path to the macro CSV file
+        send_cost: Estimated connect + send time per command in milliseconds
+
+    Returns:
+        LintReport with the issues found and the estimated run time
+
+    Errors are reported for unknown keys, unparseable wait times (which
+    macro.execute would silently replace with the default) and negative or
+    non-finite waits (which abort macro.execute). Warnings are reported for
+    extra columns and commands that follow a KEY_POWEROFF, which the TV can
+    no longer receive.
+    """
+    logger = logging.getLogger(__name__)
+    report = LintReport(filename=filename)
+
+    try:
+        with open(filename, newline='', encoding='utf-8') as macro_file:
+            reader = csv.DictReader(macro_file, fieldnames=('key', 'wait'))
+
+            powered_off_at: Optional[int] = None
+            line_number = 0
+            for line in reader:
+                line_number += 1
+                key = line['key'].strip() if line['key'] else ''
+
+                if not key or key.startswith('#'):
+                    continue
+
+                report.commands += 1
+
+                if key not in KNOWN_KEYS:
+                    report.issues.append(LintIssue(line_number, 'error', f"unknown key '{key}'"))
+
+                raw_wait = (line['wait'] or '').strip()
+                try:
+                    wait = float(raw_wait) if raw_wait else DEFAULT_WAIT
+                except ValueError:
+                    report.issues.append(LintIssue(
+                        line_number, 'error',
+                        f"invalid wait time '{raw_wait}' (would run with {DEFAULT_WAIT:g}ms)"
+                    ))
+                    wait = DEFAULT_WAIT
+                if not math.isfinite(wait) or wait < 0:
+                    report.issues.append(LintIssue(
+                        line_number, 'error', f"wait time must be a finite number >= 0, got {raw_wait}"
+                    ))
+                    wait = 0.0
+
+                if line.get(None):
+                    report.issues.append(LintIssue(line_number, 'warning', 'extra columns ignored'))
+
+                if powered_off_at is not None and key != 'KEY_POWERON':
+                    if key == 'KEY_POWEROFF':
+                        message = f"repeated KEY_POWEROFF (TV already off since line {powered_off_at})"
+                    else:
+                        message = f"unreachable '{key}' after KEY_POWEROFF on line {powered_off_at}"
+                    report.issues.append(LintIssue(line_number, 'warning', message))
+                elif key == 'KEY_POWEROFF':
+                    powered_off_at = line_number
+                elif key == 'KEY_POWERON':
+                    powered_off_at = None
+
+                report.estimated_ms += send_cost + wait
+
+    except (OSError, UnicodeDecodeError) as e:
+        report.issues.append(LintIssue(0, 'error', f'cannot read file: {e}'))
+    except csv.Error as e:
+        report.issues.append(LintIssue(0, 'error', f'CSV parsing error: {e}'))
+
+    logger.debug(f"Linted {filename}: {len(report.issues)} issues")
+    return report
+
+
+def find_macros(path: str) -> List[str]:
+    """
+    Collect macro files from a file or directory path.
+
+    Args:
+        path: Macro file, or directory searched recursively for MACRO_SUFFIXES
+
+    Returns:
+        Sorted list of macro file paths
+    """
+    root = Path(path)
+    if root.is_file():
+        return [str(root)]
+    return sorted(
+        str(p) for p in root.rglob('*')
+        if p.is_file() and p.suffix.lower() in MACRO_SUFFIXES
+    )
+
+
+def lint_many(filenames: Iterable[str], max_workers: Optional[int] = None,
+              send_cost: float = DEFAULT_SEND_COST) -> List[LintReport]:
+    """
+    Lint several macro files in parallel.
+
+    Args:
+        filenames: Macro files to lint
+        max_workers: Size of the thread pool (None for the executor default)
+        send_cost: Estimated connect + send time per command in milliseconds
+
+    Returns:
+        List of LintReport in the same order as filenames
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(lambda name: lint(name, send_cost), filenames))
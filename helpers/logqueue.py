@@ -0,0 +1,58 @@
+"""
+Queued Logging Module
+
+Moves log output (the app.log file and the console) to a background
+thread, so a timed macro or a fan-out to many TVs never waits on disk I/O.
+"""
+
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+
+_listener: Optional[QueueListener] = None
+_handler: Optional[QueueHandler] = None
+
+
+def stop() -> None:
+    """Flush pending records and detach the queue from the root logger."""
+    global _listener, _handler
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+
+
+def start(*handlers: logging.Handler, level: int = logging.DEBUG) -> QueueListener:
+    """
+    Route root logger records through a queue to the given handlers.
+
+    Calling start again replaces the previous pipeline. Pending records are
+    written at interpreter exit.
+
+    Args:
+        handlers: Handlers run on the listener thread; their levels are respected
+        level: Level of the root logger
+
+    Returns:
+        The running listener
+    """
+    global _listener, _handler
+    stop()
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    _handler = QueueHandler(records)
+    _listener = QueueListener(records, *handlers, respect_handler_level=True)
+
+    root = logging.getLogger()
+    root.setLevel(level)
+    root.addHandler(_handler)
+    _listener.start()
+    return _listener
+
+
+atexit.register(stop)
@@ -6,19 +6,27 @@ Handles execution of macro files containing sequences of TV commands.
 
 import logging
 import csv
+import math
 from pathlib import Path
-from typing import Dict, Any
+from typing import Any, Callable, Dict, Optional
 
-from helpers import tvcon
+from helpers import tvcon, tracing
 
 
-def execute(config: Dict[str, Any], filename: str) -> bool:
+# Wait time in milliseconds used when a macro line has none (or an invalid one)
+DEFAULT_WAIT = 500.0
+
+
+def execute(config: Dict[str, Any], filename: str,
+            sender: Optional[Callable[[Dict[str, Any], str, float], bool]] = None) -> bool:
     """
     Execute a macro file containing TV commands.
     
     Args:
         config: TV configuration dictionary
         filename: Path to the macro CSV file
+        sender: Function used to send each command (defaults to tvcon.send;
+            pass RemotePool.send to reuse one connection for the whole macro)
         
     Returns:
         True if macro executed successfully, False otherwise
@@ -27,57 +35,67 @@ def execute(config: Dict[str, Any], filename: str) -> bool:
     - key: The command to send (e.g., 'KEY_POWER', 'KEY_VOLUP')
     - wait: Time to wait after command in milliseconds (optional, defaults to 500)
     
-    Lines starting with '#' are treated as comments and ignored.
+    Lines starting with '#' are treated as comments and ignored. A negative
+    or non-finite wait fails the macro before its key is sent.
     """
     logger = logging.getLogger(__name__)
+    send = sender or tvcon.send
     
-    macro_path = Path(filename)
+    with tracing.span('macro.execute', file=str(filename), host=config.get('host', 'unknown'),
+                      ok=False) as span:
+        macro_path = Path(filename)
     
-    if not macro_path.exists():
-        logger.error(f'Macro file not found: {filename}')
-        return False
+        if not macro_path.exists():
+            logger.error(f'Macro file not found: {filename}')
+            return False
     
-    if not macro_path.is_file():
-        logger.error(f'Path is not a file: {filename}')
-        return False
+        if not macro_path.is_file():
+            logger.error(f'Path is not a file: {filename}')
+            return False
     
-    try:
-        with open(macro_path, newline='', encoding='utf-8') as macro_file:
-            reader = csv.DictReader(macro_file, fieldnames=('key', 'wait'))
+        try:
+            with open(macro_path, newline='', encoding='utf-8') as macro_file:
+                reader = csv.DictReader(macro_file, fieldnames=('key', 'wait'))
 
-            line_number = 0
-            for line in reader:
-                line_number += 1
-                key = line['key'].strip() if line['key'] else ''
+                line_number = 0
+                for line in reader:
+                    line_number += 1
+                    key = line['key'].strip() if line['key'] else ''
                 
-                # Skip empty lines and comments
-                if not key or key.startswith('#'):
-                    logger.debug(f"Line {line_number}: Skipping comment or empty line")
-                    continue
+                    # Skip empty lines and comments
+                    if not key or key.startswith('#'):
+                        logger.debug("Line %d: Skipping comment or empty line", line_number)
+                        continue
                 
-                # Parse wait time
-                try:
-                    wait = float(line['wait'] or 500.0)
-                except ValueError:
-                    logger.warning(f"Line {line_number}: Invalid wait time '{line['wait']}', using default 500ms")
-                    wait = 500.0
+                    # Parse wait time
+                    try:
+                        wait = float(line['wait'] or DEFAULT_WAIT)
+                    except ValueError:
+                        logger.warning(f"Line {line_number}: Invalid wait time '{line['wait']}', using default {DEFAULT_WAIT:g}ms")
+                        wait = DEFAULT_WAIT
+                    if not math.isfinite(wait) or wait < 0:
+                        logger.error(f"Line {line_number}: Wait time must be a finite number >= 0, got {line['wait']}")
+                        span.set('failed_line', line_number)
+                        return False
                 
-                logger.info(f"Line {line_number}: Executing '{key}' with {wait}ms wait")
+                    logger.info("Line %d: Executing '%s' with %sms wait", line_number, key, wait)
                 
-                # Send command
-                if not tvcon.send(config, key, wait):
-                    logger.error(f"Line {line_number}: Failed to execute command '{key}'")
-                    return False
+                    # Send command
+                    if not send(config, key, wait):
+                        logger.error(f"Line {line_number}: Failed to execute command '{key}'")
+                        span.set('failed_line', line_number)
+                        return False
         
-        logger.info(f"Macro execution completed successfully: {filename}")
-        return True
+            logger.info(f"Macro execution completed successfully: {filename}")
+            span.set('ok', True)
+            return True
         
-    except (FileNotFoundError, IOError) as e:
-        logger.error(f'Failed to read macro file {filename}: {e}')
-        return False
-    except csv.Error as e:
-        logger.error(f'CSV parsing error in {filename}: {e}')
-        return False
-    except Exception as e:
-        logger.error(f'Unexpected error executing macro {filename}: {e}')
-        return False
+        except (FileNotFoundError, IOError) as e:
+            logger.error(f'Failed to read macro file {filename}: {e}')
+            return False
+        except csv.Error as e:
+            logger.error(f'CSV parsing error in {filename}: {e}')
+            return False
+        except Exception as e:
+            logger.error(f'Unexpected error executing macro {filename}: {e}')
+            return False
@@ -0,0 +1,215 @@
+"""
+Metrics Module
+
+Process-wide counters, gauges and histograms rendered in the Prometheus
+text exposition format (served by the HTTP API at GET /metrics). Only the
+standard library is used; updating a metric is a lock and a dictionary
+update, cheap enough for the send path.
+"""
+
+import abc
+import bisect
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+
+# Upper bounds in seconds of the latency histogram buckets
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric(abc.ABC):
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _label_text(self, values: LabelValues, extra: str = '') -> str:
+        pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(self.labels, values)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+    def _check(self, values: LabelValues) -> None:
+        if len(values) != len(self.labels):
+            raise ValueError(f'{self.name} expects labels {self.labels}, got {values}')
+
+    @abc.abstractmethod
+    def samples(self) -> List[str]:
+        """Return the sample lines of the metric."""
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count, optionally per label values."""
+    kind = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *values: str, amount: float = 1.0) -> None:
+        """Add amount to the count of the given label values."""
+        self._check(values)
+        with self._lock:
+            self._values[values] = self._values.get(values, 0.0) + amount
+
+    def value(self, *values: str) -> float:
+        with self._lock:
+            return self._values.get(values, 0.0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f'{self.name}{self._label_text(values)} {_format_value(value)}' for values, value in items]
+
+
+class Gauge(_Metric):
+    """Value that goes up and down, either set directly or read from a callback."""
+    kind = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float, *values: str) -> None:
+        self._check(values)
+        with self._lock:
+            self._values[values] = value
+
+    def inc(self, *values: str, amount: float = 1.0) -> None:
+        self._check(values)
+        with self._lock:
+            self._values[values] = self._values.get(values, 0.0) + amount
+
+    def dec(self, *values: str, amount: float = 1.0) -> None:
+        self.inc(*values, amount=-amount)
+
+    def set_function(self, function: Optional[Callable[[], float]]) -> None:
+        """Read the (unlabelled) value from function at render time."""
+        self._function = function
+
+    def value(self, *values: str) -> float:
+        if self._function is not None and not values:
+            return float(self._function())
+        with self._lock:
+            return self._values.get(values, 0.0)
+
+    def samples(self) -> List[str]:
+        if self._function is not None:
+            return [f'{self.name} {_format_value(self._function())}']
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f'{self.name}{self._label_text(values)} {_format_value(value)}' for values, value in items]
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> (per-bucket counts with a final +Inf slot, sum)
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, amount: float, *values: str) -> None:
+        """Record one observation, e.g. a latency in seconds."""
+        self._check(values)
+        index = bisect.bisect_left(self.buckets, amount)
+        with self._lock:
+            entry = self._values.get(values)
+            if entry is None:
+                entry = self._values[values] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][index] += 1
+            entry[1][0] += amount
+
+    def count(self, *values: str) -> int:
+        with self._lock:
+            entry = self._values.get(values)
+            return sum(entry[0]) if entry else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((values, (list(counts), total[0])) for values, (counts, total) in self._values.items())
+        lines = []
+        for values, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f'{self.name}_bucket{self._label_text(values, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{self._label_text(values)} {_format_value(total)}')
+            lines.append(f'{self.name}_count{self._label_text(values)} {cumulative}')
+        return lines
+
+
+class Registry:
+    """Named collection of metrics rendered together."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Add a metric; an existing metric of the same name and type is returned instead."""
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric):
+                    raise ValueError(f'metric {metric.name} already registered as {existing.kind}')
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text format."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        return ''.join(metric.render() + '\n' for metric in metrics)
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+    """Create (or return the existing) counter in the default registry."""
+    return REGISTRY.register(Counter(name, documentation, labels))
+
+
+def gauge(name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+    """Create (or return the existing) gauge in the default registry."""
+    return REGISTRY.register(Gauge(name, documentation, labels))
+
+
+def histogram(name: str, documentation: str, labels: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    """Create (or return the existing) histogram in the default registry."""
+    return REGISTRY.register(Histogram(name, documentation, labels, buckets))
+
+
+def render() -> str:
+    """Return the default registry in the Prometheus text format."""
+    return REGISTRY.render()
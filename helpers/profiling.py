@@ -0,0 +1,129 @@
+"""
+Profiling Module
+
+Per-phase timing for the --profile option. Phases are accumulated all the
+time (two clock reads per phase, cheap next to any network call) and only
+reported when a profiling session is active; the session also runs
+cProfile and can dump its statistics for pstats, snakeviz or flameprof.
+"""
+
+import cProfile
+import io
+import pstats
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+
+# Phases in report order
+PHASES = ('import', 'arguments', 'discovery', 'description fetch', 'connect', 'send', 'sleep')
+
+# Functions listed in the report when no statistics file is written
+TOP_FUNCTIONS = 10
+
+_lock = threading.Lock()
+_totals: Dict[str, List[float]] = {}
+
+
+def record(name: str, seconds: float) -> None:
+    """Add time spent in a phase."""
+    with _lock:
+        entry = _totals.get(name)
+        if entry is None:
+            entry = _totals[name] = [0.0, 0]
+        entry[0] += seconds
+        entry[1] += 1
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """Time the enclosed block as part of a phase."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - started)
+
+
+def totals() -> Dict[str, Tuple[float, int]]:
+    """Return (seconds, occurrences) per phase recorded so far."""
+    with _lock:
+        return {name: (entry[0], int(entry[1])) for name, entry in _totals.items()}
+
+
+def reset() -> None:
+    """Forget all recorded phases."""
+    with _lock:
+        _totals.clear()
+
+
+def report(wall: float, stats: Optional[pstats.Stats] = None, limit: int = TOP_FUNCTIONS) -> str:
+    """
+    Format the phase breakdown, optionally followed by the top functions.
+
+    Phases run in worker threads (parallel description fetches or sends to
+    several TVs) are summed, so they can add up to more than the wall time.
+
+    Args:
+        wall: Wall clock duration of the run in seconds
+        stats: Profiler statistics to list the most expensive functions from
+        limit: Number of functions listed
+    """
+    recorded = totals()
+    names = [name for name in PHASES if name in recorded]
+    names += sorted(name for name in recorded if name not in PHASES)
+
+    lines = [f"{'phase':<18} {'seconds':>9} {'share':>6} {'count':>6}"]
+    for name in names:
+        seconds, count = recorded[name]
+        share = seconds / wall * 100 if wall > 0 else 0.0
+        lines.append(f"{name:<18} {seconds:>9.3f} {share:>5.1f}% {count:>6}")
+    other = max(0.0, wall - sum(seconds for seconds, _ in recorded.values()))
+    lines.append(f"{'other':<18} {other:>9.3f}")
+    lines.append(f"{'total':<18} {wall:>9.3f}")
+
+    if stats is not None:
+        output = io.StringIO()
+        stats.stream = output
+        stats.sort_stats('cumulative').print_stats(limit)
+        lines.extend(['', output.getvalue().strip()])
+    return '\n'.join(lines)
+
+
+@contextmanager
+def session(dump: Optional[str], started: Optional[float] = None,
+            stream: Optional[TextIO] = None) -> Iterator[None]:
+    """
+    Profile the enclosed block and print the phase report when it ends.
+
+    Args:
+        dump: None to do nothing; '' to profile and list the top functions;
+            a path to also write the cProfile statistics there
+        started: perf_counter value the wall time is measured from (e.g. the
+            start of the imports); defaults to entering the block
+        stream: Where the report is printed (defaults to sys.stderr)
+    """
+    if dump is None:
+        yield
+        return
+
+    started = time.perf_counter() if started is None else started
+    stream = stream or sys.stderr
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        wall = time.perf_counter() - started
+        stats = None
+        if dump:
+            profiler.dump_stats(dump)
+        else:
+            stats = pstats.Stats(profiler)
+        print(report(wall, stats), file=stream)
+        if dump:
+            print(f"Profile written to {dump} (open with python -m pstats, snakeviz or flameprof)",
+                  file=stream)
@@ -0,0 +1,83 @@
+"""
+Key Streaming Module
+
+Reads keys line by line (from a terminal, a pipe or another program) and
+sends each one over a single persistent TV connection as it arrives.
+"""
+
+import logging
+from typing import Any, Dict, Optional, TextIO
+
+from helpers import tvcon
+from helpers.keys import KNOWN_KEYS
+
+
+# Sustained keys per second sent to the TV
+DEFAULT_RATE = 8.0
+
+# Keys sent back to back after a pause (e.g., a quick double press)
+DEFAULT_BURST = 3
+
+PROMPT = 'key> '
+
+_QUIT = frozenset(['quit', 'exit'])
+
+
+def run(config: Dict[str, Any], stream: TextIO, rate: float = DEFAULT_RATE,
+        burst: int = DEFAULT_BURST, pool: Optional[tvcon.RemotePool] = None) -> bool:
+    """
+    Send keys read from a stream until end of input or 'quit'.
+
+    Each line holds one or more keys separated by whitespace; blank lines
+    and lines starting with '#' are ignored. Sends are paced with a
+    RateLimiter instead of a fixed sleep per key. When reading from a
+    terminal a prompt is shown.
+
+    Args:
+        config: TV configuration dictionary
+        stream: Text stream to read keys from (e.g., sys.stdin)
+        rate: Sustained keys per second
+        burst: Keys allowed back to back after a pause
+        pool: Connection pool to use (a private one is created and closed if omitted)
+
+    Returns:
+        True if every key was sent successfully, False otherwise
+    """
+    logger = logging.getLogger(__name__)
+
+    own_pool = pool is None
+    pool = pool or tvcon.RemotePool()
+    limiter = tvcon.RateLimiter(rate, burst)
+    interactive = stream.isatty()
+    sent = failed = 0
+
+    try:
+        while True:
+            if interactive:
+                print(PROMPT, end='', flush=True)
+            line = stream.readline()
+            if not line:
+                break
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.lower() in _QUIT:
+                break
+
+            for key in line.split():
+                if key not in KNOWN_KEYS:
+                    logger.warning(f"Unknown key '{key}', sending anyway")
+                limiter.acquire()
+                if pool.send(config, key):
+                    sent += 1
+                else:
+                    failed += 1
+    except KeyboardInterrupt:
+        if interactive:
+            print()
+    finally:
+        if own_pool:
+            pool.close()
+
+    logger.debug(f"Key stream ended: {sent} sent, {failed} failed")
+    return failed == 0
@@ -0,0 +1,305 @@
+"""
+Remote Control Service Module
+
+Long-lived controller state for the daemon: the TVs found so far, the
+description cache, the passive SSDP listener and pooled TV connections.
+Requests are plain dictionaries so any transport (Unix socket, HTTP) can
+feed them to RemoteService.handle.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+from helpers import capability, desccache, macro, ssdp, ssdp_listener, tracing, tvcon, tvinfo
+from helpers.tvregistry import TVRegistry
+
+
+DEFAULT_NAME = 'python remote'
+
+# Wait between keys of a send_many request in milliseconds
+DEFAULT_KEY_WAIT = 100.0
+
+# TVs driven in parallel by a batch request
+DEFAULT_BATCH_WORKERS = 16
+
+# JSON names of the argument types checked by _argument
+_TYPE_NAMES = {str: 'string', list: 'list'}
+
+
+def _argument(request: Dict[str, Any], name: str, kind: type) -> Any:
+    """
+    Return a required request argument.
+
+    Raises:
+        ValueError: If the argument is missing
+        TypeError: If the argument is not of the given type
+    """
+    if name not in request:
+        raise ValueError(f"missing argument '{name}'")
+    value = request[name]
+    if not isinstance(value, kind):
+        raise TypeError(f"argument '{name}' must be a {_TYPE_NAMES[kind]}")
+    return value
+
+
+
+class RemoteService:
+    """
+    Controller that keeps discovery results and TV connections warm.
+
+    Example:
+        service = RemoteService()
+        service.start()
+        service.handle({'op': 'send', 'key': 'KEY_VOLUP'})
+        service.close()
+    """
+
+    def __init__(self, name: str = DEFAULT_NAME, use_cache: bool = True, listen: bool = True):
+        """
+        Args:
+            name: Remote name shown by the TV when pairing
+            use_cache: Use the on-disk discovery, description and capability caches
+            listen: Track SSDP announcements in the background
+        """
+        self.name = name
+        self.use_cache = use_cache
+        self.descriptions = desccache.shared() if use_cache else None
+        self.registry = TVRegistry()
+        # Only registry TVs get their own series in the send metrics
+        self.remotes = tvcon.RemotePool(known_host=self.registry.__contains__)
+        self.listener = ssdp_listener.NotifyListener() if listen else None
+
+    def start(self) -> None:
+        """Start background discovery."""
+        if self.listener is not None:
+            self.listener.start()
+
+    def close(self) -> None:
+        """Stop background discovery and close all TV connections."""
+        if self.listener is not None:
+            self.listener.stop()
+        self.remotes.close()
+        if self.descriptions is not None:
+            self.descriptions.save()
+
+    def scan(self, wait: float = 1.0, networks: Optional[List[str]] = None,
+             refresh: bool = True) -> List[Dict[str, str]]:
+        """
+        Discover TVs and fetch their descriptions.
+
+        Args:
+            wait: Discovery window in seconds
+            networks: CIDR ranges to sweep with unicast instead of multicast
+            refresh: Scan the network even if the discovery cache has entries
+
+        Returns:
+            List of TV dictionaries (fn, ip, model) in discovery order
+        """
+        logger = logging.getLogger(__name__)
+
+        found = list(ssdp.cached_scan(wait=wait, use_cache=self.use_cache and not refresh,
+                                      networks=networks))
+        if self.listener is not None:
+            locations = {device.location for device in found}
+            found.extend(device for device in self.listener.registry.devices()
+                         if device.location not in locations)
+
+        usns = [device.usn or None for device in found]
+        results = tvinfo.get_many([device.location for device in found],
+                                  cache=self.descriptions, usns=usns)
+
+        # Known TVs keep their detected transport across scans
+        records = {}
+        for device, usn, info in zip(found, usns, results):
+            if isinstance(info, Exception):
+                logger.warning(f"Failed to get info for TV at {device.location}: {info}")
+                continue
+            records[info['ip']] = self.registry.update(info, usn=usn)
+        self.registry.retain(records)
+        return [record.as_dict() for record in records.values()]
+
+    def tvs(self, series: Optional[str] = None, subnet: Optional[str] = None) -> List[Dict[str, str]]:
+        """
+        Return the known TVs, scanning (cache first) if none are known yet.
+
+        Args:
+            series: Only TVs of this model series (e.g. 'F')
+            subnet: Only TVs inside this IPv4 network (e.g. '10.1.0.0/24')
+
+        Raises:
+            ValueError: If subnet is not a valid network
+        """
+        if not len(self.registry):
+            self.scan(refresh=False)
+        if subnet is not None:
+            records = self.registry.in_subnet(subnet)
+            if series is not None:
+                records = [record for record in records if record.series == series.upper()]
+        elif series is not None:
+            records = self.registry.by_series(series)
+        else:
+            records = self.registry.records()
+        return [record.as_dict() for record in records]
+
+    def config(self, host: Optional[str] = None, method: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Build the tvcon configuration for a TV.
+
+        Args:
+            host: TV IP address or friendly name of a known TV (defaults to the
+                first TV found)
+            method: 'legacy' or 'websocket' (detected and remembered if omitted)
+
+        Raises:
+            LookupError: If no host is given and no TV can be found, or a
+                friendly name matches several TVs
+        """
+        if host is None:
+            tvs = self.tvs()
+            if not tvs:
+                raise LookupError('No Samsung TV found in the network')
+            host = tvs[0]['ip']
+
+        record = self.registry.get(host)
+        if record is None:
+            named = self.registry.by_name(host)
+            if len(named) > 1:
+                raise LookupError(f"Several TVs are named '{host}', use an IP address")
+            if named:
+                record = named[0]
+                host = record.ip
+
+        if method is None:
+            method = record.method if record is not None else None
+            if method is None:
+                method = capability.detect(host, record.model if record else '', use_cache=self.use_cache)
+                self.registry.set_method(host, method)
+
+        return {'name': self.name, 'host': host, 'port': 55000, 'method': method, 'timeout': 0}
+
+    def _forget_method(self, host: str) -> None:
+        self.registry.set_method(host, None)
+        capability.forget(host)
+
+    def send(self, key: str, host: Optional[str] = None, method: Optional[str] = None,
+             wait: float = 0.0) -> bool:
+        """Send one key over the pooled connection."""
+        config = self.config(host, method)
+        ok = self.remotes.send(config, key, wait)
+        if not ok and method is None:
+            self._forget_method(config['host'])
+        return ok
+
+    def send_many(self, keys: Sequence[str], host: Optional[str] = None,
+                  method: Optional[str] = None, wait: float = DEFAULT_KEY_WAIT) -> bool:
+        """Send several keys in order, stopping at the first failure."""
+        config = self.config(host, method)
+        for key in keys:
+            if not self.remotes.send(config, key, wait):
+                if method is None:
+                    self._forget_method(config['host'])
+                return False
+        return True
+
+    def macro(self, filename: str, host: Optional[str] = None, method: Optional[str] = None) -> bool:
+        """Run a macro file over the pooled connection."""
+        return macro.execute(self.config(host, method), filename, sender=self.remotes.send)
+
+    def power_off_all(self) -> Dict[str, bool]:
+        """Turn off every known TV; returns the result per TV IP."""
+        return {tv['ip']: self.send('KEY_POWEROFF', tv['ip']) for tv in self.tvs()}
+
+    def batch(self, commands: Sequence[Dict[str, Any]],
+              max_workers: int = DEFAULT_BATCH_WORKERS) -> List[Dict[str, Any]]:
+        """
+        Run key lists for several TVs concurrently.
+
+        Args:
+            commands: One dictionary per TV with 'keys' (or a single 'key'),
+                and optionally 'host', 'method' and 'wait'
+            max_workers: Maximum number of TVs driven at the same time
+
+        Returns:
+            One reply per command, in the same order
+        """
+        if not commands:
+            return []
+
+        def run(command: Dict[str, Any]) -> Dict[str, Any]:
+            if not isinstance(command, dict):
+                return {'ok': False, 'error': 'command must be a JSON object'}
+            op = 'send_many' if 'keys' in command else 'send'
+            return dict(self.handle(dict(command, op=op)), host=command.get('host'))
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(commands)))) as executor:
+            return list(executor.map(tracing.bind(run), commands))
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Execute one request dictionary inside a 'service.handle' trace span.
+
+        Requests name an operation in 'op' plus its arguments, e.g.
+        {'op': 'send', 'key': 'KEY_VOLUP', 'host': '192.168.1.100'}.
+        Supported operations: ping, tvs, scan, send, send_many, macro,
+        power_off_all and batch.
+
+        Returns:
+            {'ok': True, ...result} or {'ok': False, 'error': message}; the
+            failure reply also has 'invalid': True if the request itself was
+            malformed (unknown operation, missing or invalid argument)
+        """
+        with tracing.span('service.handle', op=str(request.get('op')), host=str(request.get('host'))) as span:
+            reply = self._handle(request)
+            span.set('ok', bool(reply.get('ok')))
+            return reply
+
+    def _handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        logger = logging.getLogger(__name__)
+
+        op = request.get('op')
+        host = request.get('host')
+        method = request.get('method')
+        try:
+            if op == 'ping':
+                return {'ok': True}
+            if op == 'tvs':
+                return {'ok': True, 'tvs': self.tvs(request.get('series'), request.get('subnet'))}
+            if op == 'scan':
+                tvs = self.scan(float(request.get('wait', 1.0)), request.get('networks'))
+                return {'ok': True, 'tvs': tvs}
+            if op == 'send':
+                key = _argument(request, 'key', str)
+                ok = self.send(key, host, method, float(request.get('wait', 0.0)))
+                return {'ok': ok} if ok else {'ok': False, 'error': f"failed to send {key}"}
+            if op == 'send_many':
+                keys = _argument(request, 'keys', list)
+                if not all(isinstance(key, str) for key in keys):
+                    raise TypeError("argument 'keys' must be a list of strings")
+                ok = self.send_many(keys, host, method, float(request.get('wait', DEFAULT_KEY_WAIT)))
+                return {'ok': ok} if ok else {'ok': False, 'error': 'failed to send keys'}
+            if op == 'macro':
+                filename = _argument(request, 'file', str)
+                ok = self.macro(filename, host, method)
+                return {'ok': ok} if ok else {'ok': False, 'error': f"macro {filename} failed"}
+            if op == 'batch':
+                results = self.batch(_argument(request, 'commands', list))
+                return {'ok': all(result['ok'] for result in results), 'results': results}
+            if op == 'power_off_all':
+                results = self.power_off_all()
+                if not results:
+                    return {'ok': False, 'error': 'No Samsung TVs found to power off'}
+                return {'ok': all(results.values()), 'results': results}
+        except (ValueError, TypeError) as e:
+            return {'ok': False, 'error': str(e), 'invalid': True}
+        except KeyError as e:
+            # Required arguments are checked above, so this is a bug
+            logger.exception(f"Request {op} failed")
+            return {'ok': False, 'error': f"unexpected error: {e}"}
+        except LookupError as e:
+            return {'ok': False, 'error': str(e)}
+        except Exception as e:
+            logger.exception(f"Request {op} failed")
+            return {'ok': False, 'error': f"unexpected error: {e}"}
+
+        return {'ok': False, 'error': f"unknown operation {op!r}", 'invalid': True}
@@ -6,9 +6,12 @@ This provides the same interface as the original custom implementation.
 """
 
 import logging
-from typing import List
+import time
+from typing import Iterable, Iterator, List, Optional
 from dataclasses import dataclass
 
+from helpers import metrics, ssdpcache, ssdp_custom, tracing
+
 try:
     from netdisco import ssdp as netdisco_ssdp
     NETDISCO_AVAILABLE = True
@@ -17,6 +20,13 @@ except ImportError:
     logging.warning("netdisco library not available. Install with: pip install netdisco")
 
 
+DISCOVERY_SECONDS = metrics.histogram('samsung_remote_discovery_seconds',
+                                      'Duration of network discovery', ('mode',))
+
+DISCOVERED_DEVICES = metrics.gauge('samsung_remote_discovered_devices',
+                                   'Samsung TVs found by the last discovery', ('mode',))
+
+
 @dataclass
 class SSDPResponse:
     """Represents an SSDP response from a network device."""
@@ -24,20 +34,89 @@ class SSDPResponse:
     usn: str
     st: str
     cache: str = "0"
+    interface: Optional[str] = None
 
     def __repr__(self) -> str:
         return f"<SSDPResponse({self.location}, {self.st}, {self.usn})>"
 
 
-def discover(service: str, timeout: int = 5, retries: int = 1, mx: int = 3) -> List[SSDPResponse]:
+def _max_age(device) -> str:
+    """Return the advertised max-age of a netdisco entry as a string."""
+    values = getattr(device, 'values', None)
+    if not isinstance(values, dict):
+        return '0'
+    return str(ssdpcache.parse_max_age(values.get('cache-control')))
+
+
+def iter_discover(service: str, timeout: float = 5, mx: int = 3,
+                  quiet: Optional[float] = None) -> Iterator[SSDPResponse]:
+    """
+    Yield devices answering a targeted search for one service type.
+
+    Only the requested ST is searched for, on every local interface, so
+    other UPnP devices on the network never answer. Responses are streamed
+    as they arrive; stray replies for other service types are dropped.
+
+    Args:
+        service: Service type to search for
+        timeout: Hard cap on the search in seconds
+        mx: Maximum wait time for responses
+        quiet: Quiet period in seconds that ends the search early (None to disable)
+
+    Yields:
+        SSDP responses from matching devices
+    """
+    wanted = service.lower()
+    for response in ssdp_custom.iter_discover(
+        service, timeout=timeout, mx=mx,
+        interfaces=ssdp_custom.local_interfaces(), quiet=quiet
+    ):
+        if wanted in str(response.st).lower():
+            yield SSDPResponse(
+                location=response.location,
+                usn=response.usn,
+                st=response.st,
+                cache=response.cache,
+                interface=response.interface
+            )
+
+
+def _scan_all(match: str) -> List[SSDPResponse]:
+    """
+    Scan every UPnP device with netdisco and keep those whose ST contains match.
+
+    Only used when asked for (scan_all=True), for devices that answer
+    ssdp:all searches but not a targeted one.
+    """
+    devices = netdisco_ssdp.scan()
+
+    matching_devices = []
+    for device in devices:
+        if hasattr(device, 'st') and match in str(device.st).lower():
+            matching_devices.append(SSDPResponse(
+                location=getattr(device, 'location', ''),
+                usn=getattr(device, 'usn', ''),
+                st=getattr(device, 'st', ''),
+                cache=_max_age(device)
+            ))
+    return matching_devices
+
+
+def discover(service: str, timeout: int = 5, retries: int = 1, mx: int = 3,
+             scan_all: bool = False) -> List[SSDPResponse]:
     """
-    Discover SSDP services on the network using netdisco.
+    Discover SSDP services on the network.
+
+    Only a targeted search for the service is sent. The netdisco scan of
+    all UPnP devices is slow and memory hungry, so it only runs when
+    scan_all is set and the targeted search found nothing.
     
     Args:
         service: Service type to search for
-        timeout: Socket timeout in seconds (not used by netdisco)
+        timeout: Hard cap on the targeted search in seconds
         retries: Number of discovery attempts (not used by netdisco)
-        mx: Maximum wait time for responses (not used by netdisco)
+        mx: Maximum wait time for responses
+        scan_all: Fall back to scanning all UPnP devices if nothing answers
         
     Returns:
         List of SSDP responses from discovered devices
@@ -49,21 +128,12 @@ def discover(service: str, timeout: int = 5, retries: int = 1, mx: int = 3) -> L
         return []
     
     try:
-        logger.debug(f"Starting SSDP discovery for {service}")
-        
-        # Scan for all devices using netdisco
-        devices = netdisco_ssdp.scan()
+        logger.debug("Starting SSDP discovery for %s", service)
         
-        # Filter for the requested service
-        matching_devices = []
-        for device in devices:
-            if hasattr(device, 'st') and service.lower() in str(device.st).lower():
-                matching_devices.append(SSDPResponse(
-                    location=getattr(device, 'location', ''),
-                    usn=getattr(device, 'usn', ''),
-                    st=getattr(device, 'st', ''),
-                    cache='0'
-                ))
+        matching_devices = list(iter_discover(service, timeout=timeout, mx=mx))
+        if not matching_devices and scan_all:
+            logger.debug(f"No answer to targeted search for {service}, scanning all devices")
+            matching_devices = _scan_all(service.lower())
         
         logger.info(f"SSDP discovery found {len(matching_devices)} devices for {service}")
         return matching_devices
@@ -73,44 +143,64 @@ def discover(service: str, timeout: int = 5, retries: int = 1, mx: int = 3) -> L
         return []
 
 
-def scan_network(wait: float = 0.3) -> List[SSDPResponse]:
+def scan_network(wait: float = 0.3, quiet: float = ssdp_custom.DEFAULT_QUIET,
+                 scan_all: bool = False) -> List[SSDPResponse]:
     """
     Scan network for Samsung TVs using SSDP discovery.
+
+    Searches for the Samsung RemoteControlReceiver ST only. Once the one
+    second TVs may delay their answer (MX: 1) is over, the search stops
+    when no new TV has answered for the quiet period, or after wait + 1
+    seconds.
     
     Args:
-        wait: Initial timeout for discovery in seconds (not used by netdisco)
+        wait: Initial timeout for discovery in seconds
+        quiet: Seconds without a new TV that end the search early
+        scan_all: Fall back to a netdisco scan of all devices if no TV answers
         
     Returns:
         List of SSDP responses from discovered Samsung TVs
     """
     logger = logging.getLogger(__name__)
     
-    try:
-        logger.debug(f"Starting network scan for Samsung TVs")
+    with tracing.span('ssdp.scan_network', wait=wait) as span:
+        try:
+            logger.debug("Starting network scan for Samsung TVs")
         
-        # Use netdisco to scan for all devices
-        devices = netdisco_ssdp.scan()
+            # TVs delay their answer by up to MX seconds, keep listening past it
+            samsung_devices = list(iter_discover(
+                ssdp_custom.SAMSUNG_ST, timeout=wait + 1, mx=1, quiet=quiet
+            ))
+            if not samsung_devices and scan_all:
+                logger.debug("No answer to targeted search, scanning all devices")
+                samsung_devices = _scan_all('samsung')
         
-        # Filter for Samsung TVs
-        samsung_devices = []
-        for device in devices:
-            if hasattr(device, 'st') and 'samsung' in str(device.st).lower():
-                samsung_devices.append(SSDPResponse(
-                    location=getattr(device, 'location', ''),
-                    usn=getattr(device, 'usn', ''),
-                    st=getattr(device, 'st', ''),
-                    cache='0'
-                ))
-        
-        logger.info(f"Network scan completed, found {len(samsung_devices)} Samsung TVs")
-        return samsung_devices
+            logger.info(f"Network scan completed, found {len(samsung_devices)} Samsung TVs")
+            span.set('devices', len(samsung_devices))
+            return samsung_devices
 
-    except KeyboardInterrupt:
-        logger.info('Search interrupted by user')
-        return []
-    except Exception as e:
-        logger.error(f"Network scan failed: {e}")
-        return []
+        except KeyboardInterrupt:
+            logger.info('Search interrupted by user')
+            return []
+        except Exception as e:
+            logger.error(f"Network scan failed: {e}")
+            return []
+
+
+def iter_scan_network(wait: float = 2.0, networks: Optional[Iterable[str]] = None) -> Iterator[SSDPResponse]:
+    """
+    Yield Samsung TVs as their SSDP responses arrive.
+
+    Args:
+        wait: Discovery timeout in seconds
+        networks: CIDR ranges to sweep with unicast instead of multicast discovery
+
+    Yields:
+        SSDP responses from discovered Samsung TVs
+    """
+    if networks:
+        return ssdp_custom.iter_sweep(networks)
+    return iter_discover(ssdp_custom.SAMSUNG_ST, timeout=wait)
 
 
 # Fallback to custom implementation if netdisco is not available
@@ -123,3 +213,75 @@ if not NETDISCO_AVAILABLE:
         logging.info("Using custom SSDP implementation as fallback")
     except ImportError:
         logging.error("No SSDP implementation available")
+
+
+def sweep_network(networks: Iterable[str], timeout: float = 0.5) -> List[SSDPResponse]:
+    """
+    Find Samsung TVs by probing every host in the given ranges with unicast.
+
+    Use on networks where multicast is blocked and scan_network finds nothing.
+
+    Args:
+        networks: CIDR ranges (e.g., '10.1.0.0/22') or single addresses
+        timeout: Per-batch wait for answers in seconds
+
+    Returns:
+        List of SSDP responses from discovered Samsung TVs
+    """
+    logger = logging.getLogger(__name__)
+
+    try:
+        samsung_devices = [
+            SSDPResponse(
+                location=response.location,
+                usn=response.usn,
+                st=response.st,
+                cache=response.cache
+            )
+            for response in ssdp_custom.iter_sweep(networks, timeout=timeout)
+        ]
+        logger.info(f"Network sweep completed, found {len(samsung_devices)} Samsung TVs")
+        return samsung_devices
+
+    except ValueError as e:
+        logger.error(f"Invalid network range: {e}")
+        return []
+    except KeyboardInterrupt:
+        logger.info('Search interrupted by user')
+        return []
+    except Exception as e:
+        logger.error(f"Network sweep failed: {e}")
+        return []
+
+
+def cached_scan(wait: float = 0.3, use_cache: bool = True,
+                networks: Optional[Iterable[str]] = None) -> List:
+    """
+    Scan network for Samsung TVs, answering from the discovery cache if possible.
+
+    Args:
+        wait: Initial timeout for discovery in seconds
+        use_cache: Consult the on-disk cache before sending any multicast
+        networks: CIDR ranges to sweep with unicast instead of multicast
+            discovery; the cache is not consulted, as it may hold TVs from
+            other segments
+
+    Returns:
+        List of cached devices or SSDP responses from discovered Samsung TVs
+    """
+    logger = logging.getLogger(__name__)
+
+    if use_cache and not networks:
+        cached = ssdpcache.load()
+        if cached:
+            logger.debug("Using %d Samsung TVs from discovery cache", len(cached))
+            return cached
+
+    mode = 'sweep' if networks else 'multicast'
+    started = time.monotonic()
+    tvs_found = sweep_network(networks) if networks else scan_network(wait=wait)
+    DISCOVERY_SECONDS.observe(time.monotonic() - started, mode)
+    DISCOVERED_DEVICES.set(len(tvs_found), mode)
+    if tvs_found:
+        ssdpcache.store(tvs_found)
+    return tvs_found
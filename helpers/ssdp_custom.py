@@ -7,58 +7,231 @@ Based on work by Dan Krause (2014) and Adam Baxter (2016).
 Licensed under the Apache License, Version 2.0
 """
 
+import ipaddress
 import socket
-import http.client
-import io
+import selectors
 import logging
-from typing import List, Optional
+import time
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from helpers import ssdpcache, tracing
+
+try:
+    import ifaddr
+    IFADDR_AVAILABLE = True
+except ImportError:
+    IFADDR_AVAILABLE = False
+
+
+SSDP_GROUP = ("239.255.255.250", 1900)
+SAMSUNG_ST = "urn:samsung.com:device:RemoteControlReceiver:1"
+
+# Largest possible UDP payload over IPv4
+MAX_DATAGRAM = 65507
+
+# Seconds without a new device that end a scan once one TV has answered
+DEFAULT_QUIET = 0.25
+
+
+# Headers kept by parse_headers, keyed by lower-cased name
+_WANTED_HEADERS = {
+    b'location': 'location',
+    b'usn': 'usn',
+    b'st': 'st',
+    b'nt': 'nt',
+    b'nts': 'nts',
+    b'cache-control': 'cache-control',
+}
+_WANTED_LENGTHS = frozenset(len(name) for name in _WANTED_HEADERS)
+
+
+def parse_headers(data, start_line: bytes = b'HTTP/', length: Optional[int] = None) -> Dict[str, str]:
+    """
+    Extract the SSDP headers of interest from a raw datagram.
+
+    Only LOCATION, USN, ST, NT, NTS and CACHE-CONTROL are decoded; every
+    other header is skipped after a length check, without being copied.
+    Values are sliced from a memoryview of the datagram and decoded once.
+
+    Args:
+        data: Datagram as bytes or bytearray
+        start_line: Expected prefix of the first line (b'HTTP/' or b'NOTIFY ')
+        length: Number of valid bytes in data (defaults to all of it)
+
+    Returns:
+        Dictionary of lower-cased header name to value
+
+    Raises:
+        ValueError: If the first line does not start with start_line
+    """
+    end = len(data) if length is None else length
+    if not data.startswith(start_line, 0, end):
+        raise ValueError(f"Not an SSDP message: {bytes(data[:32])!r}")
+
+    view = memoryview(data)
+    headers: Dict[str, str] = {}
+    pos = data.find(b'\n', 0, end) + 1
+    while 0 < pos < end:
+        eol = data.find(b'\n', pos, end)
+        if eol < 0:
+            eol = end
+        line_end = eol - 1 if eol > pos and data[eol - 1] == 0x0d else eol
+        if line_end == pos:
+            break  # Blank line ends the header block
+
+        colon = data.find(b':', pos, line_end)
+        if colon - pos in _WANTED_LENGTHS:
+            name = _WANTED_HEADERS.get(bytes(view[pos:colon]).lower())
+            if name is not None and name not in headers:
+                value_start = colon + 1
+                while value_start < line_end and data[value_start] in (0x20, 0x09):
+                    value_start += 1
+                value_end = line_end
+                while value_end > value_start and data[value_end - 1] in (0x20, 0x09):
+                    value_end -= 1
+                headers[name] = str(view[value_start:value_end], 'iso-8859-1')
+
+        pos = eol + 1
+    return headers
 
 
 class SSDPResponse:
     """Represents an SSDP response from a network device."""
-    
-    class _FakeSocket(io.BytesIO):
-        """Fake socket implementation for HTTP response parsing."""
-        def makefile(self, *args, **kw):
-            return self
 
-    def __init__(self, response: bytes):
+    __slots__ = ('location', 'usn', 'st', 'cache', 'nt', 'nts', 'interface')
+
+    def __init__(self, response: bytes, length: Optional[int] = None):
         """
         Initialize SSDP response from raw response data.
         
         Args:
             response: Raw SSDP response bytes
+            length: Number of valid bytes in response (defaults to all of it)
         """
-        r = http.client.HTTPResponse(self._FakeSocket(response))
-        r.begin()
-        
-        self.location = r.getheader("location")
-        self.usn = r.getheader("usn")
-        self.st = r.getheader("st")
-        
-        cache_control = r.getheader("cache-control")
-        self.cache = cache_control.split("=")[1] if cache_control else "0"
+        self._load(parse_headers(response, b'HTTP/', length))
+
+    def _load(self, headers: Dict[str, str]) -> None:
+        self.location = headers.get("location")
+        self.usn = headers.get("usn")
+        self.st = headers.get("st")
+        self.cache = str(ssdpcache.parse_max_age(headers.get("cache-control")))
+
+        # Only present on NOTIFY announcements
+        self.nt = headers.get("nt")
+        self.nts = headers.get("nts")
+
+        # Local interface address the response arrived on, set by discovery
+        self.interface: Optional[str] = None
+
+    @classmethod
+    def from_notify(cls, message: bytes, length: Optional[int] = None) -> 'SSDPResponse':
+        """
+        Parse an SSDP NOTIFY announcement.
+
+        NOTIFY messages carry a request line instead of a status line and
+        use NT in place of ST; both are mapped onto a regular response.
+
+        Args:
+            message: Raw NOTIFY datagram
+            length: Number of valid bytes in message (defaults to all of it)
+
+        Returns:
+            SSDPResponse with st taken from NT and nts set
+        """
+        response = cls.__new__(cls)
+        response._load(parse_headers(message, b'NOTIFY ', length))
+        if response.st is None:
+            response.st = response.nt
+        return response
 
     def __repr__(self) -> str:
         return f"<SSDPResponse({self.location}, {self.st}, {self.usn})>"
 
 
-def discover(service: str, timeout: int = 5, retries: int = 1, mx: int = 3) -> List[SSDPResponse]:
+def local_interfaces() -> List[str]:
     """
-    Discover SSDP services on the network.
-    
+    List the IPv4 addresses of the local network interfaces.
+
+    Uses ifaddr when available and falls back to the addresses the host
+    name resolves to. Loopback addresses are excluded.
+
+    Returns:
+        Interface IPv4 addresses, empty if none could be determined
+    """
+    logger = logging.getLogger(__name__)
+
+    addresses = []
+    if IFADDR_AVAILABLE:
+        for adapter in ifaddr.get_adapters():
+            for ip in adapter.ips:
+                if ip.is_IPv4 and not ip.ip.startswith('127.'):
+                    addresses.append(ip.ip)
+    else:
+        try:
+            addresses = [
+                ip for ip in socket.gethostbyname_ex(socket.gethostname())[2]
+                if not ip.startswith('127.')
+            ]
+        except OSError as e:
+            logger.debug(f"Could not resolve local addresses: {e}")
+
+    # Keep order but drop duplicates (aliases on the same interface)
+    return list(dict.fromkeys(addresses))
+
+
+def _open_socket(interface: Optional[str]) -> socket.socket:
+    """Create a UDP socket that sends multicast out of the given interface."""
+    sock = socket.socket(
+        socket.AF_INET,
+        socket.SOCK_DGRAM,
+        socket.IPPROTO_UDP
+    )
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 2)
+        if interface:
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, socket.inet_aton(interface))
+            sock.bind((interface, 0))
+        sock.setblocking(False)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def iter_discover(service: str, timeout: float = 5, retries: int = 1, mx: int = 3,
+                  interfaces: Optional[Iterable[str]] = None,
+                  quiet: Optional[float] = None) -> Iterator[SSDPResponse]:
+    """
+    Discover SSDP services on the network, yielding responses as they arrive.
+
+    One socket is opened per interface and the M-SEARCH is sent on all of
+    them at once; responses are read from whichever socket is ready. Each
+    device is yielded once, keyed by location, with its interface attribute
+    set to the local address it answered on. Sockets are closed as soon as
+    the caller stops iterating, so callers that only need the first match
+    do not wait out the discovery window.
+
+    Each attempt ends after timeout seconds at the latest. If quiet is set,
+    it also ends once quiet seconds pass without a new device after the
+    first one has answered. Devices may delay their answer by up to mx
+    seconds, so the quiet period never ends an attempt before mx seconds
+    have passed since the search was sent.
+
     Args:
         service: Service type to search for
-        timeout: Socket timeout in seconds
+        timeout: Hard cap on each discovery attempt in seconds
         retries: Number of discovery attempts
         mx: Maximum wait time for responses
-        
-    Returns:
-        List of SSDP responses from discovered devices
+        interfaces: Local IPv4 addresses to search from (None for the default route)
+        quiet: Quiet period in seconds that ends the attempt early (None to disable)
+
+    Yields:
+        SSDP responses from discovered devices
     """
     logger = logging.getLogger(__name__)
     
-    group = ("239.255.255.250", 1900)
+    group = SSDP_GROUP
     message = "\r\n".join([
         'M-SEARCH * HTTP/1.1',
         'HOST: {0}:{1}',
@@ -68,87 +241,254 @@ def discover(service: str, timeout: int = 5, retries: int = 1, mx: int = 3) -> L
         '',
         ''
     ])
+    message_bytes = message.format(
+        *group, st=service, mx=mx
+    ).encode('utf-8')
     
-    socket.setdefaulttimeout(timeout)
-    responses = {}
+    interfaces = list(interfaces) if interfaces else [None]
+    seen = set()
+    # Reused for every datagram; parsed values are copied out as str
+    buffer = bytearray(MAX_DATAGRAM)
     
     for attempt in range(retries):
+        selector = selectors.DefaultSelector()
         try:
-            sock = socket.socket(
-                socket.AF_INET,
-                socket.SOCK_DGRAM,
-                socket.IPPROTO_UDP
-            )
-            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 2)
-            
-            message_bytes = message.format(
-                *group, st=service, mx=mx
-            ).encode('utf-8')
+            for interface in interfaces:
+                try:
+                    sock = _open_socket(interface)
+                except OSError as e:
+                    logger.warning(f"Cannot open SSDP socket on {interface or 'default route'}: {e}")
+                    continue
+                try:
+                    sock.sendto(message_bytes, group)
+                except OSError as e:
+                    logger.warning(f"Cannot send SSDP discovery on {interface or 'default route'}: {e}")
+                    sock.close()
+                    continue
+                selector.register(sock, selectors.EVENT_READ, interface)
             
-            sock.sendto(message_bytes, group)
-            logger.debug(f"Sent SSDP discovery for {service} (attempt {attempt + 1})")
+            if not selector.get_map():
+                logger.error(f"SSDP discovery attempt {attempt + 1} failed: no usable interface")
+                continue
+            logger.debug(
+                f"Sent SSDP discovery for {service} on {len(selector.get_map())} "
+                f"interface(s) (attempt {attempt + 1})"
+            )
+
+            sent = time.monotonic()
+            deadline = sent + timeout
+            last_new: Optional[float] = None
+            while selector.get_map():
+                now = time.monotonic()
+                remaining = deadline - now
+                if quiet is not None and last_new is not None:
+                    # The quiet timer only runs once every device had its MX window
+                    remaining = min(remaining, max(last_new, sent + mx) + quiet - now)
+                if remaining <= 0:
+                    break
+
+                events = selector.select(remaining)
+
+                for key, _ in events:
+                    sock, interface = key.fileobj, key.data
+                    try:
+                        length = sock.recv_into(buffer)
+                    except BlockingIOError:
+                        continue
+                    except OSError as e:
+                        logger.warning(f"SSDP socket on {interface or 'default route'} failed: {e}")
+                        selector.unregister(sock)
+                        sock.close()
+                        continue
 
+                    # A bad datagram must not cut discovery short for everyone else
+                    try:
+                        response = SSDPResponse(buffer, length)
+                    except Exception as e:
+                        logger.warning(f"Error processing SSDP response: {e}")
+                        continue
+
+                    if not response.location or response.location in seen:
+                        continue
+                    seen.add(response.location)
+                    last_new = time.monotonic()
+                    response.interface = interface
+                    logger.debug("Received response from %s via %s", response.location, interface or 'default route')
+                    yield response
+                    
+        except Exception as e:
+            logger.error(f"SSDP discovery attempt {attempt + 1} failed: {e}")
+        finally:
+            for key in list(selector.get_map().values()):
+                key.fileobj.close()
+            selector.close()
+
+
+def iter_sweep(networks: Iterable[str], service: str = SAMSUNG_ST, timeout: float = 0.5,
+               batch: int = 256) -> Iterator[SSDPResponse]:
+    """
+    Discover devices by sending a unicast M-SEARCH to every host in a range.
+
+    For networks where switches drop multicast. Hosts are probed in batches
+    of at most batch addresses; each batch waits up to timeout seconds for
+    answers (responses to earlier probes are still accepted) before the
+    next one is sent, bounding both the packets in flight and the time a
+    silent host can cost. A /22 with the defaults takes about two seconds.
+
+    Args:
+        networks: CIDR ranges (e.g., '10.1.0.0/22') or single addresses
+        service: Service type to search for
+        timeout: Per-batch wait for answers in seconds
+        batch: Maximum number of hosts probed at once
+
+    Yields:
+        SSDP responses from discovered devices, each yielded once
+
+    Raises:
+        ValueError: If a network is not a valid IPv4 address or range
+    """
+    logger = logging.getLogger(__name__)
+
+    hosts = []
+    for network in networks:
+        net = ipaddress.IPv4Network(network, strict=False)
+        hosts.extend(str(host) for host in (net.hosts() if net.num_addresses > 1 else [net.network_address]))
+    if not hosts:
+        return
+
+    # No MX header: unicast searches are answered right away (UDA 1.1),
+    # whereas an MX would let TVs reply after the batch stopped listening
+    message = "\r\n".join([
+        'M-SEARCH * HTTP/1.1',
+        'HOST: {host}:{port}',
+        'MAN: "ssdp:discover"',
+        'ST: {st}',
+        '',
+        ''
+    ])
+    port = SSDP_GROUP[1]
+    seen = set()
+    buffer = bytearray(MAX_DATAGRAM)
+
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    try:
+        logger.debug("Sweeping %d hosts for %s", len(hosts), service)
+        for start in range(0, len(hosts), batch):
+            for host in hosts[start:start + batch]:
+                try:
+                    sock.sendto(message.format(host=host, port=port, st=service).encode('utf-8'), (host, port))
+                except OSError as e:
+                    logger.debug(f"Cannot probe {host}: {e}")
+
+            deadline = time.monotonic() + timeout
             while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                sock.settimeout(remaining)
                 try:
-                    response = SSDPResponse(sock.recv(1024))
-                    responses[response.location] = response
-                    logger.debug(f"Received response from {response.location}")
+                    length = sock.recv_into(buffer)
                 except socket.timeout:
                     break
+                except OSError as e:
+                    # ICMP unreachable from a probed host surfaces here on some systems
+                    logger.debug(f"Ignoring socket error during sweep: {e}")
+                    continue
+
+                try:
+                    response = SSDPResponse(buffer, length)
                 except Exception as e:
                     logger.warning(f"Error processing SSDP response: {e}")
-                    break
-                    
-        except Exception as e:
-            logger.error(f"SSDP discovery attempt {attempt + 1} failed: {e}")
-        finally:
-            try:
-                sock.close()
-            except:
-                pass
+                    continue
+
+                if not response.location or response.location in seen:
+                    continue
+                seen.add(response.location)
+                logger.debug("Received response from %s", response.location)
+                yield response
+    finally:
+        sock.close()
+
+
+def discover(service: str, timeout: int = 5, retries: int = 1, mx: int = 3,
+             interfaces: Optional[Iterable[str]] = None,
+             quiet: Optional[float] = None) -> List[SSDPResponse]:
+    """
+    Discover SSDP services on the network.
     
+    Args:
+        service: Service type to search for
+        timeout: Hard cap on each discovery attempt in seconds
+        retries: Number of discovery attempts
+        mx: Maximum wait time for responses
+        interfaces: Local IPv4 addresses to search from (None for the default route)
+        quiet: Quiet period in seconds that ends an attempt early (None to disable)
+        
+    Returns:
+        List of SSDP responses from discovered devices
+    """
+    logger = logging.getLogger(__name__)
+
+    responses = list(iter_discover(
+        service, timeout=timeout, retries=retries, mx=mx, interfaces=interfaces, quiet=quiet
+    ))
+
     logger.info(f"SSDP discovery found {len(responses)} devices")
-    return list(responses.values())
+    return responses
 
 
-def scan_network(wait: float = 0.3) -> List[SSDPResponse]:
+def scan_network(wait: float = 0.3, quiet: float = DEFAULT_QUIET) -> List[SSDPResponse]:
     """
     Scan network for Samsung TVs using SSDP discovery.
+
+    The search is sent on every local interface in parallel, so TVs on
+    all attached segments are found in a single scan. TVs are asked to
+    answer within one second (MX: 1); once that second is over, the scan
+    stops when no new TV has answered for the quiet period, or after
+    wait + 1 seconds at most.
     
     Args:
         wait: Initial timeout for discovery in seconds
+        quiet: Seconds without a new TV that end the scan early
         
     Returns:
         List of SSDP responses from discovered Samsung TVs
     """
     logger = logging.getLogger(__name__)
     
-    try:
-        logger.debug(f"Starting network scan with {wait}s timeout")
-        
-        tvs_found = discover(
-            "urn:samsung.com:device:RemoteControlReceiver:1",
-            timeout=wait
-        )
+    with tracing.span('ssdp.scan_network', wait=wait) as span:
+        try:
+            logger.debug("Starting network scan with %ss limit", wait + 1)
         
-        if not tvs_found:
-            logger.debug(f"No TVs found with {wait}s timeout, trying with {wait + 1}s")
-            # Try again with higher timeout
             tvs_found = discover(
-                "urn:samsung.com:device:RemoteControlReceiver:1",
-                timeout=wait + 1
+                SAMSUNG_ST, timeout=wait + 1, mx=1,
+                interfaces=local_interfaces(), quiet=quiet
             )
         
-        logger.info(f"Network scan completed, found {len(tvs_found)} Samsung TVs")
-        return tvs_found
-
-    except KeyboardInterrupt:
-        logger.info('Search interrupted by user')
-        return []
-    except Exception as e:
-        logger.error(f"Network scan failed: {e}")
-        return []
+            logger.info(f"Network scan completed, found {len(tvs_found)} Samsung TVs")
+            span.set('devices', len(tvs_found))
+            return tvs_found
+
+        except KeyboardInterrupt:
+            logger.info('Search interrupted by user')
+            return []
+        except Exception as e:
+            logger.error(f"Network scan failed: {e}")
+            return []
+
+
+def iter_scan_network(wait: float = 2.0) -> Iterator[SSDPResponse]:
+    """
+    Yield Samsung TVs as their SSDP responses arrive on any local interface.
+
+    Args:
+        wait: Discovery timeout in seconds
+
+    Yields:
+        SSDP responses from discovered Samsung TVs
+    """
+    return iter_discover(SAMSUNG_ST, timeout=wait, interfaces=local_interfaces())
+
 
 # Example:
 # import ssdp
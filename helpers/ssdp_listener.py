@@ -0,0 +1,163 @@
+"""
+SSDP Passive Listener Module
+
+Listens for SSDP NOTIFY announcements (ssdp:alive / ssdp:byebye) on the
+multicast group and keeps a live registry of Samsung TVs, so long-running
+controllers can look up devices without paying the M-SEARCH latency.
+"""
+
+import logging
+import socket
+import struct
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from helpers.ssdp_custom import SSDPResponse, SSDP_GROUP, SAMSUNG_ST, MAX_DATAGRAM
+
+
+# max-age assumed for announcements that do not advertise one
+DEFAULT_MAX_AGE = 1800
+
+
+class DeviceRegistry:
+    """Thread-safe registry of announced devices keyed by USN."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._devices: Dict[str, Tuple[SSDPResponse, float]] = {}
+
+    def update(self, response: SSDPResponse) -> None:
+        """Add or refresh a device from an ssdp:alive announcement."""
+        max_age = int(response.cache) or DEFAULT_MAX_AGE
+        with self._lock:
+            self._devices[response.usn] = (response, time.time() + max_age)
+
+    def remove(self, usn: str) -> None:
+        """Drop a device after an ssdp:byebye announcement."""
+        with self._lock:
+            self._devices.pop(usn, None)
+
+    def get(self, usn: str) -> Optional[SSDPResponse]:
+        """Return the live device with the given USN, if any."""
+        with self._lock:
+            entry = self._devices.get(usn)
+        if entry is None or entry[1] <= time.time():
+            return None
+        return entry[0]
+
+    def devices(self) -> List[SSDPResponse]:
+        """Return all devices whose announcement has not expired."""
+        now = time.time()
+        with self._lock:
+            expired = [usn for usn, (_, expires) in self._devices.items() if expires <= now]
+            for usn in expired:
+                del self._devices[usn]
+            return [response for response, _ in self._devices.values()]
+
+    def __len__(self) -> int:
+        return len(self.devices())
+
+
+class NotifyListener(threading.Thread):
+    """
+    Background thread that feeds SSDP NOTIFY messages into a DeviceRegistry.
+
+    Example:
+        listener = NotifyListener()
+        listener.start()
+        ...
+        tvs = listener.registry.devices()
+        listener.stop()
+    """
+
+    def __init__(self, registry: Optional[DeviceRegistry] = None,
+                 service: str = SAMSUNG_ST, poll_interval: float = 0.5):
+        """
+        Args:
+            registry: Registry to update (a new one is created if omitted)
+            service: Only announcements whose NT contains this string are kept
+            poll_interval: How often the thread checks for stop() in seconds
+        """
+        super().__init__(name='ssdp-notify-listener', daemon=True)
+        self.registry = registry if registry is not None else DeviceRegistry()
+        self.service = service.lower()
+        self.poll_interval = poll_interval
+        self._stop_event = threading.Event()
+        self._sock: Optional[socket.socket] = None
+
+    def _open_socket(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if hasattr(socket, 'SO_REUSEPORT'):
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+            except OSError:
+                pass
+        sock.bind(('', SSDP_GROUP[1]))
+        membership = struct.pack('4sl', socket.inet_aton(SSDP_GROUP[0]), socket.INADDR_ANY)
+        sock.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, membership)
+        sock.settimeout(self.poll_interval)
+        return sock
+
+    def handle(self, data: bytes, length: Optional[int] = None) -> None:
+        """
+        Apply one datagram to the registry.
+
+        Non-NOTIFY traffic (e.g., other hosts' M-SEARCH requests) and
+        announcements for other services are ignored.
+
+        Args:
+            data: Datagram as bytes or bytearray
+            length: Number of valid bytes in data (defaults to all of it)
+        """
+        logger = logging.getLogger(__name__)
+
+        if not data.startswith(b'NOTIFY', 0, len(data) if length is None else length):
+            return
+        try:
+            response = SSDPResponse.from_notify(data, length)
+        except Exception as e:
+            logger.debug(f"Ignoring malformed NOTIFY: {e}")
+            return
+
+        if not response.usn or self.service not in (response.st or '').lower():
+            return
+
+        if response.nts == 'ssdp:byebye':
+            self.registry.remove(response.usn)
+            logger.debug(f"Device left: {response.usn}")
+        elif response.nts == 'ssdp:alive' and response.location:
+            self.registry.update(response)
+            logger.debug(f"Device alive: {response.location}")
+
+    def run(self) -> None:
+        logger = logging.getLogger(__name__)
+
+        try:
+            self._sock = self._open_socket()
+        except OSError as e:
+            logger.error(f"Failed to listen for SSDP announcements: {e}")
+            return
+
+        logger.debug(f"Listening for SSDP announcements on {SSDP_GROUP[0]}:{SSDP_GROUP[1]}")
+        buffer = bytearray(MAX_DATAGRAM)
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    length = self._sock.recv_into(buffer)
+                except socket.timeout:
+                    continue
+                except OSError as e:
+                    if not self._stop_event.is_set():
+                        logger.error(f"SSDP listener socket error: {e}")
+                    break
+                self.handle(buffer, length)
+        finally:
+            self._sock.close()
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop listening and wait for the thread to exit."""
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout if timeout is not None else self.poll_interval * 2)
@@ -0,0 +1,174 @@
+"""
+SSDP Discovery Cache Module
+
+Persists discovered devices on disk so repeated invocations can skip the
+multicast discovery window. Entries expire according to the max-age value
+each device advertised in its cache-control header.
+"""
+
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+
+DEFAULT_PATH = Path(os.environ.get(
+    'SAMSUNG_REMOTE_CACHE',
+    Path.home() / '.cache' / 'samsung_remote' / 'ssdp.json'
+))
+
+CACHE_VERSION = 1
+
+_MAX_AGE_RE = re.compile(r'max-age\s*=\s*"?(\d+)', re.IGNORECASE)
+
+
+@dataclass
+class CachedDevice:
+    """A discovered device restored from the on-disk cache."""
+    location: str
+    usn: str
+    st: str
+    cache: str = "0"
+    expires: float = 0.0
+    # Interface the device was found on; not known for cached entries
+    interface: Optional[str] = None
+
+    @property
+    def is_expired(self) -> bool:
+        return time.time() >= self.expires
+
+    def __repr__(self) -> str:
+        return f"<CachedDevice({self.location}, {self.st}, {self.usn})>"
+
+
+def parse_max_age(cache_control: Optional[str]) -> int:
+    """
+    Extract max-age from a cache-control header value.
+
+    Args:
+        cache_control: Header value (e.g., 'max-age=1800'), may be None
+
+    Returns:
+        max-age in seconds, or 0 if absent or malformed
+    """
+    if not cache_control:
+        return 0
+    m = _MAX_AGE_RE.search(cache_control)
+    return int(m.group(1)) if m else 0
+
+
+def _key(device) -> str:
+    return device.usn or device.location
+
+
+def load(path: Optional[Path] = None) -> List[CachedDevice]:
+    """
+    Load non-expired devices from the cache file.
+
+    Args:
+        path: Cache file path (defaults to DEFAULT_PATH)
+
+    Returns:
+        List of cached devices that have not yet expired
+    """
+    logger = logging.getLogger(__name__)
+    path = Path(path or DEFAULT_PATH)
+
+    try:
+        with open(path, encoding='utf-8') as cache_file:
+            data = json.load(cache_file)
+    except FileNotFoundError:
+        return []
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable SSDP cache {path}: {e}")
+        return []
+
+    if not isinstance(data, dict) or data.get('version') != CACHE_VERSION:
+        logger.debug(f"Ignoring SSDP cache {path} with unknown format")
+        return []
+
+    devices = []
+    for entry in data.get('devices', []):
+        try:
+            device = CachedDevice(**entry)
+        except TypeError:
+            continue
+        if not device.is_expired:
+            devices.append(device)
+
+    logger.debug(f"Loaded {len(devices)} devices from SSDP cache {path}")
+    return devices
+
+
+def store(responses: Iterable, path: Optional[Path] = None) -> int:
+    """
+    Merge SSDP responses into the cache file.
+
+    Responses without a positive max-age are not cached. Unexpired entries
+    already in the cache are kept unless replaced by a newer response for
+    the same USN.
+
+    Args:
+        responses: SSDP responses with location, usn, st and cache attributes
+        path: Cache file path (defaults to DEFAULT_PATH)
+
+    Returns:
+        Number of devices written to the cache
+    """
+    logger = logging.getLogger(__name__)
+    path = Path(path or DEFAULT_PATH)
+    now = time.time()
+
+    merged = {_key(device): device for device in load(path)}
+    added = 0
+    for response in responses:
+        try:
+            max_age = int(str(response.cache))
+        except (TypeError, ValueError):
+            max_age = 0
+        if max_age <= 0 or not response.location:
+            continue
+        device = CachedDevice(
+            location=str(response.location),
+            usn=str(response.usn or ''),
+            st=str(response.st or ''),
+            cache=str(max_age),
+            expires=now + max_age
+        )
+        merged[_key(device)] = device
+        added += 1
+
+    if not added:
+        return 0
+
+    data = {
+        'version': CACHE_VERSION,
+        'devices': [asdict(device) for device in merged.values()]
+    }
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file and rename so concurrent readers never
+        # see a partially written cache
+        fd, tmp_name = tempfile.mkstemp(dir=str(path.parent), prefix='.ssdp-')
+        with os.fdopen(fd, 'w', encoding='utf-8') as tmp_file:
+            json.dump(data, tmp_file)
+        os.replace(tmp_name, path)
+    except OSError as e:
+        logger.warning(f"Failed to write SSDP cache {path}: {e}")
+        return 0
+
+    logger.debug(f"Stored {len(merged)} devices in SSDP cache {path}")
+    return len(merged)
+
+
+def clear(path: Optional[Path] = None) -> None:
+    """Remove the cache file, forcing the next lookup to use the network."""
+    try:
+        Path(path or DEFAULT_PATH).unlink()
+    except FileNotFoundError:
+        pass
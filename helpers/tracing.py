@@ -0,0 +1,200 @@
+"""
+Tracing Module
+
+Lightweight spans around discovery, description fetches, sends and macros,
+so one CLI or daemon request can be followed end to end. Spans are handed
+to registered start/end callbacks; without callbacks a span costs one
+list check. An adapter forwards spans to OpenTelemetry when it is
+installed.
+
+Example:
+    tracing.add_hook(on_end=lambda span: print(span.name, span.duration))
+    with tracing.span('tvcon.send', host='192.168.1.100') as span:
+        span.set('ok', True)
+"""
+
+import contextvars
+import logging
+import random
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+Hook = Callable[['Span'], None]
+
+
+class Span:
+    """A timed operation with attributes, linked to its parent span."""
+    __slots__ = ('name', 'attributes', 'trace_id', 'span_id', 'parent_id',
+                 'start', 'end', 'error')
+
+    def __init__(self, name: str, attributes: Dict[str, Any], parent: Optional['Span']):
+        self.name = name
+        self.attributes = attributes
+        self.trace_id = parent.trace_id if parent is not None else random.getrandbits(128)
+        self.span_id = random.getrandbits(64)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.start = time.time()
+        self.end: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def set(self, key: str, value: Any) -> None:
+        """Add or replace an attribute."""
+        self.attributes[key] = value
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Seconds between start and end, once the span has ended."""
+        return None if self.end is None else self.end - self.start
+
+
+class _NullSpan:
+    """Stand-in used when no hook is registered."""
+    __slots__ = ()
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+_hooks: List[Tuple[Optional[Hook], Optional[Hook]]] = []
+_current: contextvars.ContextVar = contextvars.ContextVar('samsung_remote_span', default=None)
+
+
+def add_hook(on_start: Optional[Hook] = None, on_end: Optional[Hook] = None) -> Tuple:
+    """
+    Register callbacks run when spans start and end.
+
+    Callbacks run in the thread doing the work and must be quick;
+    exceptions they raise are logged and ignored.
+
+    Returns:
+        Handle to pass to remove_hook
+    """
+    hook = (on_start, on_end)
+    _hooks.append(hook)
+    return hook
+
+
+def remove_hook(hook: Tuple) -> None:
+    """Unregister callbacks added with add_hook."""
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def _run(index: int, span: Span) -> None:
+    for hook in list(_hooks):
+        callback = hook[index]
+        if callback is None:
+            continue
+        try:
+            callback(span)
+        except Exception as e:
+            logging.getLogger(__name__).debug(f"Tracing hook failed on {span.name}: {e}")
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Any]:
+    """
+    Trace the enclosed block as a child of the current span.
+
+    An exception escaping the block is recorded as the span error (a
+    SystemExit with status 0 is not an error) and re-raised.
+    """
+    if not _hooks:
+        yield _NULL_SPAN
+        return
+
+    current = Span(name, attributes, _current.get())
+    token = _current.set(current)
+    _run(0, current)
+    try:
+        yield current
+    except SystemExit as e:
+        if e.code not in (None, 0):
+            current.error = f"exit status {e.code}"
+        raise
+    except BaseException as e:
+        current.error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        current.end = time.time()
+        _current.reset(token)
+        _run(1, current)
+
+
+def bind(function: Callable) -> Callable:
+    """
+    Make spans started by function (e.g. in a worker thread) children of
+    the span current at the time of the call to bind.
+    """
+    parent = _current.get()
+
+    def run(*args, **kwargs):
+        token = _current.set(parent)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _current.reset(token)
+    return run
+
+
+def log_spans(level: int = logging.DEBUG) -> Tuple:
+    """Log every finished span with its trace and parent IDs and attributes."""
+    logger = logging.getLogger(__name__)
+
+    def on_end(finished: Span) -> None:
+        if not logger.isEnabledFor(level):
+            return
+        parent = f"{finished.parent_id:016x}" if finished.parent_id is not None else '-'
+        status = f" error={finished.error!r}" if finished.error else ''
+        attributes = ' '.join(f"{key}={value!r}" for key, value in finished.attributes.items())
+        logger.log(level, "span %s %.1fms trace=%032x span=%016x parent=%s %s%s",
+                   finished.name, finished.duration * 1000, finished.trace_id,
+                   finished.span_id, parent, attributes, status)
+    return add_hook(on_end=on_end)
+
+
+def use_opentelemetry(tracer_provider: Any = None) -> Optional[Tuple]:
+    """
+    Forward spans to OpenTelemetry if the opentelemetry-api package is installed.
+
+    Args:
+        tracer_provider: Provider to create the tracer from (defaults to the
+            globally configured one)
+
+    Returns:
+        Hook handle, or None if OpenTelemetry is not available
+    """
+    try:
+        from opentelemetry import trace
+    except ImportError:
+        return None
+
+    tracer = trace.get_tracer('samsung_remote', tracer_provider=tracer_provider)
+    spans: Dict[int, Any] = {}
+
+    def _value(value: Any) -> Any:
+        return value if isinstance(value, (bool, int, float, str)) else str(value)
+
+    def on_start(started: Span) -> None:
+        parent = spans.get(started.parent_id) if started.parent_id is not None else None
+        context = trace.set_span_in_context(parent) if parent is not None else None
+        otel_span = tracer.start_span(
+            started.name, context=context,
+            attributes={key: _value(value) for key, value in started.attributes.items()})
+        spans[started.span_id] = otel_span
+
+    def on_end(finished: Span) -> None:
+        otel_span = spans.pop(finished.span_id, None)
+        if otel_span is None:
+            return
+        for key, value in finished.attributes.items():
+            otel_span.set_attribute(key, _value(value))
+        if finished.error:
+            otel_span.set_status(trace.Status(trace.StatusCode.ERROR, finished.error))
+        otel_span.end()
+
+    return add_hook(on_start, on_end)
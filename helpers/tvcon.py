@@ -8,8 +8,45 @@ import socket
 import websocket
 import samsungctl
 import logging
+import threading
 import time
-from typing import Dict, Any
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from helpers import metrics, profiling, tracing
+from helpers.keys import KNOWN_KEYS
+
+
+SENDS = metrics.counter('samsung_remote_sends_total', 'Commands sent to TVs by outcome',
+                        ('host', 'key', 'outcome'))
+
+# SENDS label for keys and hosts that would otherwise let request input
+# create any number of series
+OTHER_LABEL = 'other'
+
+# samsungctl connects and authenticates in one step, so this covers both
+CONNECT_SECONDS = metrics.histogram('samsung_remote_connect_seconds',
+                                    'Time to connect and complete the handshake with a TV', ('method',))
+
+POOL_CONNECTIONS = metrics.gauge('samsung_remote_pool_connections', 'Open pooled TV connections')
+
+RATE_LIMIT_WAIT_SECONDS = metrics.histogram('samsung_remote_rate_limiter_wait_seconds',
+                                            'Time sends were delayed by a rate limiter')
+
+
+def _key_label(key: Any) -> str:
+    """Return the SENDS key label: the key if it is a known key, else OTHER_LABEL."""
+    return key if key in KNOWN_KEYS else OTHER_LABEL
+
+
+def _samsung_config(config: Dict[str, Any]):
+    """Create a samsungctl Config object from a TV configuration dictionary."""
+    return samsungctl.Config(
+        name=config.get('name', 'python remote'),
+        host=config.get('host', ''),
+        port=config.get('port', 55000),
+        method=config.get('method', 'websocket'),
+        timeout=config.get('timeout', 0)
+    )
 
 
 def send(config: Dict[str, Any], key: str, wait_time: float = 100.0) -> bool:
@@ -25,31 +62,199 @@ def send(config: Dict[str, Any], key: str, wait_time: float = 100.0) -> bool:
         True if command was sent successfully, False otherwise
     """
     logger = logging.getLogger(__name__)
+    host = config.get('host', 'unknown')
     
-    try:
-        # Create samsungctl Config object
-        samsung_config = samsungctl.Config(
-            name=config.get('name', 'python remote'),
-            host=config.get('host', ''),
-            port=config.get('port', 55000),
-            method=config.get('method', 'websocket'),
-            timeout=config.get('timeout', 0)
-        )
+    # Clamped outside the try so a bad wait cannot fail a key that was sent
+    wait_time = max(wait_time, 0.0)
+    with tracing.span('tvcon.send', host=host, key=key, method=config.get('method', 'websocket')) as span:
+        try:
+            samsung_config = _samsung_config(config)
         
-        with samsungctl.Remote(samsung_config) as remote:
-            # Use the control method to send commands
-            remote.control(key)
+            started = time.monotonic()
+            with profiling.phase('connect'):
+                connection = samsungctl.Remote(samsung_config)
+            with connection as remote:
+                CONNECT_SECONDS.observe(time.monotonic() - started, config.get('method', 'websocket'))
+                # Use the control method to send commands
+                with profiling.phase('send'):
+                    remote.control(key)
 
-        time.sleep(wait_time / 1000.0)
-        logger.debug(f"Successfully sent command '{key}' to {config.get('host', 'unknown')}")
-        return True
+            with profiling.phase('sleep'):
+                time.sleep(wait_time / 1000.0)
+            SENDS.inc(host, _key_label(key), 'ok')
+            logger.debug("Successfully sent command '%s' to %s", key, host)
+            span.set('ok', True)
+            return True
 
-    except socket.error as e:
-        logger.error(f"Socket error sending command '{key}': {e}")
-        return False
-    except websocket._exceptions.WebSocketConnectionClosedException as e:
-        logger.error(f"WebSocket connection error: {e}. Try using legacy mode (-l)")
-        return False
-    except Exception as e:
-        logger.error(f"Unexpected error sending command '{key}': {e}")
+        except socket.error as e:
+            logger.error(f"Socket error sending command '{key}': {e}")
+        except websocket._exceptions.WebSocketConnectionClosedException as e:
+            logger.error(f"WebSocket connection error: {e}. Try using legacy mode (-l)")
+        except Exception as e:
+            logger.error(f"Unexpected error sending command '{key}': {e}")
+        SENDS.inc(host, _key_label(key), 'error')
+        span.set('ok', False)
         return False
+
+
+class _PooledRemote:
+    """An open remote and the lock serializing its use."""
+    __slots__ = ('remote', 'lock')
+
+    def __init__(self):
+        self.remote = None
+        self.lock = threading.Lock()
+
+    def discard(self) -> None:
+        remote, self.remote = self.remote, None
+        if remote is not None:
+            POOL_CONNECTIONS.dec()
+            try:
+                remote.close()
+            except Exception:
+                pass
+
+
+class RemotePool:
+    """
+    Keeps one open samsungctl remote per TV so repeated sends skip the
+    connect and authentication handshake.
+
+    Sends to the same TV are serialized; sends to different TVs run in
+    parallel. A connection the TV has closed is reopened once transparently.
+
+    Example:
+        pool = RemotePool()
+        pool.send(config, 'KEY_VOLUP')
+        pool.send(config, 'KEY_VOLUP')  # reuses the connection
+        pool.close()
+    """
+
+    def __init__(self, known_host: Optional[Callable[[str], bool]] = None):
+        """
+        Args:
+            known_host: Tells whether a host gets its own label in the send
+                metrics; other hosts are counted as OTHER_LABEL (None labels
+                every host)
+        """
+        self._lock = threading.Lock()
+        self._remotes: Dict[Tuple[str, str], _PooledRemote] = {}
+        self._known_host = known_host
+
+    def _host_label(self, host: str) -> str:
+        if self._known_host is None or self._known_host(host):
+            return host
+        return OTHER_LABEL
+
+    def _entry(self, config: Dict[str, Any]) -> _PooledRemote:
+        key = (config.get('host', ''), config.get('method', 'websocket'))
+        with self._lock:
+            entry = self._remotes.get(key)
+            if entry is None:
+                entry = self._remotes[key] = _PooledRemote()
+            return entry
+
+    def send(self, config: Dict[str, Any], key: str, wait_time: float = 0.0) -> bool:
+        """
+        Send a command over the pooled connection to a TV.
+
+        Args:
+            config: TV configuration dictionary
+            key: Command key to send (e.g., 'KEY_POWER', 'KEY_VOLUP')
+            wait_time: Time to wait after sending command (in milliseconds)
+
+        Returns:
+            True if command was sent successfully, False otherwise
+        """
+        logger = logging.getLogger(__name__)
+
+        with tracing.span('tvcon.send', host=config.get('host', 'unknown'), key=key,
+                          method=config.get('method', 'websocket'), pooled=True) as span:
+            entry = self._entry(config)
+
+            with entry.lock:
+                for attempt in range(2):
+                    reused = entry.remote is not None
+                    span.set('reused', reused)
+                    try:
+                        if entry.remote is None:
+                            started = time.monotonic()
+                            with profiling.phase('connect'):
+                                entry.remote = samsungctl.Remote(_samsung_config(config))
+                            CONNECT_SECONDS.observe(time.monotonic() - started, config.get('method', 'websocket'))
+                            POOL_CONNECTIONS.inc()
+                        with profiling.phase('send'):
+                            entry.remote.control(key)
+                        break
+                    except Exception as e:
+                        entry.discard()
+                        if reused and attempt == 0:
+                            logger.debug("Pooled connection to %s failed (%s), reconnecting", config.get('host', 'unknown'), e)
+                            continue
+                        logger.error(f"Failed to send command '{key}' to {config.get('host', 'unknown')}: {e}")
+                        SENDS.inc(self._host_label(config.get('host', 'unknown')), _key_label(key), 'error')
+                        span.set('ok', False)
+                        return False
+
+            SENDS.inc(self._host_label(config.get('host', 'unknown')), _key_label(key), 'ok')
+            if wait_time > 0:
+                with profiling.phase('sleep'):
+                    time.sleep(wait_time / 1000.0)
+            logger.debug("Successfully sent command '%s' to %s", key, config.get('host', 'unknown'))
+            span.set('ok', True)
+            return True
+
+    def close(self) -> None:
+        """Close all pooled connections."""
+        with self._lock:
+            entries, self._remotes = list(self._remotes.values()), {}
+        for entry in entries:
+            with entry.lock:
+                entry.discard()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(1 for entry in self._remotes.values() if entry.remote is not None)
+
+
+class RateLimiter:
+    """
+    Token bucket that paces sends to at most `rate` per second.
+
+    Unlike a fixed sleep after every key, a key that arrives after a pause
+    is sent immediately, and up to `burst` keys may go out back to back.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        """
+        Args:
+            rate: Sustained sends per second
+            burst: Sends allowed back to back after an idle period
+        """
+        if rate <= 0 or burst < 1:
+            raise ValueError('rate must be positive and burst at least 1')
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Wait until a send is allowed.
+
+        Returns:
+            Seconds spent waiting
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            delay = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            # Reserve the token now so concurrent callers queue behind us
+            self._tokens -= 1
+        RATE_LIMIT_WAIT_SECONDS.observe(delay)
+        if delay:
+            with profiling.phase('sleep'):
+                time.sleep(delay)
+        return delay
@@ -5,10 +5,35 @@ Handles retrieving and parsing TV information from Samsung TVs.
 """
 
 import re
+import time
 import xml.etree.ElementTree as ET
+import urllib.error
 import urllib.request
 import logging
-from typing import Dict, Optional
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Sequence, Union
+
+from helpers import httppool, metrics, tracing
+from helpers.desccache import DescriptionCache, DEFAULT_MAX_AGE
+from helpers.ssdpcache import parse_max_age
+
+
+# Per-request timeout for the description download in seconds
+DEFAULT_TIMEOUT = 10
+
+# Number of descriptions fetched in parallel by get_many
+DEFAULT_WORKERS = 16
+
+# Bytes read from the description per parser feed
+CHUNK_SIZE = 2048
+
+# Elements read from the device description (first occurrence wins, which
+# is the root device as embedded devices follow it in the document)
+DESCRIPTION_FIELDS = ('friendlyName', 'modelName')
+
+# Cache results: 'hit' (fresh), 'revalidated' (304), 'miss' (downloaded)
+DESCRIPTION_CACHE = metrics.counter('samsung_remote_description_cache_total',
+                                    'Device description lookups by cache result', ('result',))
 
 
 def getMethod(model: str) -> str:
@@ -51,12 +76,57 @@ def namespace(element) -> str:
     return m.group(0) if m else ''
 
 
-def get(url: str) -> Dict[str, str]:
+def parse_description(stream, chunk_size: int = CHUNK_SIZE) -> Dict[str, str]:
+    """
+    Incrementally parse a device description until all fields are found.
+    
+    The body is fed to the parser in chunks and reading stops as soon as
+    every element in DESCRIPTION_FIELDS has been seen, so long service
+    lists after the device header are never downloaded or parsed.
+    
+    Args:
+        stream: File-like object with a read(size) method returning bytes
+        chunk_size: Bytes to read per chunk
+        
+    Returns:
+        Dictionary of the fields found, mapping element name to its text
+        (an empty string for empty elements); missing fields are absent
+        
+    Raises:
+        xml.etree.ElementTree.ParseError: If the XML is malformed before
+            all fields were found
+    """
+    parser = ET.XMLPullParser(events=('end',))
+    fields: Dict[str, str] = {}
+    
+    while len(fields) < len(DESCRIPTION_FIELDS):
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            parser.close()
+            break
+        parser.feed(chunk)
+        for _, element in parser.read_events():
+            tag = element.tag.rpartition('}')[2]
+            if tag in DESCRIPTION_FIELDS and tag not in fields:
+                fields[tag] = element.text or ''
+            element.clear()
+    
+    return fields
+
+
+def get(url: str, timeout: float = DEFAULT_TIMEOUT,
+        cache: Optional[DescriptionCache] = None, usn: Optional[str] = None,
+        revalidate: bool = False) -> Dict[str, str]:
     """
     Retrieve TV information from a Samsung TV's XML endpoint.
     
     Args:
         url: URL to the TV's XML information endpoint
+        timeout: Socket timeout for the request in seconds
+        cache: Description cache to consult and update (None to always download)
+        usn: USN of the device, used to detect a different TV at a cached location
+        revalidate: Ask the TV even if the cached entry is fresh (a conditional
+            GET when validators are known), so a TV that is gone fails
         
     Returns:
         Dictionary containing TV information (friendly_name, ip, model)
@@ -68,49 +138,144 @@ def get(url: str) -> Dict[str, str]:
     """
     logger = logging.getLogger(__name__)
     
-    # Extract IP address from URL
-    ip_match = re.search(r'[0-9]+(?:\.[0-9]+){3}', url)
-    if not ip_match:
-        raise ValueError(f"Could not extract IP address from URL: {url}")
+    with tracing.span('tvinfo.get', url=url) as span:
+        # Extract IP address from URL
+        ip_match = re.search(r'[0-9]+(?:\.[0-9]+){3}', url)
+        if not ip_match:
+            raise ValueError(f"Could not extract IP address from URL: {url}")
     
-    ip = ip_match.group(0)
+        ip = ip_match.group(0)
     
-    try:
-        # Fetch XML data
-        with urllib.request.urlopen(url, timeout=10) as response:
-            xmlstr = response.read().decode('utf-8')
-        
-        # Parse XML
-        root = ET.fromstring(xmlstr)
-        ns = namespace(root)
+        cached = cache.get(url, usn) if cache is not None else None
+        if cached is not None and cached.is_fresh and not revalidate:
+            DESCRIPTION_CACHE.inc('hit')
+            span.set('cache', 'hit')
+            logger.debug(f"Using cached TV info for {url}")
+            return dict(cached.info)
+    
+        try:
+            # Fetch XML data, revalidating a stale cache entry if we have one
+            request = url
+            if cached is not None and cached.validators:
+                request = urllib.request.Request(url, headers=cached.validators)
+            try:
+                with httppool.urlopen(request, timeout=timeout) as response:
+                    fields = parse_description(response)
+                    headers = response.headers if cache is not None else None
+            except urllib.error.HTTPError as e:
+                if e.code != 304 or cached is None:
+                    raise
+                cache.refresh(url, parse_max_age(e.headers.get('Cache-Control')) or DEFAULT_MAX_AGE)
+                DESCRIPTION_CACHE.inc('revalidated')
+                span.set('cache', 'revalidated')
+                logger.debug(f"TV info for {url} not modified")
+                return dict(cached.info)
         
-        # Extract TV information
-        friendly_name_elem = root.find(f'.//{ns}friendlyName')
-        model_name_elem = root.find(f'.//{ns}modelName')
+            # Extract TV information
+            if len(fields) < len(DESCRIPTION_FIELDS):
+                raise ValueError("Required XML elements not found")
         
-        if friendly_name_elem is None or model_name_elem is None:
-            raise ValueError("Required XML elements not found")
+            friendly_name = fields['friendlyName']
+            model = fields['modelName']
         
-        friendly_name = friendly_name_elem.text
-        model = model_name_elem.text
+            if not friendly_name or not model:
+                raise ValueError("TV information is incomplete")
         
-        if not friendly_name or not model:
-            raise ValueError("TV information is incomplete")
+            logger.debug(f"Retrieved TV info: {friendly_name} ({model}) at {ip}")
         
-        logger.debug(f"Retrieved TV info: {friendly_name} ({model}) at {ip}")
+            info = {
+                'fn': friendly_name,
+                'ip': ip,
+                'model': model
+            }
+            if cache is not None:
+                DESCRIPTION_CACHE.inc('miss')
+                span.set('cache', 'miss')
+                cache.put(
+                    url, info, usn,
+                    etag=headers.get('ETag'),
+                    last_modified=headers.get('Last-Modified'),
+                    max_age=parse_max_age(headers.get('Cache-Control')) or DEFAULT_MAX_AGE
+                )
+            span.set('model', model)
+            return info
         
-        return {
-            'fn': friendly_name,
-            'ip': ip,
-            'model': model
-        }
+        except urllib.error.URLError as e:
+            logger.error(f"Failed to access URL {url}: {e}")
+            raise
+        except ET.ParseError as e:
+            logger.error(f"Failed to parse XML from {url}: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Unexpected error getting TV info from {url}: {e}")
+            raise
+
+
+def get_many(urls: Sequence[str], max_workers: int = DEFAULT_WORKERS,
+             deadline: Optional[float] = None, cache: Optional[DescriptionCache] = None,
+             usns: Optional[Sequence[Optional[str]]] = None,
+             revalidate: bool = False) -> List[Union[Dict[str, str], Exception]]:
+    """
+    Retrieve TV information from several devices concurrently.
+    
+    Args:
+        urls: URLs to the TVs' XML information endpoints
+        max_workers: Maximum number of concurrent requests
+        deadline: Overall time budget in seconds (None for no limit)
+        cache: Description cache shared by all requests and saved afterwards
+        usns: USN for each URL, if known
+        revalidate: Contact every TV even if its cached entry is fresh
         
-    except urllib.error.URLError as e:
-        logger.error(f"Failed to access URL {url}: {e}")
-        raise
-    except ET.ParseError as e:
-        logger.error(f"Failed to parse XML from {url}: {e}")
-        raise
-    except Exception as e:
-        logger.error(f"Unexpected error getting TV info from {url}: {e}")
-        raise
+    Returns:
+        One entry per URL in the same order: the dictionary returned by get(),
+        or the exception raised for that device. Devices that did not answer
+        within the deadline get a TimeoutError.
+    """
+    logger = logging.getLogger(__name__)
+    
+    if not urls:
+        return []
+    
+    timeout = DEFAULT_TIMEOUT if deadline is None else max(min(DEFAULT_TIMEOUT, deadline), 0.1)
+    
+    usns = usns or [None] * len(urls)
+    
+    if len(urls) == 1:
+        try:
+            results = [get(urls[0], timeout, cache, usns[0], revalidate)]
+        except Exception as e:
+            results = [e]
+        if cache is not None:
+            cache.save()
+        return results
+    
+    start = time.monotonic()
+    executor = ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(urls))))
+    try:
+        # Fetches traced in the workers belong to the caller's span
+        fetch = tracing.bind(get)
+        futures = [executor.submit(fetch, url, timeout, cache, usn, revalidate)
+                   for url, usn in zip(urls, usns)]
+        _, pending = wait(futures, timeout=deadline)
+    finally:
+        # Do not wait for stragglers: their socket timeout is capped by the
+        # deadline, so they finish in the background shortly afterwards
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+    
+    if cache is not None:
+        cache.save()
+    
+    results: List[Union[Dict[str, str], Exception]] = []
+    for url, future in zip(urls, futures):
+        if future in pending:
+            results.append(TimeoutError(f"No answer from {url} within {deadline:g}s"))
+        elif future.exception() is not None:
+            results.append(future.exception())
+        else:
+            results.append(future.result())
+    
+    logger.debug(f"Fetched {len(urls)} device descriptions in {time.monotonic() - start:.2f}s "
+                 f"({len(pending)} timed out)")
+    return results
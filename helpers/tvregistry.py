@@ -0,0 +1,216 @@
+"""
+TV Registry Module
+
+Indexed in-memory store of discovered TVs for controllers managing large
+fleets. Records are compact (__slots__, interned model strings) and can be
+looked up by IP, USN, friendly name, model series or subnet without
+scanning every device.
+"""
+
+import bisect
+import ipaddress
+import sys
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+
+
+class TVRecord:
+    """A TV known to the registry."""
+    __slots__ = ('ip', 'fn', 'model', 'usn', 'method')
+
+    def __init__(self, ip: str, fn: str, model: str, usn: Optional[str] = None,
+                 method: Optional[str] = None):
+        self.ip = ip
+        self.fn = fn
+        # Thousands of TVs share a handful of models
+        self.model = sys.intern(model)
+        self.usn = usn
+        self.method = method
+
+    @property
+    def series(self) -> str:
+        """Model year letter (e.g. 'F' for UN55F8000), as used by tvinfo.getMethod."""
+        return self.model[4] if len(self.model) >= 5 else ''
+
+    def as_dict(self) -> Dict[str, str]:
+        """Return the TV as a tvinfo-style dictionary (fn, ip, model[, method])."""
+        tv = {'fn': self.fn, 'ip': self.ip, 'model': self.model}
+        if self.method is not None:
+            tv['method'] = self.method
+        return tv
+
+    def __repr__(self) -> str:
+        return f"TVRecord(ip={self.ip!r}, fn={self.fn!r}, model={self.model!r})"
+
+
+def _address(ip: str) -> Optional[int]:
+    try:
+        return int(ipaddress.IPv4Address(ip))
+    except ValueError:
+        return None
+
+
+class TVRegistry:
+    """
+    Thread-safe TV store with secondary indexes.
+
+    Lookups by IP, USN, name and series are dictionary lookups; subnet
+    queries bisect a sorted list of addresses.
+
+    Example:
+        registry = TVRegistry()
+        registry.update({'fn': 'Lobby', 'ip': '10.1.0.21', 'model': 'UN55F8000'})
+        registry.in_subnet('10.1.0.0/24')
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._by_ip: Dict[str, TVRecord] = {}
+        self._by_usn: Dict[str, str] = {}
+        self._by_name: Dict[str, Set[str]] = {}
+        self._by_series: Dict[str, Set[str]] = {}
+        self._addresses: List[int] = []
+
+    @staticmethod
+    def _add_key(index: Dict[str, Set[str]], key: str, ip: str) -> None:
+        index.setdefault(key, set()).add(ip)
+
+    @staticmethod
+    def _drop_key(index: Dict[str, Set[str]], key: str, ip: str) -> None:
+        ips = index.get(key)
+        if ips is not None:
+            ips.discard(ip)
+            if not ips:
+                del index[key]
+
+    def _index(self, record: TVRecord) -> None:
+        self._add_key(self._by_name, record.fn.casefold(), record.ip)
+        self._add_key(self._by_series, record.series, record.ip)
+        if record.usn:
+            self._by_usn[record.usn] = record.ip
+
+    def _unindex(self, record: TVRecord) -> None:
+        self._drop_key(self._by_name, record.fn.casefold(), record.ip)
+        self._drop_key(self._by_series, record.series, record.ip)
+        if record.usn and self._by_usn.get(record.usn) == record.ip:
+            del self._by_usn[record.usn]
+
+    def update(self, tv: Dict[str, str], usn: Optional[str] = None,
+               method: Optional[str] = None) -> TVRecord:
+        """
+        Add a TV or refresh a known one from a discovery result.
+
+        A TV whose USN is known under another IP (e.g. after a DHCP change)
+        is moved rather than duplicated. The transport of a known TV is kept
+        unless a new one is given.
+
+        Args:
+            tv: Dictionary with 'fn', 'ip' and 'model' as returned by tvinfo.get
+            usn: Unique Service Name of the TV, if known
+            method: Transport ('legacy' or 'websocket'), if known
+
+        Returns:
+            The stored record
+        """
+        ip = tv['ip']
+        with self._lock:
+            moved_from = self._by_usn.get(usn) if usn else None
+            if moved_from is not None and moved_from != ip:
+                previous = self.remove(moved_from)
+                if method is None and previous is not None:
+                    method = previous.method
+
+            record = self._by_ip.get(ip)
+            if record is None:
+                record = TVRecord(ip, tv['fn'], tv['model'], usn, method)
+                self._by_ip[ip] = record
+                address = _address(ip)
+                if address is not None:
+                    bisect.insort(self._addresses, address)
+            else:
+                self._unindex(record)
+                record.fn = tv['fn']
+                record.model = sys.intern(tv['model'])
+                record.usn = usn or record.usn
+                if method is not None:
+                    record.method = method
+            self._index(record)
+            return record
+
+    def remove(self, ip: str) -> Optional[TVRecord]:
+        """Drop a TV; returns its record, or None if it was not known."""
+        with self._lock:
+            record = self._by_ip.pop(ip, None)
+            if record is None:
+                return None
+            self._unindex(record)
+            address = _address(ip)
+            if address is not None:
+                position = bisect.bisect_left(self._addresses, address)
+                if position < len(self._addresses) and self._addresses[position] == address:
+                    del self._addresses[position]
+            return record
+
+    def retain(self, ips: Iterable[str]) -> None:
+        """Drop every TV whose IP is not in ips."""
+        keep = set(ips)
+        with self._lock:
+            for ip in [ip for ip in self._by_ip if ip not in keep]:
+                self.remove(ip)
+
+    def set_method(self, ip: str, method: Optional[str]) -> None:
+        """Record (or with None, forget) the transport of a known TV."""
+        with self._lock:
+            record = self._by_ip.get(ip)
+            if record is not None:
+                record.method = method
+
+    def get(self, ip: str) -> Optional[TVRecord]:
+        """Return the TV with the given IP, if any."""
+        with self._lock:
+            return self._by_ip.get(ip)
+
+    def by_usn(self, usn: str) -> Optional[TVRecord]:
+        """Return the TV with the given USN, if any."""
+        with self._lock:
+            ip = self._by_usn.get(usn)
+            return self._by_ip.get(ip) if ip is not None else None
+
+    def _records(self, ips: Iterable[str]) -> List[TVRecord]:
+        return sorted((self._by_ip[ip] for ip in ips), key=lambda record: record.ip)
+
+    def by_name(self, name: str) -> List[TVRecord]:
+        """Return the TVs with the given friendly name (case-insensitive)."""
+        with self._lock:
+            return self._records(self._by_name.get(name.casefold(), ()))
+
+    def by_series(self, series: str) -> List[TVRecord]:
+        """Return the TVs of a model series, e.g. 'F'."""
+        with self._lock:
+            return self._records(self._by_series.get(series.upper(), ()))
+
+    def in_subnet(self, network: str) -> List[TVRecord]:
+        """
+        Return the TVs inside an IPv4 network, ordered by address.
+
+        Raises:
+            ValueError: If network is not a valid IPv4 address or CIDR range
+        """
+        subnet = ipaddress.IPv4Network(network, strict=False)
+        first, last = int(subnet.network_address), int(subnet.broadcast_address)
+        with self._lock:
+            start = bisect.bisect_left(self._addresses, first)
+            end = bisect.bisect_right(self._addresses, last)
+            return [self._by_ip[str(ipaddress.IPv4Address(address))]
+                    for address in self._addresses[start:end]]
+
+    def records(self) -> List[TVRecord]:
+        """Return every TV in insertion order."""
+        with self._lock:
+            return list(self._by_ip.values())
+
+    def __contains__(self, ip: str) -> bool:
+        return ip in self._by_ip
+
+    def __len__(self) -> int:
+        return len(self._by_ip)
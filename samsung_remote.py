@@ -6,14 +6,30 @@ A modern Python implementation for controlling Samsung Smart TVs via WiFi.
 """
 
 import argparse
+import ipaddress
+import itertools
 import sys
+import time
 import logging
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from contextlib import contextmanager
 
-from helpers import tvcon, macro, ssdp, tvinfo
+# Start of the run, reported by --profile
+_STARTED = time.perf_counter()
+
+from helpers import client
+
+if __name__ == "__main__":
+    # Hand the command to a running daemon before importing the TV libraries
+    _status = client.forward(sys.argv[1:])
+    if _status is not None:
+        sys.exit(_status)
+
+from helpers import tvcon, macro, ssdp, ssdpcache, desccache, tvinfo, capability, daemon, httpapi, lint, repl, inventory, logqueue, profiling, tracing
+
+profiling.record('import', time.perf_counter() - _STARTED)
 
 
 @dataclass
@@ -53,16 +69,34 @@ class TVInfo:
         return f"{self.friendly_name} ({self.model}) at {self.ip}"
 
 
-def get_tv_info(tvs_found: List, verbose: bool) -> List[TVInfo]:
-    """Retrieve TV information for discovered devices."""
+def get_tv_info(tvs_found: List, verbose: bool, max_workers: int = tvinfo.DEFAULT_WORKERS,
+                deadline: Optional[float] = tvinfo.DEFAULT_TIMEOUT,
+                cache: Optional[desccache.DescriptionCache] = None,
+                revalidate: bool = False) -> List[TVInfo]:
+    """
+    Retrieve TV information for discovered devices.
+
+    Descriptions are fetched concurrently, so an unreachable TV only delays
+    the result up to the deadline instead of stalling every device after it.
+    TVs are returned in discovery order. With a description cache, TVs seen
+    recently are answered without any HTTP request, unless revalidate is set
+    (used for devices from the SSDP cache, which may no longer be there).
+    """
     tv_list = []
-    for tv in tvs_found:
+    usns = [tv.usn or None for tv in tvs_found]
+    with profiling.phase('description fetch'):
+        results = tvinfo.get_many([tv.location for tv in tvs_found], max_workers, deadline, cache, usns,
+                                  revalidate)
+    for tv, info in zip(tvs_found, results):
         try:
-            info = tvinfo.get(tv.location)
+            if isinstance(info, Exception):
+                raise info
             tv_info = TVInfo.from_dict(info)
             tv_list.append(tv_info)
             
-            if verbose:
+            if verbose and tv.interface:
+                logging.info(f'Found: {tv_info} via {tv.interface}')
+            elif verbose:
                 logging.info(f'Found: {tv_info}')
             else:
                 logging.debug(f'Found: {tv_info}')
@@ -73,25 +107,134 @@ def get_tv_info(tvs_found: List, verbose: bool) -> List[TVInfo]:
     return tv_list
 
 
+def discover_tvs(use_cache: bool = True, networks: Optional[List[str]] = None) -> List[TVInfo]:
+    """Find Samsung TVs, preferring the discovery cache over a network scan."""
+    cache = desccache.shared() if use_cache else None
+    with profiling.phase('discovery'):
+        found = ssdp.cached_scan(use_cache=use_cache, networks=networks)
+
+    # Cached locations can go stale (TV unplugged or moved to a new address),
+    # so those TVs must answer even if their description is cached
+    from_cache = bool(found) and isinstance(found[0], ssdpcache.CachedDevice)
+    tvs = get_tv_info(found, False, cache=cache, revalidate=from_cache) if found else []
+
+    # A TV that moved to a new address would otherwise be skipped until the
+    # cache expires, so any missing answer triggers a fresh scan
+    if from_cache and len(tvs) < len(found):
+        logging.warning(f'{len(found) - len(tvs)} of {len(found)} cached TVs did not respond, '
+                        f'rescanning network')
+        ssdpcache.clear()
+        with profiling.phase('discovery'):
+            found = ssdp.cached_scan(use_cache=False, networks=networks)
+        tvs = get_tv_info(found, False, cache=cache) if found else []
+
+    return tvs
+
+
+def find_first_tv(use_cache: bool = True, networks: Optional[List[str]] = None) -> Optional[TVInfo]:
+    """Return the first TV that answers, without waiting for the full scan."""
+    cache = desccache.shared() if use_cache else None
+    with profiling.phase('discovery'):
+        # A sweep must only reach TVs in the requested ranges
+        candidates = ssdpcache.load() if use_cache and not networks else []
+    responses = itertools.chain(candidates, ssdp.iter_scan_network(networks=networks))
+    while True:
+        # Only time the wait for the next answer, not the description fetch
+        with profiling.phase('discovery'):
+            found = next(responses, None)
+        if found is None:
+            return None
+        from_cache = isinstance(found, ssdpcache.CachedDevice)
+        tvs = get_tv_info([found], False, cache=cache, revalidate=from_cache)
+        if tvs:
+            # Re-storing a cached entry would extend its expiry without a new answer
+            if not from_cache:
+                ssdpcache.store([found])
+            return tvs[0]
+
+
+def control_inventory(args: argparse.Namespace, config: TVConfig) -> bool:
+    """
+    Run -p, -k and -m on the inventory TVs selected by --group or --all.
+
+    TVs are controlled in parallel and no network discovery is done; the
+    transport comes from -l, the inventory, or a probe of the TV, in that order.
+
+    Returns:
+        True if every TV succeeded, False otherwise
+    """
+    if not (args.key or args.macro or args.power_off_all):
+        logging.error('--group and --all need a command: -k, -m or -p')
+        return False
+    if args.macro and not Path(args.macro).exists():
+        logging.error(f'Macro file not found: {args.macro}')
+        return False
+
+    try:
+        fleet = inventory.Inventory.load(Path(args.inventory))
+        devices = fleet.all() if args.all else fleet.select(args.group)
+    except (OSError, ValueError, LookupError) as e:
+        logging.error(f'Inventory error: {e}')
+        return False
+    if not devices:
+        logging.error(f'No TVs selected from {args.inventory}')
+        return False
+
+    def control(device: inventory.Device) -> bool:
+        detected = not (args.legacy or device.method)
+        config_dict = {
+            'name': config.name,
+            'host': device.host,
+            'port': device.port,
+            'method': 'legacy' if args.legacy else device.method or capability.detect(
+                device.host, device.model, use_cache=not args.no_cache),
+            'timeout': config.timeout
+        }
+        ok = True
+        if args.power_off_all:
+            ok = tvcon.send(config_dict, 'KEY_POWEROFF')
+        if args.key:
+            ok = tvcon.send(config_dict, args.key) and ok
+        if args.macro:
+            ok = macro.execute(config_dict, args.macro) and ok
+        if not ok and detected:
+            # The cached transport may be wrong, probe again next time
+            capability.forget(device.host)
+        return ok
+
+    results = inventory.run(devices, control)
+    for device, ok in results:
+        if ok:
+            logging.info(f'{device.name} ({device.host}): done')
+        else:
+            logging.error(f'{device.name} ({device.host}): failed')
+    return all(ok for _, ok in results)
+
+
 def setup_logging(quiet: bool = False, log_file: str = 'app.log') -> None:
-    """Setup logging configuration."""
+    """
+    Setup logging configuration.
+
+    Records go through a queue and are written to the log file (and the
+    console) by a background thread, so sending never blocks on disk I/O.
+    """
     log_format = '%(asctime)s [%(levelname)6s]: %(message)s'
     
     # Configure file logging
-    logging.basicConfig(
-        filename=log_file,
-        format=log_format,
-        level=logging.DEBUG
-    )
+    file_handler = logging.FileHandler(log_file)
+    file_handler.setLevel(logging.DEBUG)
+    file_handler.setFormatter(logging.Formatter(log_format))
+    handlers = [file_handler]
     
     # Add console handler if not quiet
     if not quiet:
-        root = logging.getLogger()
         console_handler = logging.StreamHandler(sys.stdout)
         console_handler.setLevel(logging.INFO)
         console_formatter = logging.Formatter('%(message)s')
         console_handler.setFormatter(console_formatter)
-        root.addHandler(console_handler)
+        handlers.append(console_handler)
+
+    logqueue.start(*handlers)
 
 
 @contextmanager
@@ -107,6 +250,33 @@ def error_handler():
         sys.exit(1)
 
 
+def cidr(value: str) -> str:
+    """Validate an IPv4 address or CIDR range given on the command line."""
+    try:
+        return str(ipaddress.IPv4Network(value, strict=False))
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def http_address(value: str) -> Tuple[str, int]:
+    """Validate a [HOST:]PORT address given on the command line."""
+    try:
+        return httpapi.parse_address(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
+def key_rate(value: str) -> float:
+    """Validate a positive keys-per-second rate given on the command line."""
+    try:
+        rate = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid rate: {value}')
+    if not rate > 0:
+        raise argparse.ArgumentTypeError('rate must be positive')
+    return rate
+
+
 def parse_arguments() -> argparse.Namespace:
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(
@@ -119,6 +289,10 @@ Examples:
   %(prog)s -a -k KEY_VOLUP       # Send volume up to first available TV
   %(prog)s -p                    # Power off all TVs
   %(prog)s -m macro.csv          # Execute macro file
+  %(prog)s -g lobby -k KEY_MUTE  # Mute every TV in an inventory group
+  %(prog)s -i 192.168.1.100 --stdin  # Send keys typed or piped one per line
+  %(prog)s --lint macros/        # Validate all macro files in a directory
+  %(prog)s --daemon              # Keep connections warm for later commands
         """
     )
     
@@ -134,6 +308,18 @@ Examples:
         metavar='IP',
         help='IP address of the target TV'
     )
+    tv_group.add_argument(
+        '-g', '--group',
+        metavar='NAME',
+        action='append',
+        help='send command to every TV in this inventory group or named TV, '
+             'in parallel (repeatable)'
+    )
+    tv_group.add_argument(
+        '--all',
+        action='store_true',
+        help='send command to every TV in the inventory, in parallel'
+    )
     
     # Command options
     parser.add_argument(
@@ -151,6 +337,84 @@ Examples:
         metavar='FILE',
         help='macro file with commands to execute'
     )
+    parser.add_argument(
+        '--stdin',
+        action='store_true',
+        help='read keys line by line from standard input and send each as it '
+             'arrives over one connection'
+    )
+    parser.add_argument(
+        '--rate',
+        metavar='KEYS',
+        type=key_rate,
+        default=repl.DEFAULT_RATE,
+        help='maximum keys per second sent in --stdin mode (default: %(default)s)'
+    )
+    parser.add_argument(
+        '--lint',
+        metavar='PATH',
+        help='validate a macro file or a directory of macros without sending anything'
+    )
+    parser.add_argument(
+        '--sweep',
+        metavar='CIDR',
+        action='append',
+        type=cidr,
+        help='probe every host in this range with unicast instead of multicast '
+             'discovery (repeatable, e.g. --sweep 10.1.0.0/22)'
+    )
+    parser.add_argument(
+        '--daemon',
+        action='store_true',
+        help='run in the background keeping TV connections open, '
+             'accepting commands on a Unix socket'
+    )
+    parser.add_argument(
+        '--http',
+        metavar='[HOST:]PORT',
+        type=http_address,
+        help='run the daemon and also serve the HTTP/JSON API on this address '
+             '(host defaults to 127.0.0.1)'
+    )
+    parser.add_argument(
+        '--macro-dir',
+        metavar='DIR',
+        help='directory the HTTP API reads /macro files from; /macro is '
+             'refused without it'
+    )
+    parser.add_argument(
+        '--socket',
+        metavar='PATH',
+        default=str(client.DEFAULT_SOCKET),
+        help='Unix socket of the daemon (default: %(default)s)'
+    )
+    parser.add_argument(
+        '--inventory',
+        metavar='FILE',
+        default=str(inventory.DEFAULT_PATH),
+        help='JSON, TOML or YAML file with named TVs and groups used by '
+             '--group and --all (default: %(default)s)'
+    )
+    parser.add_argument(
+        '--profile',
+        metavar='FILE',
+        nargs='?',
+        const='',
+        help='print where the run spent its time (import, discovery, description '
+             'fetch, connect, send, sleep) and the slowest functions; with FILE, '
+             'write the cProfile statistics there instead of listing functions'
+    )
+    parser.add_argument(
+        '--trace',
+        action='store_true',
+        help='log a trace span for every discovery, description fetch, send and '
+             'macro to the log file, and export them to OpenTelemetry if installed'
+    )
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='ignore the discovery cache and always scan the network'
+    )
     parser.add_argument(
         '-p', '--power-off-all',
         action='store_true',
@@ -173,7 +437,8 @@ Examples:
 def main() -> None:
     """Main application entry point."""
     # Parse arguments
-    args = parse_arguments()
+    with profiling.phase('arguments'):
+        args = parse_arguments()
     
     # Show help if no arguments provided
     if len(sys.argv) == 1:
@@ -184,52 +449,87 @@ def main() -> None:
     setup_logging(args.quiet)
     logging.debug(f'Program started with arguments: {sys.argv}')
 
-    with error_handler():
+    if args.trace:
+        tracing.log_spans()
+        if tracing.use_opentelemetry() is None:
+            logging.debug('OpenTelemetry not installed, spans are only logged')
+
+    with profiling.session(args.profile, started=_STARTED), \
+            tracing.span('samsung_remote', argv=' '.join(sys.argv[1:])), error_handler():
         # Initialize configuration
         config = TVConfig()
         config.update_from_args(args)
         
+        # Handle macro validation
+        if args.lint:
+            files = lint.find_macros(args.lint)
+            if not files:
+                logging.error(f'No macro files found in {args.lint}')
+                sys.exit(1)
+            reports = lint.lint_many(files)
+            for report in reports:
+                logging.info(str(report))
+            failed = [report for report in reports if not report.ok]
+            logging.info(f'{len(reports)} macros checked, {len(failed)} with errors')
+            sys.exit(1 if failed else 0)
+
+        # Handle daemon mode
+        if args.daemon or args.http:
+            try:
+                daemon.run(Path(args.socket), name=config.name, use_cache=not args.no_cache,
+                           http=args.http, macro_dir=Path(args.macro_dir) if args.macro_dir else None)
+            except (RuntimeError, OSError) as e:
+                logging.error(f'Failed to start daemon: {e}')
+                sys.exit(1)
+            sys.exit(0)
+
         # Handle scan operation
         if args.scan:
             logging.info('Scanning network...')
-            tvs = ssdp.scan_network(wait=1)
+            with profiling.phase('discovery'):
+                tvs = ssdp.cached_scan(wait=1, use_cache=False, networks=args.sweep)
             if not tvs:
                 logging.info("No Samsung TVs found in the network")
             else:
-                get_tv_info(tvs, True)
+                get_tv_info(tvs, True, cache=None if args.no_cache else desccache.shared())
             sys.exit(0)
         
+        # Handle inventory targets, no discovery needed
+        if args.group or args.all:
+            sys.exit(0 if control_inventory(args, config) else 1)
+
         # Get TV information if needed
         tvs = []
-        if not args.ip:  # No IP specified, need to scan
-            tvs = ssdp.scan_network()
-            if not tvs:
+        if args.auto and not args.power_off_all:
+            # Only the first TV is needed, stop discovery as soon as one answers
+            tv = find_first_tv(use_cache=not args.no_cache, networks=args.sweep)
+            if tv is None:
                 logging.error('No Samsung TV found in the network.')
                 sys.exit(1)
-            
-            tvs = get_tv_info(tvs, False)
+            tvs = [tv]
+        elif not args.ip:  # No IP specified, need to scan
+            tvs = discover_tvs(use_cache=not args.no_cache, networks=args.sweep)
             if not tvs:
-                logging.error('Failed to get TV information.')
+                logging.error('No Samsung TV found in the network.')
                 sys.exit(1)
-            
-            # Use first TV if auto mode
-            if args.auto:
-                config.host = tvs[0].ip
-                config.method = tvinfo.getMethod(tvs[0].model)
-                logging.info(f'Sending command to first TV found: {tvs[0].friendly_name}')
+
+        # Use first TV if auto mode
+        if args.auto and tvs:
+            config.host = tvs[0].ip
+            config.method = capability.detect(tvs[0].ip, tvs[0].model, use_cache=not args.no_cache)
+            logging.info(f'Sending command to first TV found: {tvs[0].friendly_name}')
         
         # Handle power off all operation
         if args.power_off_all:
             if not tvs:  # Need to scan if not already done
-                tvs = ssdp.scan_network()
+                tvs = discover_tvs(use_cache=not args.no_cache, networks=args.sweep)
                 if not tvs:
                     logging.error('No Samsung TVs found to power off.')
                     sys.exit(1)
-                tvs = get_tv_info(tvs, False)
             
             for tv in tvs:
                 config.host = tv.ip
-                config.method = tvinfo.getMethod(tv.model)
+                config.method = capability.detect(tv.ip, tv.model, use_cache=not args.no_cache)
                 config_dict = {
                     'name': config.name,
                     'host': config.host,
@@ -241,6 +541,7 @@ def main() -> None:
                     logging.info(f'Successfully turned off {tv.friendly_name}')
                 else:
                     logging.error(f'Failed to turn off {tv.friendly_name}')
+                    capability.forget(tv.ip)
         
         # Handle single command
         if args.key:
@@ -251,7 +552,9 @@ def main() -> None:
                 'method': config.method,
                 'timeout': config.timeout
             }
-            tvcon.send(config_dict, args.key)
+            if not tvcon.send(config_dict, args.key) and args.auto:
+                # The cached transport may be wrong, probe again next time
+                capability.forget(config.host)
         
         # Handle macro execution
         if args.macro:
@@ -268,6 +571,18 @@ def main() -> None:
             }
             macro.execute(config_dict, str(macro_path))
 
+        # Handle keys streamed on standard input
+        if args.stdin:
+            config_dict = {
+                'name': config.name,
+                'host': config.host,
+                'port': config.port,
+                'method': config.method,
+                'timeout': config.timeout
+            }
+            if not repl.run(config_dict, sys.stdin, rate=args.rate):
+                sys.exit(1)
+
 
 if __name__ == "__main__":
     main()
@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 
+import io
 import unittest
 import sys
 import os
@@ -31,7 +32,7 @@ class TestEdgeCases(unittest.TestCase):
         with self.assertRaises(TypeError):
             tvinfo.getMethod(None)
 
-    @patch('helpers.tvinfo.urllib.request.urlopen')
+    @patch('helpers.tvinfo.httppool.urlopen')
     def test_tvinfo_get_connection_error(self, mock_urlopen):
         """Test get function with connection error"""
         mock_urlopen.side_effect = Exception("Connection refused")
@@ -39,16 +40,10 @@ class TestEdgeCases(unittest.TestCase):
         with self.assertRaises(Exception):
             tvinfo.get('http://192.168.1.100:8001/ms/1.0/')
 
-    @patch('helpers.tvinfo.urllib.request.urlopen')
-    @patch('helpers.tvinfo.ET.fromstring')
-    def test_tvinfo_get_missing_elements(self, mock_fromstring, mock_urlopen):
+    @patch('helpers.tvinfo.httppool.urlopen')
+    def test_tvinfo_get_missing_elements(self, mock_urlopen):
         """Test get function with missing XML elements"""
-        mock_root = MagicMock()
-        mock_root.find.return_value = None  # No elements found
-        mock_root.tag = "root"  # Add a proper tag
-        
-        mock_fromstring.return_value = mock_root
-        mock_urlopen.return_value = MagicMock()
+        mock_urlopen.return_value.__enter__.return_value = io.BytesIO(b'<root><device/></root>')
         
         with self.assertRaises(ValueError):
             tvinfo.get('http://192.168.1.100:8001/ms/1.0/')
@@ -144,7 +139,7 @@ class TestErrorHandling(unittest.TestCase):
             result = tvcon.send(config, 'KEY_POWER')
             self.assertFalse(result)
 
-    @patch('helpers.tvinfo.urllib.request.urlopen')
+    @patch('helpers.tvinfo.httppool.urlopen')
     def test_tvinfo_get_timeout_error(self, mock_urlopen):
         """Test get function with timeout error"""
         mock_urlopen.side_effect = TimeoutError("Request timed out")
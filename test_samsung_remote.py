@@ -5,15 +5,20 @@ import sys
 import os
 import tempfile
 import csv
+import json
+import io
 import socket
+import time
+import threading
 from unittest.mock import patch, MagicMock, mock_open
 import logging
+import logging.handlers
 
 # Add the current directory to the path so we can import the modules
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from samsung_remote import get_tv_info, setup_logging, main, TVConfig, TVInfo, error_handler
-from helpers import tvcon, ssdp, tvinfo, macro
+from samsung_remote import get_tv_info, discover_tvs, find_first_tv, setup_logging, main, TVConfig, TVInfo, error_handler
+from helpers import tvcon, ssdp, ssdp_custom, ssdp_listener, ssdpcache, desccache, tvinfo, capability, httppool, service, daemon, client, httpapi, macro, lint, repl, inventory, tvregistry, logqueue, metrics, profiling, tracing
 
 
 class TestTVInfo(unittest.TestCase):
@@ -60,23 +65,24 @@ class TestTVInfo(unittest.TestCase):
         result = tvinfo.namespace(element)
         self.assertEqual(result, '')
 
-    @patch('helpers.tvinfo.urllib.request.urlopen')
-    @patch('helpers.tvinfo.ET.fromstring')
-    def test_get_success(self, mock_fromstring, mock_urlopen):
+    DESCRIPTION = (
+        b'<?xml version="1.0"?>'
+        b'<root xmlns="urn:schemas-upnp-org:device-1-0"><device>'
+        b'<friendlyName>Living Room TV</friendlyName><modelName>UN55F8000</modelName>'
+        b'<serviceList>' + b'<service><serviceType>urn:x</serviceType></service>' * 200 +
+        b'</serviceList></device></root>'
+    )
+
+    @staticmethod
+    def _serve(mock_urlopen, body):
+        stream = io.BytesIO(body)
+        mock_urlopen.return_value.__enter__.return_value = stream
+        return stream
+
+    @patch('helpers.tvinfo.httppool.urlopen')
+    def test_get_success(self, mock_urlopen):
         """Test get function with successful response"""
-        # Mock the XML response
-        mock_root = MagicMock()
-        mock_friendly_name = MagicMock()
-        mock_friendly_name.text = 'Living Room TV'
-        mock_model_name = MagicMock()
-        mock_model_name.text = 'UN55F8000'
-        
-        # Mock the tag attribute for namespace function
-        mock_root.tag = '{http://schemas.xmlsoap.org/soap/envelope/}root'
-        mock_root.find.side_effect = lambda x: mock_friendly_name if 'friendlyName' in x else mock_model_name
-        
-        mock_fromstring.return_value = mock_root
-        mock_urlopen.return_value = MagicMock()
+        self._serve(mock_urlopen, self.DESCRIPTION)
         
         url = 'http://192.168.1.100:8001/ms/1.0/'
         
@@ -89,7 +95,7 @@ class TestTVInfo(unittest.TestCase):
         }
         self.assertEqual(result, expected)
 
-    @patch('helpers.tvinfo.urllib.request.urlopen')
+    @patch('helpers.tvinfo.httppool.urlopen')
     def test_get_invalid_url(self, mock_urlopen):
         """Test get function with invalid URL (no IP address)"""
         url = 'http://invalid-url/ms/1.0/'
@@ -97,44 +103,28 @@ class TestTVInfo(unittest.TestCase):
         with self.assertRaises(ValueError):
             tvinfo.get(url)
 
-    @patch('helpers.tvinfo.urllib.request.urlopen')
-    @patch('helpers.tvinfo.ET.fromstring')
-    def test_get_missing_elements(self, mock_fromstring, mock_urlopen):
+    @patch('helpers.tvinfo.httppool.urlopen')
+    def test_get_missing_elements(self, mock_urlopen):
         """Test get function with missing XML elements"""
-        mock_root = MagicMock()
-        mock_root.tag = '{http://schemas.xmlsoap.org/soap/envelope/}root'
-        mock_root.find.return_value = None  # Missing elements
-        
-        mock_fromstring.return_value = mock_root
-        mock_urlopen.return_value = MagicMock()
+        self._serve(mock_urlopen, b'<root xmlns="urn:schemas-upnp-org:device-1-0"><device/></root>')
         
         url = 'http://192.168.1.100:8001/ms/1.0/'
         
         with self.assertRaises(ValueError):
             tvinfo.get(url)
 
-    @patch('helpers.tvinfo.urllib.request.urlopen')
-    @patch('helpers.tvinfo.ET.fromstring')
-    def test_get_empty_elements(self, mock_fromstring, mock_urlopen):
+    @patch('helpers.tvinfo.httppool.urlopen')
+    def test_get_empty_elements(self, mock_urlopen):
         """Test get function with empty XML element text"""
-        mock_root = MagicMock()
-        mock_friendly_name = MagicMock()
-        mock_friendly_name.text = ''  # Empty text
-        mock_model_name = MagicMock()
-        mock_model_name.text = 'UN55F8000'
-        
-        mock_root.tag = '{http://schemas.xmlsoap.org/soap/envelope/}root'
-        mock_root.find.side_effect = lambda x: mock_friendly_name if 'friendlyName' in x else mock_model_name
-        
-        mock_fromstring.return_value = mock_root
-        mock_urlopen.return_value = MagicMock()
+        self._serve(mock_urlopen, b'<root><device><friendlyName></friendlyName>'
+                                  b'<modelName>UN55F8000</modelName></device></root>')
         
         url = 'http://192.168.1.100:8001/ms/1.0/'
         
         with self.assertRaises(ValueError):
             tvinfo.get(url)
 
-    @patch('helpers.tvinfo.urllib.request.urlopen')
+    @patch('helpers.tvinfo.httppool.urlopen')
     def test_get_url_error(self, mock_urlopen):
         """Test get function with URL error"""
         import urllib.error
@@ -145,19 +135,180 @@ class TestTVInfo(unittest.TestCase):
         with self.assertRaises(urllib.error.URLError):
             tvinfo.get(url)
 
-    @patch('helpers.tvinfo.urllib.request.urlopen')
-    @patch('helpers.tvinfo.ET.fromstring')
-    def test_get_xml_parse_error(self, mock_fromstring, mock_urlopen):
+    @patch('helpers.tvinfo.httppool.urlopen')
+    def test_get_xml_parse_error(self, mock_urlopen):
         """Test get function with XML parse error"""
         import xml.etree.ElementTree
-        mock_fromstring.side_effect = xml.etree.ElementTree.ParseError("Invalid XML")
-        mock_urlopen.return_value = MagicMock()
+        self._serve(mock_urlopen, b'<root><device><friendlyName>TV</device>')
         
         url = 'http://192.168.1.100:8001/ms/1.0/'
         
         with self.assertRaises(xml.etree.ElementTree.ParseError):
             tvinfo.get(url)
 
+    def test_parse_description_stops_early(self):
+        """Test parsing stops reading once both fields are found"""
+        stream = io.BytesIO(self.DESCRIPTION)
+        
+        fields = tvinfo.parse_description(stream, chunk_size=256)
+        
+        self.assertEqual(fields, {'friendlyName': 'Living Room TV', 'modelName': 'UN55F8000'})
+        self.assertLess(stream.tell(), len(self.DESCRIPTION) // 4)
+
+    def test_parse_description_first_device_wins(self):
+        """Test fields of embedded devices do not override the root device"""
+        body = (b'<root><device><friendlyName>TV</friendlyName><deviceList><device>'
+                b'<friendlyName>Tuner</friendlyName><modelName>X</modelName>'
+                b'</device></deviceList><modelName>UN55F8000</modelName></device></root>')
+        
+        fields = tvinfo.parse_description(io.BytesIO(body), chunk_size=16)
+        
+        self.assertEqual(fields['friendlyName'], 'TV')
+
+
+class TestTVInfoConcurrent(unittest.TestCase):
+    """Test cases for concurrent description fetches"""
+
+    @staticmethod
+    def _info(url, timeout, cache=None, usn=None, revalidate=False):
+        ip = url.split('/')[2].split(':')[0]
+        return {'fn': f'TV {ip}', 'ip': ip, 'model': 'UN55F8000'}
+
+    @patch('helpers.tvinfo.get')
+    def test_get_many_keeps_discovery_order(self, mock_get):
+        """Test results come back in input order even if they finish out of order"""
+        def get(url, timeout, cache=None, usn=None, revalidate=False):
+            if url.endswith('.1/'):
+                time.sleep(0.05)
+            return self._info(url, timeout)
+
+        mock_get.side_effect = get
+        urls = ['http://10.0.0.1/', 'http://10.0.0.2/', 'http://10.0.0.3/']
+
+        results = tvinfo.get_many(urls, max_workers=3)
+
+        self.assertEqual([r['ip'] for r in results], ['10.0.0.1', '10.0.0.2', '10.0.0.3'])
+
+    @patch('helpers.tvinfo.get')
+    def test_get_many_reports_failures_and_timeouts(self, mock_get):
+        """Test a failing and a hanging device do not hold back healthy ones"""
+        def get(url, timeout, cache=None, usn=None, revalidate=False):
+            if url.endswith('.2/'):
+                raise ValueError('bad description')
+            if url.endswith('.3/'):
+                time.sleep(0.5)
+            return self._info(url, timeout)
+
+        mock_get.side_effect = get
+        urls = ['http://10.0.0.1/', 'http://10.0.0.2/', 'http://10.0.0.3/']
+
+        start = time.monotonic()
+        results = tvinfo.get_many(urls, max_workers=3, deadline=0.1)
+
+        self.assertLess(time.monotonic() - start, 0.4)
+        self.assertEqual(results[0]['ip'], '10.0.0.1')
+        self.assertIsInstance(results[1], ValueError)
+        self.assertIsInstance(results[2], TimeoutError)
+        # The per-request timeout never exceeds the overall deadline
+        for call in mock_get.call_args_list:
+            self.assertLessEqual(call[0][1], 0.1)
+
+    @patch('helpers.tvinfo.get')
+    def test_get_many_single_url_runs_inline(self, mock_get):
+        """Test a single device is fetched without a thread pool"""
+        mock_get.side_effect = self._info
+
+        with patch('helpers.tvinfo.ThreadPoolExecutor') as mock_executor:
+            results = tvinfo.get_many(['http://10.0.0.1/'])
+
+        mock_executor.assert_not_called()
+        self.assertEqual(results[0]['ip'], '10.0.0.1')
+
+
+class TestDescriptionCache(unittest.TestCase):
+    """Test cases for desccache module and cached tvinfo.get"""
+
+    URL = 'http://192.168.1.100:7676/smp_2_'
+    XML = (b'<root xmlns="urn:schemas-upnp-org:device-1-0"><device>'
+           b'<friendlyName>Living Room TV</friendlyName><modelName>UN55F8000</modelName>'
+           b'</device></root>')
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'descriptions.json')
+        self.cache = desccache.DescriptionCache(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _response(self, headers=None):
+        response = MagicMock()
+        response.__enter__.return_value = response
+        response.read.return_value = self.XML
+        response.headers = headers or {}
+        return response
+
+    @patch('helpers.tvinfo.httppool.urlopen')
+    def test_fresh_entry_skips_http(self, mock_urlopen):
+        """Test a second lookup is answered from the cache"""
+        mock_urlopen.return_value = self._response({'ETag': '"v1"'})
+
+        first = tvinfo.get(self.URL, cache=self.cache)
+        second = tvinfo.get(self.URL, cache=self.cache)
+
+        self.assertEqual(first, second)
+        self.assertEqual(second['fn'], 'Living Room TV')
+        mock_urlopen.assert_called_once()
+        self.assertEqual(self.cache.get(self.URL).etag, '"v1"')
+
+    @patch('helpers.tvinfo.httppool.urlopen')
+    def test_fresh_entry_revalidated_on_request(self, mock_urlopen):
+        """Test revalidate contacts the TV despite a fresh entry, so a missing TV fails"""
+        import urllib.error
+        self.cache.put(self.URL, {'fn': 'Living Room TV'}, etag='"v1"', max_age=3600)
+        mock_urlopen.side_effect = urllib.error.URLError('timed out')
+
+        with self.assertRaises(urllib.error.URLError):
+            tvinfo.get(self.URL, cache=self.cache, revalidate=True)
+        self.assertEqual(mock_urlopen.call_args[0][0].get_header('If-none-match'), '"v1"')
+
+    @patch('helpers.tvinfo.httppool.urlopen')
+    def test_stale_entry_revalidated(self, mock_urlopen):
+        """Test a stale entry is revalidated with If-None-Match and kept on 304"""
+        import urllib.error
+        info = {'fn': 'Living Room TV', 'ip': '192.168.1.100', 'model': 'UN55F8000'}
+        self.cache.put(self.URL, info, etag='"v1"', max_age=0)
+        mock_urlopen.side_effect = urllib.error.HTTPError(self.URL, 304, 'Not Modified', {}, None)
+
+        result = tvinfo.get(self.URL, cache=self.cache)
+
+        self.assertEqual(result, info)
+        request = mock_urlopen.call_args[0][0]
+        self.assertEqual(request.get_header('If-none-match'), '"v1"')
+        self.assertTrue(self.cache.get(self.URL).is_fresh)
+
+    def test_lru_eviction(self):
+        """Test the least recently used description is evicted first"""
+        cache = desccache.DescriptionCache(self.path, size=2)
+        cache.put('http://a/', {'fn': 'A'})
+        cache.put('http://b/', {'fn': 'B'})
+        cache.get('http://a/')
+        cache.put('http://c/', {'fn': 'C'})
+
+        self.assertIsNotNone(cache.get('http://a/'))
+        self.assertIsNone(cache.get('http://b/'))
+        self.assertEqual(len(cache), 2)
+
+    def test_shared_through_file(self):
+        """Test saved entries are visible to another cache and checked by USN"""
+        self.cache.put(self.URL, {'fn': 'Living Room TV'}, usn='uuid:1')
+        self.assertTrue(self.cache.save())
+        self.assertFalse(self.cache.save())  # nothing new to write
+
+        other = desccache.DescriptionCache(self.path)
+        self.assertEqual(other.get(self.URL, 'uuid:1').info['fn'], 'Living Room TV')
+        self.assertIsNone(other.get(self.URL, 'uuid:2'))
+
 
 class TestTVCon(unittest.TestCase):
     """Test cases for tvcon module"""
@@ -230,6 +381,49 @@ class TestTVCon(unittest.TestCase):
 class TestSSDP(unittest.TestCase):
     """Test cases for ssdp module"""
 
+    def setUp(self):
+        # No device answers the targeted search unless a test says otherwise,
+        # so the netdisco full-scan fallback is exercised when enabled
+        patcher = patch('helpers.ssdp.ssdp_custom.iter_discover', return_value=iter([]))
+        self.mock_targeted = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @patch('helpers.ssdp.netdisco_ssdp.scan')
+    def test_targeted_search_skips_full_scan(self, mock_scan):
+        """Test scan_network uses targeted answers without scanning all devices"""
+        tv = ssdp_custom.SSDPResponse(
+            b'HTTP/1.1 200 OK\r\n'
+            b'LOCATION: http://192.168.1.100:7676/rcr/\r\n'
+            b'ST: urn:samsung.com:device:RemoteControlReceiver:1\r\n'
+            b'USN: uuid:1\r\n\r\n'
+        )
+        tv.interface = '10.0.1.2'
+        self.mock_targeted.return_value = iter([tv])
+
+        result = ssdp.scan_network(wait=0.1)
+
+        mock_scan.assert_not_called()
+        self.assertEqual(len(result), 1)
+        self.assertEqual(result[0].interface, '10.0.1.2')
+        self.assertEqual(self.mock_targeted.call_args[0][0], ssdp_custom.SAMSUNG_ST)
+
+    @patch('helpers.ssdp.netdisco_ssdp.scan')
+    def test_no_full_scan_by_default(self, mock_scan):
+        """Test an unanswered targeted search does not fall back to scanning all devices"""
+        self.assertEqual(ssdp.scan_network(wait=0.1), [])
+        self.assertEqual(ssdp.discover(ssdp_custom.SAMSUNG_ST, timeout=1), [])
+        mock_scan.assert_not_called()
+
+    def test_iter_discover_filters_other_services(self):
+        """Test stray answers for other service types are dropped"""
+        other = MagicMock(st='upnp:rootdevice')
+        match = MagicMock(st='urn:samsung.com:device:RemoteControlReceiver:1', cache='0', interface=None)
+        self.mock_targeted.return_value = iter([other, match])
+
+        result = list(ssdp.iter_discover('urn:samsung.com:device:RemoteControlReceiver:1'))
+
+        self.assertEqual(len(result), 1)
+
     def test_ssdp_response_repr(self):
         """Test SSDPResponse __repr__ method"""
         # Test the dataclass-based SSDPResponse
@@ -264,7 +458,7 @@ class TestSSDP(unittest.TestCase):
         
         mock_scan.return_value = [mock_device]
         
-        result = ssdp.discover("urn:samsung.com:device:RemoteControlReceiver:1", timeout=1)
+        result = ssdp.discover("urn:samsung.com:device:RemoteControlReceiver:1", timeout=1, scan_all=True)
         
         self.assertEqual(len(result), 1)
         self.assertEqual(result[0].location, 'http://192.168.1.100:8001/ms/1.0/')
@@ -278,7 +472,7 @@ class TestSSDP(unittest.TestCase):
             mock_logger = MagicMock()
             mock_get_logger.return_value = mock_logger
             
-            result = ssdp.discover("urn:samsung.com:device:RemoteControlReceiver:1", timeout=1)
+            result = ssdp.discover("urn:samsung.com:device:RemoteControlReceiver:1", timeout=1, scan_all=True)
             
             self.assertEqual(result, [])
             mock_logger.error.assert_called()
@@ -294,7 +488,7 @@ class TestSSDP(unittest.TestCase):
         
         mock_scan.return_value = [mock_device]
         
-        result = ssdp.discover("urn:samsung.com:device:RemoteControlReceiver:1", timeout=1)
+        result = ssdp.discover("urn:samsung.com:device:RemoteControlReceiver:1", timeout=1, scan_all=True)
         
         self.assertEqual(result, [])
 
@@ -309,7 +503,7 @@ class TestSSDP(unittest.TestCase):
         
         mock_scan.return_value = [mock_device]
         
-        result = ssdp.scan_network(wait=0.1)
+        result = ssdp.scan_network(wait=0.1, scan_all=True)
         
         self.assertEqual(len(result), 1)
         self.assertEqual(result[0].location, 'http://192.168.1.100:8001/ms/1.0/')
@@ -325,7 +519,7 @@ class TestSSDP(unittest.TestCase):
         
         mock_scan.return_value = [mock_device]
         
-        result = ssdp.scan_network(wait=0.1)
+        result = ssdp.scan_network(wait=0.1, scan_all=True)
         
         self.assertEqual(result, [])
 
@@ -338,7 +532,7 @@ class TestSSDP(unittest.TestCase):
             mock_logger = MagicMock()
             mock_get_logger.return_value = mock_logger
             
-            result = ssdp.scan_network(wait=0.1)
+            result = ssdp.scan_network(wait=0.1, scan_all=True)
             
             self.assertEqual(result, [])
             mock_logger.info.assert_called_once()
@@ -352,12 +546,408 @@ class TestSSDP(unittest.TestCase):
             mock_logger = MagicMock()
             mock_get_logger.return_value = mock_logger
             
-            result = ssdp.scan_network(wait=0.1)
+            result = ssdp.scan_network(wait=0.1, scan_all=True)
             
             self.assertEqual(result, [])
             mock_logger.error.assert_called_once()
 
 
+class TestSSDPCache(unittest.TestCase):
+    """Test cases for ssdpcache module"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'ssdp.json')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _response(self, cache='1800', usn='uuid:1'):
+        return ssdp.SSDPResponse(
+            location='http://192.168.1.100:8001/ms/1.0/',
+            st='urn:samsung.com:device:RemoteControlReceiver:1',
+            usn=usn,
+            cache=cache
+        )
+
+    def test_parse_max_age(self):
+        """Test parse_max_age with common cache-control values"""
+        self.assertEqual(ssdpcache.parse_max_age('max-age=1800'), 1800)
+        self.assertEqual(ssdpcache.parse_max_age('no-cache, max-age = 60'), 60)
+        self.assertEqual(ssdpcache.parse_max_age('no-cache'), 0)
+        self.assertEqual(ssdpcache.parse_max_age(None), 0)
+
+    def test_store_and_load(self):
+        """Test devices round-trip through the cache file"""
+        self.assertEqual(ssdpcache.store([self._response()], self.path), 1)
+
+        devices = ssdpcache.load(self.path)
+
+        self.assertEqual(len(devices), 1)
+        self.assertEqual(devices[0].location, 'http://192.168.1.100:8001/ms/1.0/')
+        self.assertEqual(devices[0].usn, 'uuid:1')
+
+    def test_store_skips_uncacheable(self):
+        """Test responses without max-age are not cached"""
+        self.assertEqual(ssdpcache.store([self._response(cache='0')], self.path), 0)
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_load_drops_expired(self):
+        """Test expired entries are not returned"""
+        ssdpcache.store([self._response(cache='10')], self.path)
+
+        with patch('helpers.ssdpcache.time.time', return_value=10 ** 12):
+            self.assertEqual(ssdpcache.load(self.path), [])
+
+    def test_cached_scan_uses_cache(self):
+        """Test cached_scan answers from the cache without scanning"""
+        ssdpcache.store([self._response()], self.path)
+
+        with patch('helpers.ssdpcache.DEFAULT_PATH', self.path):
+            with patch('helpers.ssdp.scan_network') as mock_scan:
+                result = ssdp.cached_scan()
+
+                mock_scan.assert_not_called()
+                self.assertEqual(len(result), 1)
+
+    def test_cached_scan_sweep_ignores_cache(self):
+        """Test a sweep runs even with a warm cache holding TVs from other segments"""
+        ssdpcache.store([self._response()], self.path)
+        swept = [self._response()]
+
+        with patch('helpers.ssdpcache.DEFAULT_PATH', self.path):
+            with patch('helpers.ssdp.sweep_network', return_value=swept) as mock_sweep:
+                result = ssdp.cached_scan(networks=['10.2.0.0/24'])
+
+        mock_sweep.assert_called_once_with(['10.2.0.0/24'])
+        self.assertIs(result, swept)
+
+    def test_cached_scan_populates_cache(self):
+        """Test cached_scan stores scan results when the cache is empty"""
+        with patch('helpers.ssdpcache.DEFAULT_PATH', self.path):
+            with patch('helpers.ssdp.scan_network', return_value=[self._response()]) as mock_scan:
+                ssdp.cached_scan()
+                ssdp.cached_scan()
+
+                mock_scan.assert_called_once()
+
+
+class TestSSDPListener(unittest.TestCase):
+    """Test cases for ssdp_listener module"""
+
+    USN = 'uuid:1234::urn:samsung.com:device:RemoteControlReceiver:1'
+
+    def _notify(self, nts, nt='urn:samsung.com:device:RemoteControlReceiver:1'):
+        return (
+            'NOTIFY * HTTP/1.1\r\n'
+            'HOST: 239.255.255.250:1900\r\n'
+            'CACHE-CONTROL: max-age=1800\r\n'
+            'LOCATION: http://192.168.1.100:7676/rcr/\r\n'
+            f'NT: {nt}\r\n'
+            f'NTS: {nts}\r\n'
+            f'USN: {self.USN}\r\n'
+            '\r\n'
+        ).encode('utf-8')
+
+    def test_from_notify(self):
+        """Test NOTIFY parsing maps NT onto st"""
+        response = ssdp_custom.SSDPResponse.from_notify(self._notify('ssdp:alive'))
+
+        self.assertEqual(response.st, 'urn:samsung.com:device:RemoteControlReceiver:1')
+        self.assertEqual(response.nts, 'ssdp:alive')
+        self.assertEqual(response.location, 'http://192.168.1.100:7676/rcr/')
+        self.assertEqual(response.cache, '1800')
+
+    def test_alive_and_byebye(self):
+        """Test alive adds a device and byebye removes it"""
+        listener = ssdp_listener.NotifyListener()
+
+        listener.handle(self._notify('ssdp:alive'))
+        self.assertEqual(len(listener.registry), 1)
+        self.assertIsNotNone(listener.registry.get(self.USN))
+
+        listener.handle(self._notify('ssdp:byebye'))
+        self.assertEqual(listener.registry.devices(), [])
+
+    def test_ignores_other_devices_and_searches(self):
+        """Test non-Samsung announcements and M-SEARCH requests are ignored"""
+        listener = ssdp_listener.NotifyListener()
+
+        listener.handle(self._notify('ssdp:alive', nt='upnp:rootdevice'))
+        listener.handle(b'M-SEARCH * HTTP/1.1\r\nST: ssdp:all\r\n\r\n')
+        listener.handle(b'NOTIFY garbage')
+
+        self.assertEqual(len(listener.registry), 0)
+
+    def test_registry_expiry(self):
+        """Test devices drop out of the registry once max-age passes"""
+        listener = ssdp_listener.NotifyListener()
+        listener.handle(self._notify('ssdp:alive'))
+
+        with patch('helpers.ssdp_listener.time.time', return_value=10 ** 12):
+            self.assertIsNone(listener.registry.get(self.USN))
+            self.assertEqual(listener.registry.devices(), [])
+
+
+class TestSSDPParser(unittest.TestCase):
+    """Test cases for the SSDP header parser"""
+
+    def test_parse_headers_case_insensitive(self):
+        """Test header names match regardless of case and values are trimmed"""
+        headers = ssdp_custom.parse_headers(
+            b'HTTP/1.1 200 OK\r\n'
+            b'Location:  http://192.168.1.100:7676/rcr/ \r\n'
+            b'SERVER: Samsung\r\n'
+            b'st: urn:samsung.com:device:RemoteControlReceiver:1\r\n'
+            b'\r\n'
+            b'USN: after-blank-line\r\n'
+        )
+
+        self.assertEqual(headers, {
+            'location': 'http://192.168.1.100:7676/rcr/',
+            'st': 'urn:samsung.com:device:RemoteControlReceiver:1',
+        })
+
+    def test_parse_headers_bare_newlines_and_length(self):
+        """Test LF-only line endings and a length shorter than the buffer"""
+        data = bytearray(b'HTTP/1.1 200 OK\nUSN: uuid:1\nST: cut-off')
+        length = data.find(b'ST:')
+
+        headers = ssdp_custom.parse_headers(data, length=length)
+
+        self.assertEqual(headers, {'usn': 'uuid:1'})
+
+    def test_parse_headers_rejects_other_messages(self):
+        """Test datagrams with the wrong start line are rejected"""
+        with self.assertRaises(ValueError):
+            ssdp_custom.SSDPResponse(b'M-SEARCH * HTTP/1.1\r\nST: ssdp:all\r\n\r\n')
+        with self.assertRaises(ValueError):
+            ssdp_custom.SSDPResponse.from_notify(b'HTTP/1.1 200 OK\r\n\r\n')
+
+    def test_response_has_slots(self):
+        """Test responses use __slots__ instead of a per-instance dict"""
+        response = ssdp_custom.SSDPResponse(b'HTTP/1.1 200 OK\r\n\r\n')
+
+        self.assertFalse(hasattr(response, '__dict__'))
+        self.assertEqual(response.cache, '0')
+        self.assertIsNone(response.location)
+
+
+class _FakeSSDPSocket:
+    """Datagram socket stand-in that replays canned SSDP responses."""
+
+    def __init__(self, responses):
+        self._reader, self._writer = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        for response in responses:
+            self._writer.send(response)
+        self.recv_count = 0
+        self.closed = False
+
+    def fileno(self):
+        return self._reader.fileno()
+
+    def sendto(self, data, address):
+        pass
+
+    def recv_into(self, buffer):
+        self.recv_count += 1
+        return self._reader.recv_into(buffer)
+
+    def close(self):
+        self.closed = True
+        self._reader.close()
+        self._writer.close()
+
+
+class TestSSDPStreaming(unittest.TestCase):
+    """Test cases for streaming and multi-interface SSDP discovery"""
+
+    RESPONSE = (
+        'HTTP/1.1 200 OK\r\n'
+        'CACHE-CONTROL: max-age=1800\r\n'
+        'LOCATION: http://192.168.{}:7676/rcr/\r\n'
+        'ST: urn:samsung.com:device:RemoteControlReceiver:1\r\n'
+        'USN: uuid:{}\r\n'
+        '\r\n'
+    )
+
+    def _response(self, host, usn):
+        return self.RESPONSE.format(host, usn).encode()
+
+    def test_iter_discover_stops_early(self):
+        """Test iterating stops reading once the caller has what it needs"""
+        sock = _FakeSSDPSocket([self._response('1.100', 1), self._response('1.101', 2)])
+
+        with patch('helpers.ssdp_custom._open_socket', return_value=sock):
+            results = ssdp_custom.iter_discover(ssdp_custom.SAMSUNG_ST, timeout=1)
+            first = next(results)
+            results.close()
+
+        self.assertEqual(first.location, 'http://192.168.1.100:7676/rcr/')
+        self.assertEqual(sock.recv_count, 1)
+        self.assertTrue(sock.closed)
+
+    def test_iter_discover_dedupes(self):
+        """Test duplicate responses from one device are yielded once"""
+        sock = _FakeSSDPSocket([self._response('1.100', 1), self._response('1.100', 1)])
+
+        with patch('helpers.ssdp_custom._open_socket', return_value=sock):
+            result = list(ssdp_custom.iter_discover(ssdp_custom.SAMSUNG_ST, timeout=0.1))
+
+        self.assertEqual(len(result), 1)
+        self.assertTrue(sock.closed)
+
+    def test_discover_multiple_interfaces(self):
+        """Test each interface is searched and responses report their interface"""
+        sockets = {
+            '10.0.1.2': _FakeSSDPSocket([self._response('1.100', 1)]),
+            '10.0.2.2': _FakeSSDPSocket([self._response('2.100', 2), self._response('1.100', 1)]),
+        }
+
+        with patch('helpers.ssdp_custom._open_socket', side_effect=lambda iface: sockets[iface]):
+            result = ssdp_custom.discover(
+                ssdp_custom.SAMSUNG_ST, timeout=0.1, interfaces=['10.0.1.2', '10.0.2.2']
+            )
+
+        seen = {response.location: response.interface for response in result}
+        self.assertEqual(seen, {
+            'http://192.168.1.100:7676/rcr/': '10.0.1.2',
+            'http://192.168.2.100:7676/rcr/': '10.0.2.2',
+        })
+
+    def test_discovery_survives_malformed_and_large_datagrams(self):
+        """Test bad packets are skipped and responses over 1 KiB are parsed"""
+        padding = 'X-PADDING: {}\r\n'.format('x' * 4000)
+        large = self.RESPONSE.format('1.101', 2).replace('\r\n\r\n', '\r\n' + padding + '\r\n')
+        sock = _FakeSSDPSocket([
+            b'garbage',
+            self._response('1.100', 1),
+            large.encode(),
+        ])
+
+        with patch('helpers.ssdp_custom._open_socket', return_value=sock):
+            result = ssdp_custom.discover(ssdp_custom.SAMSUNG_ST, timeout=0.1)
+
+        self.assertEqual(
+            [response.location for response in result],
+            ['http://192.168.1.100:7676/rcr/', 'http://192.168.1.101:7676/rcr/']
+        )
+        self.assertEqual(result[1].usn, 'uuid:2')
+
+    @patch('helpers.ssdp_custom.socket.socket')
+    def test_iter_sweep_probes_every_host_in_batches(self, mock_socket):
+        """Test the sweep sends one unicast probe per host, batch by batch"""
+        sock = mock_socket.return_value
+        answers = [self._response('1.5', 5)]
+
+        def recv_into(buffer):
+            if not answers:
+                raise socket.timeout()
+            data = answers.pop()
+            buffer[:len(data)] = data
+            return len(data)
+
+        sock.recv_into.side_effect = recv_into
+
+        result = list(ssdp_custom.iter_sweep(['192.168.1.0/29'], timeout=0.01, batch=4))
+
+        probed = [call[0][1] for call in sock.sendto.call_args_list]
+        self.assertEqual(probed, [('192.168.1.%d' % host, 1900) for host in range(1, 7)])
+        self.assertNotIn(b'MX:', sock.sendto.call_args[0][0])
+        self.assertEqual(sock.recv_into.call_count, 3)  # answer + one timeout per batch
+        self.assertEqual([response.location for response in result], ['http://192.168.1.5:7676/rcr/'])
+        sock.close.assert_called_once()
+
+    def test_iter_sweep_invalid_range(self):
+        """Test an invalid range is rejected"""
+        with self.assertRaises(ValueError):
+            list(ssdp_custom.iter_sweep(['192.168.1.0/33']))
+
+    def test_quiet_period_ends_discovery_early(self):
+        """Test discovery returns after the quiet period instead of the hard cap"""
+        sock = _FakeSSDPSocket([self._response('1.100', 1)])
+
+        with patch('helpers.ssdp_custom._open_socket', return_value=sock):
+            started = time.monotonic()
+            result = ssdp_custom.discover(ssdp_custom.SAMSUNG_ST, timeout=5, mx=1, quiet=0.05)
+            elapsed = time.monotonic() - started
+
+        self.assertEqual(len(result), 1)
+        self.assertGreaterEqual(elapsed, 1)
+        self.assertLess(elapsed, 2)
+
+    def test_quiet_period_waits_for_mx(self):
+        """Test a device answering late within MX is not cut off by the quiet period"""
+        sock = _FakeSSDPSocket([self._response('1.100', 1)])
+        late = threading.Timer(0.5, sock._writer.send, [self._response('1.101', 2)])
+
+        with patch('helpers.ssdp_custom._open_socket', return_value=sock):
+            late.start()
+            result = ssdp_custom.discover(ssdp_custom.SAMSUNG_ST, timeout=5, mx=1, quiet=0.05)
+            late.join()
+
+        self.assertEqual(len(result), 2)
+
+    def test_hard_cap_without_responses(self):
+        """Test the quiet period only starts once a device has answered"""
+        sock = _FakeSSDPSocket([])
+
+        with patch('helpers.ssdp_custom._open_socket', return_value=sock):
+            started = time.monotonic()
+            result = ssdp_custom.discover(ssdp_custom.SAMSUNG_ST, timeout=0.2, quiet=0.01)
+            elapsed = time.monotonic() - started
+
+        self.assertEqual(result, [])
+        self.assertGreaterEqual(elapsed, 0.2)
+
+    @patch('samsung_remote.ssdpcache.load', return_value=[])
+    @patch('samsung_remote.ssdpcache.store')
+    @patch('samsung_remote.get_tv_info')
+    @patch('samsung_remote.ssdp.iter_scan_network')
+    def test_find_first_tv_skips_unreachable(self, mock_iter, mock_get_tv_info, mock_store, mock_load):
+        """Test find_first_tv returns the first TV whose description loads"""
+        tv = TVInfo('Living Room TV', '192.168.1.101', 'UN55F8000')
+        mock_iter.return_value = iter([MagicMock(), MagicMock(), MagicMock()])
+        mock_get_tv_info.side_effect = [[], [tv], [tv]]
+
+        self.assertEqual(find_first_tv(), tv)
+        self.assertEqual(mock_get_tv_info.call_count, 2)
+
+    @patch('samsung_remote.ssdpcache.clear')
+    @patch('samsung_remote.get_tv_info')
+    @patch('samsung_remote.ssdp.cached_scan')
+    def test_discover_tvs_rescans_when_a_cached_tv_is_missing(self, mock_scan, mock_get_tv_info, mock_clear):
+        """Test one unanswered cached TV is enough to rescan the network"""
+        expires = time.time() + 1800
+        cached = [ssdpcache.CachedDevice('http://192.168.1.%d:7676/rcr/' % host, 'uuid:%d' % host,
+                                         ssdp_custom.SAMSUNG_ST, '1800', expires) for host in (100, 101)]
+        scanned = [MagicMock(), MagicMock()]
+        tvs = [TVInfo('Living Room TV', '192.168.1.100', 'UN55F8000'),
+               TVInfo('Bedroom TV', '192.168.1.150', 'UN40F6400')]
+        mock_scan.side_effect = [cached, scanned]
+        mock_get_tv_info.side_effect = [tvs[:1], tvs]
+
+        self.assertEqual(discover_tvs(), tvs)
+        mock_clear.assert_called_once()
+        self.assertEqual(mock_scan.call_args[1]['use_cache'], False)
+
+    @patch('samsung_remote.ssdpcache.store')
+    @patch('samsung_remote.get_tv_info')
+    @patch('samsung_remote.ssdp.iter_scan_network', return_value=iter([]))
+    def test_find_first_tv_revalidates_cached_tv(self, mock_iter, mock_get_tv_info, mock_store):
+        """Test a TV from the SSDP cache is revalidated and its entry not extended"""
+        tv = TVInfo('Living Room TV', '192.168.1.101', 'UN55F8000')
+        cached = ssdpcache.CachedDevice('http://192.168.1.101:7676/rcr/', 'uuid:1',
+                                        ssdp_custom.SAMSUNG_ST, '1800', time.time() + 1800)
+        mock_get_tv_info.return_value = [tv]
+
+        with patch('samsung_remote.ssdpcache.load', return_value=[cached]):
+            self.assertEqual(find_first_tv(), tv)
+
+        self.assertTrue(mock_get_tv_info.call_args[1]['revalidate'])
+        mock_store.assert_not_called()
+
+
 class TestMacro(unittest.TestCase):
     """Test cases for macro module"""
 
@@ -551,13 +1141,1152 @@ class TestMacro(unittest.TestCase):
                     mock_logger.error.assert_called_once()
 
 
+class TestLint(unittest.TestCase):
+    """Test cases for lint module"""
+
+    def _write_macro(self, directory, name, content):
+        path = os.path.join(directory, name)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(content)
+        return path
+
+    def test_lint_clean_macro(self):
+        """Test lint on a valid macro reports no issues and sums waits"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = self._write_macro(tmp, 'ok.m', "#comment\nKEY_MENU, 2000\nKEY_UP\n")
+            report = lint.lint(path, send_cost=100.0)
+
+            self.assertTrue(report.ok)
+            self.assertEqual(report.issues, [])
+            self.assertEqual(report.commands, 2)
+            self.assertEqual(report.estimated_ms, 100.0 + 2000.0 + 100.0 + macro.DEFAULT_WAIT)
+
+    def test_lint_unknown_key_and_invalid_wait(self):
+        """Test lint flags unknown keys and unparseable waits as errors"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = self._write_macro(tmp, 'bad.m', "KEY_UPP, 100\nKEY_UP, soon\n")
+            report = lint.lint(path)
+
+            self.assertFalse(report.ok)
+            self.assertEqual([issue.line for issue in report.errors], [1, 2])
+
+    def test_lint_and_execute_reject_bad_waits(self):
+        """Test negative and non-finite waits are lint errors and abort the macro unsent"""
+        with tempfile.TemporaryDirectory() as tmp:
+            for wait in ('-100', 'nan', 'inf'):
+                path = self._write_macro(tmp, 'wait.m', f"KEY_UP, 100\nKEY_DOWN, {wait}\n")
+                report = lint.lint(path, send_cost=100.0)
+                self.assertEqual([issue.line for issue in report.errors], [2], wait)
+                self.assertEqual(report.estimated_ms, 300.0)
+
+                sender = MagicMock(return_value=True)
+                self.assertFalse(macro.execute({'host': '10.0.0.1'}, path, sender=sender))
+                self.assertEqual([call[0][1] for call in sender.call_args_list], ['KEY_UP'])
+
+    def test_lint_unreachable_after_poweroff(self):
+        """Test lint warns about commands after KEY_POWEROFF"""
+        with tempfile.TemporaryDirectory() as tmp:
+            path = self._write_macro(
+                tmp, 'off.m', "KEY_POWEROFF\nKEY_POWEROFF\nKEY_VOLUP\nKEY_POWERON\nKEY_VOLUP\n"
+            )
+            report = lint.lint(path)
+
+            self.assertTrue(report.ok)
+            self.assertEqual([issue.line for issue in report.issues], [2, 3])
+
+    def test_lint_many_directory(self):
+        """Test linting a directory returns reports in sorted file order"""
+        with tempfile.TemporaryDirectory() as tmp:
+            self._write_macro(tmp, 'b.m', "KEY_UP\n")
+            self._write_macro(tmp, 'a.csv', "KEY_NOPE\n")
+            self._write_macro(tmp, 'notes.txt', "ignored\n")
+
+            files = lint.find_macros(tmp)
+            reports = lint.lint_many(files, max_workers=2)
+
+            self.assertEqual([os.path.basename(r.filename) for r in reports], ['a.csv', 'b.m'])
+            self.assertFalse(reports[0].ok)
+            self.assertTrue(reports[1].ok)
+
+
+class TestHTTPPool(unittest.TestCase):
+    """Test cases for httppool module against a local keep-alive server"""
+
+    def setUp(self):
+        import http.server
+        import threading
+
+        test = self
+        self.connections = 0
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                super().setup()
+                test.connections += 1
+
+            def do_GET(self):
+                if self.headers.get('If-None-Match') == '"v1"':
+                    self.send_response(304)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                if self.path == '/moved':
+                    self.send_response(302)
+                    self.send_header('Location', '/desc.xml')
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                if self.path == '/invalid':
+                    self.wfile.write(b'HTTP/1.1 200 OK\r\nX-Long: ' + b'x' * 70000 + b'\r\n\r\n')
+                    return
+                status = 404 if self.path == '/missing' else 200
+                body = b'<root>' + b'x' * 100 + b'</root>'
+                self.send_response(status)
+                self.send_header('Content-Length', str(len(body)))
+                self.send_header('ETag', '"v1"')
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.url = 'http://127.0.0.1:%d' % self.server.server_address[1]
+        self.pool = httppool.HTTPPool()
+
+    def tearDown(self):
+        self.pool.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_connection_reused(self):
+        """Test consecutive requests to one host share a connection"""
+        for _ in range(3):
+            with self.pool.urlopen(self.url + '/desc.xml', timeout=2) as response:
+                self.assertEqual(response.status, 200)
+                self.assertTrue(response.read().startswith(b'<root>'))
+
+        self.assertEqual(self.connections, 1)
+        self.assertEqual(len(self.pool), 1)
+
+    def test_partial_read_drained_and_reused(self):
+        """Test a response closed early is drained so the connection stays usable"""
+        with self.pool.urlopen(self.url + '/desc.xml', timeout=2) as response:
+            response.read(10)
+        with self.pool.urlopen(self.url + '/desc.xml', timeout=2) as response:
+            response.read()
+
+        self.assertEqual(self.connections, 1)
+
+    def test_error_statuses_raise_http_error(self):
+        """Test 304 and 404 surface as HTTPError like urllib does"""
+        import urllib.error
+        import urllib.request
+        request = urllib.request.Request(self.url + '/desc.xml', headers={'If-None-Match': '"v1"'})
+        with self.assertRaises(urllib.error.HTTPError) as ctx:
+            self.pool.urlopen(request, timeout=2)
+        self.assertEqual(ctx.exception.code, 304)
+
+        with self.assertRaises(urllib.error.HTTPError) as ctx:
+            self.pool.urlopen(self.url + '/missing', timeout=2)
+        self.assertEqual(ctx.exception.code, 404)
+        self.assertEqual(self.connections, 1)
+
+    def test_redirect_followed(self):
+        """Test redirects are followed over the pooled connection"""
+        with self.pool.urlopen(self.url + '/moved', timeout=2) as response:
+            self.assertEqual(response.status, 200)
+            self.assertEqual(response.url, self.url + '/desc.xml')
+            response.read()
+
+        self.assertEqual(self.connections, 1)
+
+    def test_invalid_response_raises_url_error(self):
+        """Test a malformed response becomes URLError and its connection is dropped"""
+        import urllib.error
+        with self.assertRaises(urllib.error.URLError):
+            self.pool.urlopen(self.url + '/invalid', timeout=2)
+        self.assertEqual(len(self.pool), 0)
+
+    def test_unreachable_raises_url_error(self):
+        """Test connection failures surface as URLError"""
+        import urllib.error
+        closed = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        closed.bind(('127.0.0.1', 0))
+        port = closed.getsockname()[1]
+        closed.close()
+
+        with self.assertRaises(urllib.error.URLError):
+            self.pool.urlopen('http://127.0.0.1:%d/' % port, timeout=1)
+
+
+class TestCapability(unittest.TestCase):
+    """Test cases for capability module"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'capabilities.json')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_open_ports(self):
+        """Test open_ports reports listening ports and skips closed ones"""
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(1)
+        closed = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        closed.bind(('127.0.0.1', 0))
+        closed_port = closed.getsockname()[1]
+        closed.close()
+        try:
+            open_port = listener.getsockname()[1]
+            ports = capability.open_ports('127.0.0.1', [open_port, closed_port], timeout=1)
+        finally:
+            listener.close()
+
+        self.assertEqual(ports, {open_port})
+
+    def test_probe(self):
+        """Test the method chosen for each combination of exposed APIs"""
+        cases = [
+            ({8001}, False, 'websocket'),
+            ({8001, 55000}, True, 'websocket'),
+            ({8001, 55000}, False, 'legacy'),
+            ({55000}, False, 'legacy'),
+            (set(), False, None),
+        ]
+        for ports, rest, expected in cases:
+            with self.subTest(ports=ports, rest=rest):
+                with patch('helpers.capability.open_ports', return_value=ports), \
+                        patch('helpers.capability.has_rest_api', return_value=rest):
+                    self.assertEqual(capability.probe('192.168.1.100'), expected)
+
+    @patch('helpers.capability.probe')
+    def test_detect_caches_probe_result(self, mock_probe):
+        """Test a probed method is cached and reused without probing again"""
+        mock_probe.return_value = 'legacy'
+
+        # A model letter that getMethod would misclassify as websocket
+        first = capability.detect('192.168.1.100', 'UE40ZZ6400', path=self.path)
+        second = capability.detect('192.168.1.100', 'UE40ZZ6400', path=self.path)
+
+        self.assertEqual((first, second), ('legacy', 'legacy'))
+        mock_probe.assert_called_once()
+
+        capability.forget('192.168.1.100', path=self.path)
+        self.assertEqual(capability.load(self.path), {})
+
+    @patch('helpers.capability.probe')
+    def test_detect_falls_back_to_model(self, mock_probe):
+        """Test the model guess is used, but not cached, when the probe fails"""
+        mock_probe.return_value = None
+
+        self.assertEqual(capability.detect('192.168.1.100', 'UN55F8000', path=self.path), 'legacy')
+        self.assertEqual(capability.load(self.path), {})
+
+
+@patch('helpers.tvcon.samsungctl.Config', create=True)
+@patch('helpers.tvcon.samsungctl.Remote')
+class TestRemotePool(unittest.TestCase):
+    """Test cases for tvcon.RemotePool"""
+
+    CONFIG = {'host': '192.168.1.100', 'method': 'websocket'}
+
+    def test_connection_reused(self, mock_remote, mock_config):
+        """Test consecutive sends to one TV share a connection"""
+        pool = tvcon.RemotePool()
+
+        self.assertTrue(pool.send(self.CONFIG, 'KEY_VOLUP'))
+        self.assertTrue(pool.send(self.CONFIG, 'KEY_VOLDOWN'))
+
+        mock_remote.assert_called_once()
+        self.assertEqual(mock_remote.return_value.control.call_count, 2)
+        self.assertEqual(len(pool), 1)
+
+        pool.close()
+        mock_remote.return_value.close.assert_called_once()
+        self.assertEqual(len(pool), 0)
+
+    def test_dropped_connection_reopened(self, mock_remote, mock_config):
+        """Test a connection closed by the TV is reopened once"""
+        pool = tvcon.RemotePool()
+        pool.send(self.CONFIG, 'KEY_VOLUP')
+        mock_remote.return_value.control.side_effect = [OSError('closed'), None]
+
+        self.assertTrue(pool.send(self.CONFIG, 'KEY_VOLUP'))
+        self.assertEqual(mock_remote.call_count, 2)
+
+    def test_new_connection_failure_not_retried(self, mock_remote, mock_config):
+        """Test a TV that refuses a fresh connection fails without retrying"""
+        mock_remote.side_effect = OSError('refused')
+        pool = tvcon.RemotePool()
+
+        self.assertFalse(pool.send(self.CONFIG, 'KEY_VOLUP'))
+        mock_remote.assert_called_once()
+
+    def test_metrics_recorded(self, mock_remote, mock_config):
+        """Test sends, connects and open connections are counted"""
+        sent = tvcon.SENDS.value('192.168.1.100', 'KEY_MUTE', 'ok')
+        failed = tvcon.SENDS.value('192.168.1.100', 'KEY_MUTE', 'error')
+        connects = tvcon.CONNECT_SECONDS.count('websocket')
+        open_connections = tvcon.POOL_CONNECTIONS.value()
+        pool = tvcon.RemotePool()
+
+        pool.send(self.CONFIG, 'KEY_MUTE')
+        pool.send(self.CONFIG, 'KEY_MUTE')
+        self.assertEqual(tvcon.POOL_CONNECTIONS.value(), open_connections + 1)
+
+        mock_remote.return_value.control.side_effect = OSError('closed')
+        pool.send(self.CONFIG, 'KEY_MUTE')
+        pool.close()
+
+        self.assertEqual(tvcon.SENDS.value('192.168.1.100', 'KEY_MUTE', 'ok'), sent + 2)
+        self.assertEqual(tvcon.SENDS.value('192.168.1.100', 'KEY_MUTE', 'error'), failed + 1)
+        self.assertEqual(tvcon.CONNECT_SECONDS.count('websocket'), connects + 2)
+        self.assertEqual(tvcon.POOL_CONNECTIONS.value(), open_connections)
+
+    def test_metric_labels_bounded(self, mock_remote, mock_config):
+        """Test unknown keys and hosts outside the registry share the 'other' label"""
+        known = tvcon.SENDS.value('10.0.0.1', 'other', 'ok')
+        other = tvcon.SENDS.value('other', 'other', 'ok')
+        pool = tvcon.RemotePool(known_host=lambda host: host == '10.0.0.1')
+
+        pool.send(dict(self.CONFIG, host='10.0.0.1'), 'KEY_NOT_A_KEY')
+        pool.send(dict(self.CONFIG, host='10.0.0.99'), 'KEY_NOT_A_KEY')
+        pool.close()
+
+        self.assertEqual(tvcon.SENDS.value('10.0.0.1', 'other', 'ok'), known + 1)
+        self.assertEqual(tvcon.SENDS.value('other', 'other', 'ok'), other + 1)
+        self.assertEqual(tvcon.SENDS.value('10.0.0.99', 'KEY_NOT_A_KEY', 'ok'), 0)
+
+    def test_negative_wait_counts_one_ok_send(self, mock_remote, mock_config):
+        """Test a negative wait does not turn a sent key into an error"""
+        ok = tvcon.SENDS.value('192.168.1.100', 'KEY_MUTE', 'ok')
+        error = tvcon.SENDS.value('192.168.1.100', 'KEY_MUTE', 'error')
+
+        self.assertTrue(tvcon.send(self.CONFIG, 'KEY_MUTE', -100))
+
+        self.assertEqual(tvcon.SENDS.value('192.168.1.100', 'KEY_MUTE', 'ok'), ok + 1)
+        self.assertEqual(tvcon.SENDS.value('192.168.1.100', 'KEY_MUTE', 'error'), error)
+
+    def test_macro_uses_pool(self, mock_remote, mock_config):
+        """Test macro.execute sends through a custom sender"""
+        pool = tvcon.RemotePool()
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as macro_file:
+            macro_file.write("KEY_UP,0\nKEY_DOWN,0\n")
+        try:
+            self.assertTrue(macro.execute(self.CONFIG, macro_file.name, sender=pool.send))
+        finally:
+            os.unlink(macro_file.name)
+
+        mock_remote.assert_called_once()
+        self.assertEqual(mock_remote.return_value.control.call_count, 2)
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Test cases for tvcon.RateLimiter"""
+
+    def test_burst_not_delayed(self):
+        """Test sends within the burst go out without waiting"""
+        limiter = tvcon.RateLimiter(rate=1.0, burst=3)
+        with patch('helpers.tvcon.time.sleep') as mock_sleep:
+            delays = [limiter.acquire() for _ in range(3)]
+        self.assertEqual(delays, [0.0, 0.0, 0.0])
+        mock_sleep.assert_not_called()
+
+    def test_paced_after_burst(self):
+        """Test sends beyond the burst wait for the rate"""
+        with patch('helpers.tvcon.time.monotonic', return_value=100.0), \
+                patch('helpers.tvcon.time.sleep') as mock_sleep:
+            limiter = tvcon.RateLimiter(rate=10.0, burst=1)
+            limiter.acquire()
+            delay = limiter.acquire()
+        self.assertAlmostEqual(delay, 0.1)
+        mock_sleep.assert_called_once()
+
+    def test_idle_time_refills(self):
+        """Test a key arriving after a pause is not delayed"""
+        with patch('helpers.tvcon.time.monotonic', side_effect=[100.0, 100.0, 101.0]), \
+                patch('helpers.tvcon.time.sleep') as mock_sleep:
+            limiter = tvcon.RateLimiter(rate=10.0, burst=1)
+            limiter.acquire()
+            self.assertEqual(limiter.acquire(), 0.0)
+        mock_sleep.assert_not_called()
+
+    def test_invalid_rate(self):
+        """Test a non-positive rate is rejected"""
+        with self.assertRaises(ValueError):
+            tvcon.RateLimiter(rate=0)
+
+
+class TestRepl(unittest.TestCase):
+    """Test cases for repl.run"""
+
+    CONFIG = {'host': '192.168.1.100', 'method': 'websocket'}
+
+    def test_keys_sent_over_one_pool(self):
+        """Test keys, comments and blank lines from a stream"""
+        pool = MagicMock()
+        pool.send.return_value = True
+        stream = io.StringIO("KEY_VOLUP\n\n# comment\nKEY_VOLDOWN KEY_MUTE\n")
+
+        self.assertTrue(repl.run(self.CONFIG, stream, rate=1000, pool=pool))
+
+        self.assertEqual([c.args[1] for c in pool.send.call_args_list],
+                         ['KEY_VOLUP', 'KEY_VOLDOWN', 'KEY_MUTE'])
+        pool.close.assert_not_called()
+
+    def test_quit_stops_reading(self):
+        """Test 'quit' ends the session before later keys"""
+        pool = MagicMock()
+        pool.send.return_value = True
+
+        repl.run(self.CONFIG, io.StringIO("KEY_UP\nquit\nKEY_DOWN\n"), rate=1000, pool=pool)
+
+        pool.send.assert_called_once_with(self.CONFIG, 'KEY_UP')
+
+    def test_failure_reported(self):
+        """Test a failed key makes the session fail but later keys are still sent"""
+        pool = MagicMock()
+        pool.send.side_effect = [False, True]
+
+        self.assertFalse(repl.run(self.CONFIG, io.StringIO("KEY_UP\nKEY_DOWN\n"), rate=1000, pool=pool))
+        self.assertEqual(pool.send.call_count, 2)
+
+    @patch('helpers.repl.tvcon.RemotePool')
+    def test_private_pool_closed(self, mock_pool):
+        """Test the pool created for the session is closed at the end"""
+        repl.run(self.CONFIG, io.StringIO(""))
+        mock_pool.return_value.close.assert_called_once()
+
+
+class TestInventory(unittest.TestCase):
+    """Test cases for inventory module"""
+
+    DATA = {
+        'defaults': {'method': 'websocket'},
+        'tvs': {
+            'lobby-left': {'host': '10.1.0.21'},
+            'lobby-right': {'host': '10.1.0.22', 'method': 'legacy'},
+            'bar': {'host': '10.1.2.40', 'port': 55001},
+            'office': '10.1.3.10',
+        },
+        'groups': {
+            'lobby': ['lobby-left', 'lobby-right'],
+            'ground-floor': ['lobby', 'bar'],
+        },
+    }
+
+    def _write(self, suffix, text):
+        fd, path = tempfile.mkstemp(suffix=suffix)
+        with os.fdopen(fd, 'w') as f:
+            f.write(text)
+        self.addCleanup(os.unlink, path)
+        return path
+
+    def test_defaults_and_overrides(self):
+        """Test per-device fields override the defaults"""
+        fleet = inventory.Inventory.from_dict(self.DATA)
+        self.assertEqual(fleet.devices['lobby-left'].method, 'websocket')
+        self.assertEqual(fleet.devices['lobby-right'].method, 'legacy')
+        self.assertEqual(fleet.devices['bar'].port, 55001)
+        self.assertEqual(fleet.devices['office'].host, '10.1.3.10')
+
+    def test_select_nested_groups(self):
+        """Test groups expand recursively without duplicates"""
+        fleet = inventory.Inventory.from_dict(self.DATA)
+        selected = fleet.select(['ground-floor', 'lobby-left'])
+        self.assertEqual([device.name for device in selected], ['lobby-left', 'lobby-right', 'bar'])
+        self.assertEqual(len(fleet.all()), 4)
+
+    def test_select_unknown_name(self):
+        """Test selecting an undefined name fails"""
+        fleet = inventory.Inventory.from_dict(self.DATA)
+        with self.assertRaises(LookupError):
+            fleet.select(['basement'])
+
+    def test_invalid_inventories(self):
+        """Test malformed inventories are rejected"""
+        invalid = [
+            {'tvs': {'tv': {}}},
+            {'tvs': {'tv': {'host': '10.0.0.1', 'method': 'ir'}}},
+            {'tvs': {'tv': '10.0.0.1'}, 'groups': {'all': ['tv', 'missing']}},
+            {'tvs': {'tv': '10.0.0.1'}, 'groups': {'tv': ['tv']}},
+        ]
+        for data in invalid:
+            with self.subTest(data=data):
+                with self.assertRaises(ValueError):
+                    inventory.Inventory.from_dict(data)
+
+    def test_load_formats(self):
+        """Test JSON, TOML and YAML files load the same inventory"""
+        files = [
+            self._write('.json', json.dumps(self.DATA)),
+            self._write('.toml', 'tvs.tv = "10.0.0.1"\ngroups.room = ["tv"]\n'),
+            self._write('.yaml', 'tvs:\n  tv: 10.0.0.1\ngroups:\n  room: [tv]\n'),
+        ]
+        for path in files:
+            with self.subTest(path=path):
+                fleet = inventory.Inventory.load(path)
+                self.assertTrue(fleet.select(['lobby' if path.endswith('.json') else 'room']))
+
+    def test_load_errors(self):
+        """Test unsupported and malformed files raise ValueError"""
+        for path in (self._write('.ini', 'x'), self._write('.json', '{')):
+            with self.subTest(path=path):
+                with self.assertRaises(ValueError):
+                    inventory.Inventory.load(path)
+
+    def test_run_parallel(self):
+        """Test run keeps device order and counts exceptions as failures"""
+        fleet = inventory.Inventory.from_dict(self.DATA)
+
+        def task(device):
+            if device.name == 'bar':
+                raise OSError('unreachable')
+            return device.name != 'office'
+
+        results = inventory.run(fleet.all(), task)
+        self.assertEqual([(device.name, ok) for device, ok in results],
+                         [('lobby-left', True), ('lobby-right', True), ('bar', False), ('office', False)])
+
+    @patch('samsung_remote.ssdp.scan_network')
+    @patch('samsung_remote.capability.detect')
+    @patch('samsung_remote.tvcon.send')
+    def test_main_group(self, mock_send, mock_detect, mock_scan_network):
+        """Test -g sends to the group without discovery, using inventory methods"""
+        path = self._write('.json', json.dumps(self.DATA))
+        mock_send.return_value = True
+        argv = ['samsung_remote.py', '-g', 'ground-floor', '--inventory', path, '-k', 'KEY_MUTE']
+
+        with patch('samsung_remote.sys.argv', argv):
+            with self.assertRaises(SystemExit) as cm:
+                main()
+
+        self.assertEqual(cm.exception.code, 0)
+        mock_scan_network.assert_not_called()
+        mock_detect.assert_not_called()
+        sent = sorted((c.args[0]['host'], c.args[0]['method'], c.args[0]['port']) for c in mock_send.call_args_list)
+        self.assertEqual(sent, [('10.1.0.21', 'websocket', 55000), ('10.1.0.22', 'legacy', 55000),
+                                ('10.1.2.40', 'websocket', 55001)])
+
+    @patch('samsung_remote.tvcon.send')
+    def test_main_group_failure_exit(self, mock_send):
+        """Test a failing TV in the group makes the command fail"""
+        path = self._write('.json', json.dumps(self.DATA))
+        mock_send.side_effect = lambda config, key: config['host'] != '10.1.0.22'
+        argv = ['samsung_remote.py', '-g', 'lobby', '--inventory', path, '-k', 'KEY_MUTE']
+
+        with patch('samsung_remote.sys.argv', argv):
+            with self.assertRaises(SystemExit) as cm:
+                main()
+        self.assertEqual(cm.exception.code, 1)
+
+
+class TestTVRegistry(unittest.TestCase):
+    """Test cases for tvregistry.TVRegistry"""
+
+    def setUp(self):
+        self.registry = tvregistry.TVRegistry()
+        self.registry.update({'fn': 'Lobby', 'ip': '10.1.0.21', 'model': 'UN55F8000'}, usn='uuid:1')
+        self.registry.update({'fn': 'Lobby', 'ip': '10.1.0.22', 'model': 'UN55F8000'}, usn='uuid:2')
+        self.registry.update({'fn': 'Bar', 'ip': '10.1.2.40', 'model': 'QN65Q80T'}, usn='uuid:3')
+
+    def test_indexes(self):
+        """Test lookups by IP, USN, name, series and subnet"""
+        self.assertEqual(self.registry.get('10.1.2.40').fn, 'Bar')
+        self.assertEqual(self.registry.by_usn('uuid:2').ip, '10.1.0.22')
+        self.assertEqual([r.ip for r in self.registry.by_name('lobby')], ['10.1.0.21', '10.1.0.22'])
+        self.assertEqual([r.ip for r in self.registry.by_series('F')], ['10.1.0.21', '10.1.0.22'])
+        self.assertEqual([r.ip for r in self.registry.in_subnet('10.1.0.0/24')], ['10.1.0.21', '10.1.0.22'])
+        self.assertEqual(len(self.registry.in_subnet('10.1.0.0/16')), 3)
+        self.assertEqual(self.registry.in_subnet('192.168.0.0/16'), [])
+
+    def test_records_are_compact(self):
+        """Test records use slots and share interned model strings"""
+        first, second = self.registry.by_name('Lobby')
+        self.assertFalse(hasattr(first, '__dict__'))
+        self.assertIs(first.model, second.model)
+
+    def test_update_in_place(self):
+        """Test refreshing a TV reindexes it and keeps its transport"""
+        self.registry.set_method('10.1.2.40', 'websocket')
+        self.registry.update({'fn': 'Terrace', 'ip': '10.1.2.40', 'model': 'QN65Q80T'})
+
+        self.assertEqual(self.registry.by_name('Bar'), [])
+        self.assertEqual(self.registry.by_name('Terrace')[0].method, 'websocket')
+        self.assertEqual(len(self.registry), 3)
+
+    def test_usn_moves_address(self):
+        """Test a TV seen at a new IP replaces its old entry"""
+        self.registry.set_method('10.1.2.40', 'legacy')
+        self.registry.update({'fn': 'Bar', 'ip': '10.1.5.5', 'model': 'QN65Q80T'}, usn='uuid:3')
+
+        self.assertNotIn('10.1.2.40', self.registry)
+        self.assertEqual(self.registry.by_usn('uuid:3').method, 'legacy')
+        self.assertEqual([r.ip for r in self.registry.in_subnet('10.1.5.0/24')], ['10.1.5.5'])
+
+    def test_retain(self):
+        """Test retain drops TVs from every index"""
+        self.registry.retain(['10.1.0.21'])
+
+        self.assertEqual(len(self.registry), 1)
+        self.assertIsNone(self.registry.by_usn('uuid:3'))
+        self.assertEqual(self.registry.by_series('Q'), [])
+        self.assertEqual(len(self.registry.in_subnet('10.0.0.0/8')), 1)
+
+
+class TestMetrics(unittest.TestCase):
+    """Test cases for metrics module"""
+
+    def setUp(self):
+        self.registry = metrics.Registry()
+
+    def test_counter_and_gauge_text(self):
+        """Test counters and gauges render in the Prometheus text format"""
+        sends = self.registry.register(metrics.Counter('sends_total', 'Sends', ('host', 'outcome')))
+        sends.inc('10.0.0.1', 'ok')
+        sends.inc('10.0.0.1', 'ok')
+        sends.inc('tv "a"\\', 'error')
+        size = self.registry.register(metrics.Gauge('pool_size', 'Pool size'))
+        size.set_function(lambda: 3)
+
+        self.assertEqual(self.registry.render(), (
+            '# HELP pool_size Pool size\n'
+            '# TYPE pool_size gauge\n'
+            'pool_size 3\n'
+            '# HELP sends_total Sends\n'
+            '# TYPE sends_total counter\n'
+            'sends_total{host="10.0.0.1",outcome="ok"} 2\n'
+            'sends_total{host="tv \\"a\\"\\\\",outcome="error"} 1\n'
+        ))
+
+    def test_histogram_buckets(self):
+        """Test histogram buckets are cumulative with sum and count"""
+        latency = self.registry.register(metrics.Histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0)))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            latency.observe(value)
+
+        lines = self.registry.render().splitlines()[2:]
+        self.assertEqual(lines, [
+            'latency_seconds_bucket{le="0.1"} 2',
+            'latency_seconds_bucket{le="1"} 3',
+            'latency_seconds_bucket{le="+Inf"} 4',
+            'latency_seconds_sum 3.65',
+            'latency_seconds_count 4',
+        ])
+
+    def test_metric_base_is_abstract(self):
+        """Test a metric type must implement samples"""
+        with self.assertRaises(TypeError):
+            metrics._Metric('base', 'Base')
+
+    def test_register_existing(self):
+        """Test registering a name twice returns the first metric unless the type differs"""
+        first = self.registry.register(metrics.Counter('sends_total', 'Sends'))
+        self.assertIs(self.registry.register(metrics.Counter('sends_total', 'Sends')), first)
+        with self.assertRaises(ValueError):
+            self.registry.register(metrics.Gauge('sends_total', 'Sends'))
+        with self.assertRaises(ValueError):
+            first.inc('unexpected label')
+
+
+class TestProfiling(unittest.TestCase):
+    """Test cases for profiling module"""
+
+    def setUp(self):
+        profiling.reset()
+        self.addCleanup(profiling.reset)
+
+    def test_phases_accumulate(self):
+        """Test phase time and occurrences add up"""
+        profiling.record('send', 0.25)
+        with profiling.phase('send'):
+            pass
+
+        seconds, count = profiling.totals()['send']
+        self.assertGreaterEqual(seconds, 0.25)
+        self.assertEqual(count, 2)
+
+    def test_report(self):
+        """Test the report lists phases in order with the unaccounted time"""
+        profiling.record('sleep', 0.5)
+        profiling.record('discovery', 1.0)
+
+        lines = profiling.report(2.0).splitlines()
+
+        self.assertEqual([line.split()[0] for line in lines[1:]], ['discovery', 'sleep', 'other', 'total'])
+        self.assertIn('50.0%', lines[1])
+        self.assertEqual(lines[3].split(), ['other', '0.500'])
+
+    @patch('helpers.tvcon.samsungctl.Config', create=True)
+    @patch('helpers.tvcon.samsungctl.Remote')
+    def test_send_phases(self, mock_remote, mock_config):
+        """Test pooled sends record connect, send and sleep phases"""
+        pool = tvcon.RemotePool()
+        pool.send({'host': '192.168.1.100'}, 'KEY_MUTE', wait_time=1)
+        pool.send({'host': '192.168.1.100'}, 'KEY_MUTE')
+
+        recorded = profiling.totals()
+        self.assertEqual({name: count for name, (_, count) in recorded.items()},
+                         {'connect': 1, 'send': 2, 'sleep': 1})
+
+    def test_session(self):
+        """Test a session prints the report and can write pstats data"""
+        with profiling.session(None):
+            pass
+
+        output = io.StringIO()
+        with profiling.session('', stream=output):
+            sum(range(1000))
+        self.assertIn('total', output.getvalue())
+        self.assertIn('function calls', output.getvalue())
+
+        fd, path = tempfile.mkstemp(suffix='.prof')
+        os.close(fd)
+        self.addCleanup(os.unlink, path)
+        output = io.StringIO()
+        with self.assertRaises(SystemExit):
+            with profiling.session(path, stream=output):
+                sys.exit(0)
+        self.assertIn(path, output.getvalue())
+        import pstats
+        self.assertTrue(pstats.Stats(path).stats)
+
+
+class TestTracing(unittest.TestCase):
+    """Test cases for tracing module"""
+
+    def setUp(self):
+        self.started = []
+        self.ended = []
+        self.hook = tracing.add_hook(self.started.append, self.ended.append)
+        self.addCleanup(tracing.remove_hook, self.hook)
+
+    def test_nested_spans(self):
+        """Test children share the trace and point at their parent"""
+        with tracing.span('request', op='send') as parent:
+            with tracing.span('tvcon.send', host='10.0.0.1') as child:
+                child.set('ok', True)
+
+        self.assertEqual([span.name for span in self.started], ['request', 'tvcon.send'])
+        self.assertEqual([span.name for span in self.ended], ['tvcon.send', 'request'])
+        self.assertEqual(child.trace_id, parent.trace_id)
+        self.assertEqual(child.parent_id, parent.span_id)
+        self.assertIsNone(parent.parent_id)
+        self.assertEqual(child.attributes, {'host': '10.0.0.1', 'ok': True})
+        self.assertGreaterEqual(child.duration, 0)
+
+    def test_error_recorded(self):
+        """Test an exception is recorded on the span and re-raised"""
+        with self.assertRaises(ValueError):
+            with tracing.span('tvinfo.get'):
+                raise ValueError('bad XML')
+        with self.assertRaises(SystemExit):
+            with tracing.span('samsung_remote'):
+                sys.exit(0)
+
+        self.assertEqual([span.error for span in self.ended], ['ValueError: bad XML', None])
+
+    def test_bind_across_threads(self):
+        """Test spans in worker threads are children of the submitting span"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        def work():
+            with tracing.span('worker') as span:
+                return span
+
+        with tracing.span('request') as parent:
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                bound = executor.submit(tracing.bind(work)).result()
+                unbound = executor.submit(work).result()
+
+        self.assertEqual(bound.parent_id, parent.span_id)
+        self.assertIsNone(unbound.parent_id)
+
+    def test_no_hooks(self):
+        """Test spans are free when nothing listens"""
+        tracing.remove_hook(self.hook)
+        with tracing.span('tvcon.send') as span:
+            span.set('ok', True)
+        self.assertNotIsInstance(span, tracing.Span)
+
+    def test_failing_hook_ignored(self):
+        """Test an exception in a hook does not break the traced code"""
+        hook = tracing.add_hook(on_end=MagicMock(side_effect=RuntimeError('exporter down')))
+        try:
+            with tracing.span('macro.execute'):
+                pass
+        finally:
+            tracing.remove_hook(hook)
+        self.assertEqual(len(self.ended), 1)
+
+    def test_macro_and_sends_traced(self):
+        """Test a macro span contains one child span per pooled send"""
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as macro_file:
+            macro_file.write("KEY_UP,0\nKEY_DOWN,0\n")
+        self.addCleanup(os.unlink, macro_file.name)
+
+        with patch('helpers.tvcon.samsungctl.Config', create=True), patch('helpers.tvcon.samsungctl.Remote'):
+            pool = tvcon.RemotePool()
+            self.assertTrue(macro.execute({'host': '10.0.0.1'}, macro_file.name, sender=pool.send))
+
+        macro_span = self.ended[-1]
+        sends = [span for span in self.ended if span.name == 'tvcon.send']
+        self.assertEqual(macro_span.name, 'macro.execute')
+        self.assertTrue(macro_span.attributes['ok'])
+        self.assertEqual([span.attributes['key'] for span in sends], ['KEY_UP', 'KEY_DOWN'])
+        self.assertTrue(all(span.parent_id == macro_span.span_id for span in sends))
+        self.assertEqual([span.attributes['reused'] for span in sends], [False, True])
+
+    def test_opentelemetry_optional(self):
+        """Test the OpenTelemetry adapter is skipped when the package is missing"""
+        with patch.dict(sys.modules, {'opentelemetry': None}):
+            self.assertIsNone(tracing.use_opentelemetry())
+
+
+class TestRemoteService(unittest.TestCase):
+    """Test cases for service.RemoteService request handling"""
+
+    def setUp(self):
+        self.service = service.RemoteService(use_cache=False, listen=False)
+        self.service.remotes = MagicMock()
+        self.service.remotes.send.return_value = True
+
+    @patch('helpers.service.capability.detect', return_value='legacy')
+    @patch('helpers.service.tvinfo.get_many')
+    @patch('helpers.service.ssdp.cached_scan')
+    def test_send_to_first_tv(self, mock_scan, mock_get_many, mock_detect):
+        """Test a send without host discovers once and remembers the method"""
+        mock_scan.return_value = [ssdp.SSDPResponse('http://192.168.1.100:7676/', 'uuid:1', 'st')]
+        mock_get_many.return_value = [{'fn': 'TV', 'ip': '192.168.1.100', 'model': 'UN55F8000'}]
+
+        for _ in range(2):
+            self.assertEqual(self.service.handle({'op': 'send', 'key': 'KEY_MUTE'}), {'ok': True})
+
+        mock_scan.assert_called_once()
+        mock_detect.assert_called_once()
+        config = self.service.remotes.send.call_args[0][0]
+        self.assertEqual((config['host'], config['method']), ('192.168.1.100', 'legacy'))
+
+    def test_batch_runs_tvs_concurrently(self):
+        """Test a batch drives several TVs in parallel and keeps command order"""
+        def send(config, key, wait):
+            time.sleep(0.1)
+            return config['host'] != '10.0.0.2'
+
+        self.service.remotes.send.side_effect = send
+        commands = [{'host': '10.0.0.%d' % i, 'keys': ['KEY_MUTE'], 'method': 'legacy'}
+                    for i in range(1, 5)]
+
+        start = time.monotonic()
+        reply = self.service.handle({'op': 'batch', 'commands': commands})
+
+        self.assertLess(time.monotonic() - start, 0.3)
+        self.assertFalse(reply['ok'])
+        self.assertEqual([r['host'] for r in reply['results']], ['10.0.0.1', '10.0.0.2', '10.0.0.3', '10.0.0.4'])
+        self.assertEqual([r['ok'] for r in reply['results']], [True, False, True, True])
+
+    def test_registry_lookups(self):
+        """Test TVs can be filtered and addressed by friendly name"""
+        self.service.registry.update({'fn': 'Lobby', 'ip': '10.1.0.21', 'model': 'UN55F8000'})
+        self.service.registry.update({'fn': 'Bar', 'ip': '10.1.2.40', 'model': 'QN65Q80T'}, method='websocket')
+
+        reply = self.service.handle({'op': 'tvs', 'series': 'F'})
+        self.assertEqual([tv['ip'] for tv in reply['tvs']], ['10.1.0.21'])
+        reply = self.service.handle({'op': 'tvs', 'subnet': '10.1.2.0/24'})
+        self.assertEqual([tv['ip'] for tv in reply['tvs']], ['10.1.2.40'])
+
+        self.assertTrue(self.service.handle({'op': 'send', 'key': 'KEY_MUTE', 'host': 'bar'})['ok'])
+        config = self.service.remotes.send.call_args[0][0]
+        self.assertEqual((config['host'], config['method']), ('10.1.2.40', 'websocket'))
+
+    def test_requests_traced(self):
+        """Test each request is a span and batch commands are its children"""
+        ended = []
+        hook = tracing.add_hook(on_end=ended.append)
+        self.addCleanup(tracing.remove_hook, hook)
+
+        self.service.handle({'op': 'batch', 'commands': [{'host': '10.0.0.1', 'key': 'KEY_MUTE', 'method': 'legacy'}]})
+
+        inner, outer = ended
+        self.assertEqual((outer.attributes['op'], inner.attributes['op']), ('batch', 'send'))
+        self.assertEqual(inner.parent_id, outer.span_id)
+        self.assertTrue(outer.attributes['ok'])
+
+    def test_errors_are_replies(self):
+        """Test bad requests produce error replies instead of exceptions"""
+        self.assertTrue(self.service.handle({'op': 'nope'})['invalid'])
+        reply = self.service.handle({'op': 'send', 'host': '1.2.3.4'})
+        self.assertIn('key', reply['error'])
+        self.assertTrue(reply['invalid'])
+        self.assertTrue(self.service.handle({'op': 'batch', 'commands': 'KEY_MUTE'})['invalid'])
+        for request in ({'op': 'send', 'key': 5}, {'op': 'send_many', 'keys': 'KEY_MUTE'},
+                        {'op': 'send_many', 'keys': ['KEY_MUTE', None]}):
+            with self.subTest(request=request):
+                self.assertTrue(self.service.handle(dict(request, host='1.2.3.4'))['invalid'])
+        # A KeyError raised while handling a well-formed request is not the caller's fault
+        with patch.object(self.service, 'send', side_effect=KeyError('method')):
+            reply = self.service.handle({'op': 'send', 'key': 'KEY_MUTE', 'host': '1.2.3.4'})
+        self.assertNotIn('invalid', reply)
+        self.assertIn('unexpected error', reply['error'])
+        with patch.object(self.service, 'scan', return_value=[]):
+            reply = self.service.handle({'op': 'send', 'key': 'KEY_MUTE'})
+        self.assertEqual(reply, {'ok': False, 'error': 'No Samsung TV found in the network'})
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'requires Unix domain sockets')
+class TestDaemon(unittest.TestCase):
+    """Test cases for the daemon socket server"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'daemon.sock')
+        self.service = MagicMock()
+        self.service.handle.side_effect = lambda request: {'ok': True, 'echo': request}
+        self.server = daemon.start(self.service, self.path)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def test_request_round_trip(self):
+        """Test a request reaches the service and the reply comes back"""
+        self.assertTrue(daemon.is_running(self.path))
+
+        start = time.monotonic()
+        reply = daemon.request({'op': 'send', 'key': 'KEY_MUTE'}, self.path)
+
+        self.assertEqual(reply, {'ok': True, 'echo': {'op': 'send', 'key': 'KEY_MUTE'}})
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_several_requests_per_connection(self):
+        """Test one connection can carry several requests, including bad ones"""
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(2)
+        sock.connect(self.path)
+        try:
+            sock.sendall(b'{"op": "ping"}\nnot json\n[1]\n')
+            with sock.makefile('rb') as replies:
+                self.assertTrue(json.loads(replies.readline())['ok'])
+                self.assertIn('invalid JSON', json.loads(replies.readline())['error'])
+                self.assertFalse(json.loads(replies.readline())['ok'])
+        finally:
+            sock.close()
+
+    def test_second_daemon_refused(self):
+        """Test a live socket is not taken over by another daemon"""
+        with self.assertRaises(RuntimeError):
+            daemon.start(self.service, self.path)
+
+
+class TestHTTPAPI(unittest.TestCase):
+    """Test cases for the embedded HTTP/JSON API"""
+
+    def setUp(self):
+        import http.client
+        self.service = MagicMock()
+        self.service.handle.return_value = {'ok': True}
+        self.server = httpapi.start(self.service, ('127.0.0.1', 0))
+        self.connection = http.client.HTTPConnection('127.0.0.1', self.server.server_address[1], timeout=2)
+
+    def tearDown(self):
+        self.connection.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _call(self, method, path, body=None):
+        self.connection.request(method, path, body=body, headers={'Content-Type': 'application/json'})
+        response = self.connection.getresponse()
+        return response.status, json.loads(response.read())
+
+    def test_requests_dispatched_over_one_connection(self):
+        """Test endpoints map to service operations on a keep-alive connection"""
+        status, reply = self._call('POST', '/send', json.dumps({'key': 'KEY_MUTE', 'host': '192.168.1.100'}))
+        self.assertEqual((status, reply), (200, {'ok': True}))
+        sock = self.connection.sock
+
+        self._call('POST', '/batch', json.dumps({'commands': [{'keys': ['KEY_UP']}]}))
+        self._call('GET', '/tvs')
+
+        self.assertIs(self.connection.sock, sock)
+        requests = [call[0][0] for call in self.service.handle.call_args_list]
+        self.assertEqual(requests[0], {'key': 'KEY_MUTE', 'host': '192.168.1.100', 'op': 'send'})
+        self.assertEqual(requests[1]['op'], 'batch')
+        self.assertEqual(requests[2], {'op': 'tvs'})
+
+    def test_metrics_endpoint(self):
+        """Test GET /metrics serves the Prometheus text format"""
+        self.connection.request('GET', '/metrics')
+        response = self.connection.getresponse()
+        body = response.read().decode('utf-8')
+
+        self.assertEqual(response.status, 200)
+        self.assertTrue(response.getheader('Content-Type').startswith('text/plain; version=0.0.4'))
+        self.assertIn('# TYPE samsung_remote_sends_total counter', body)
+        self.service.handle.assert_not_called()
+
+    def test_error_statuses(self):
+        """Test unknown endpoints, bad bodies and TV failures map to HTTP statuses"""
+        self.assertEqual(self._call('POST', '/nope', '{}')[0], 404)
+        self.assertEqual(self._call('GET', '/send')[0], 405)
+        self.assertEqual(self._call('POST', '/send', 'not json')[0], 400)
+        self.assertEqual(self._call('POST', '/send', '[1, 2]')[0], 400)
+
+        self.service.handle.return_value = {'ok': False, 'error': 'failed to send KEY_MUTE'}
+        status, reply = self._call('POST', '/send', '{"key": "KEY_MUTE"}')
+        self.assertEqual(status, 502)
+        self.assertEqual(reply['error'], 'failed to send KEY_MUTE')
+
+        self.service.handle.return_value = {'ok': False, 'error': "missing argument 'key'", 'invalid': True}
+        self.assertEqual(self._call('POST', '/send', '{}')[0], 400)
+
+    def test_macro_limited_to_macro_dir(self):
+        """Test /macro files are resolved inside the macro directory"""
+        import http.client
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        server = httpapi.start(self.service, ('127.0.0.1', 0), macro_dir=tmp.name)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.connection = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=2)
+
+        self.assertEqual(self._call('POST', '/macro', '{"file": "../../etc/passwd"}')[0], 403)
+        self.assertEqual(self._call('POST', '/macro', '{"file": "/etc/passwd"}')[0], 403)
+        self.assertEqual(self._call('POST', '/macro', '{"file": "lobby.csv"}')[0], 200)
+
+        self.service.handle.assert_called_once()
+        expected = os.path.join(os.path.realpath(tmp.name), 'lobby.csv')
+        self.assertEqual(self.service.handle.call_args[0][0]['file'], expected)
+
+    def test_macro_refused_without_macro_dir(self):
+        """Test /macro is refused without a macro directory, even on loopback"""
+        self.assertEqual(self._call('POST', '/macro', '{"file": "/tmp/macro.csv"}')[0], 403)
+        self.assertEqual(self._call('POST', '/macro', '{}')[0], 403)
+        self.service.handle.assert_not_called()
+
+    def test_post_requires_json_and_matching_host(self):
+        """Test POSTs without a JSON Content-Type or with a foreign Host are refused"""
+        port = self.server.server_address[1]
+        for headers, status in (({}, 415),
+                                ({'Content-Type': 'text/plain'}, 415),
+                                ({'Content-Type': 'application/json', 'Host': f'evil.example:{port}'}, 403),
+                                ({'Content-Type': 'application/json', 'Host': '127.0.0.1:1'}, 403),
+                                ({'Content-Type': 'application/json; charset=utf-8',
+                                  'Host': f'localhost:{port}'}, 200)):
+            with self.subTest(headers=headers):
+                self.connection.request('POST', '/send', body='{"key": "KEY_MUTE"}', headers=headers)
+                response = self.connection.getresponse()
+                response.read()
+                self.assertEqual(response.status, status)
+        self.service.handle.assert_called_once()
+
+    def test_host_allowed(self):
+        """Test Host headers are matched against the bound address"""
+        self.assertTrue(httpapi.is_loopback('localhost'))
+        self.assertFalse(httpapi.is_loopback('0.0.0.0'))
+        self.assertTrue(httpapi.host_allowed('127.0.0.1:80', ('127.0.0.1', 80)))
+        self.assertTrue(httpapi.host_allowed('localhost:80', ('127.0.0.1', 80)))
+        self.assertTrue(httpapi.host_allowed('[::1]:80', ('::1', 80)))
+        self.assertTrue(httpapi.host_allowed('192.168.1.10:80', ('0.0.0.0', 80)))
+        self.assertFalse(httpapi.host_allowed('tv.example:80', ('0.0.0.0', 80)))
+        self.assertFalse(httpapi.host_allowed('localhost:80', ('192.168.1.10', 80)))
+        self.assertFalse(httpapi.host_allowed('192.168.1.11:80', ('192.168.1.10', 80)))
+        self.assertFalse(httpapi.host_allowed('127.0.0.1', ('127.0.0.1', 8765)))
+        self.assertFalse(httpapi.host_allowed(None, ('127.0.0.1', 80)))
+
+    def test_parse_address(self):
+        """Test [HOST:]PORT parsing for --http"""
+        self.assertEqual(httpapi.parse_address('8080'), ('127.0.0.1', 8080))
+        self.assertEqual(httpapi.parse_address('0.0.0.0:80'), ('0.0.0.0', 80))
+        with self.assertRaises(ValueError):
+            httpapi.parse_address('70000')
+
+
+@unittest.skipUnless(hasattr(socket, 'AF_UNIX'), 'requires Unix domain sockets')
+class TestClient(unittest.TestCase):
+    """Test cases for forwarding CLI commands to the daemon"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'daemon.sock')
+        self.service = MagicMock()
+        self.service.handle.return_value = {'ok': True}
+        self.server = daemon.start(self.service, self.path)
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.tmp.cleanup()
+
+    def _forward(self, *argv):
+        with patch('sys.stdout', new_callable=io.StringIO) as stdout:
+            status = client.forward(list(argv) + ['--socket', self.path])
+        return status, stdout.getvalue()
+
+    def test_key_and_macro_forwarded(self):
+        """Test -i/-k/-m become send and macro requests on one connection"""
+        status, _ = self._forward('-i', '192.168.1.100', '-k', 'KEY_MUTE', '-m', 'macro.csv')
+
+        self.assertEqual(status, 0)
+        requests = [call[0][0] for call in self.service.handle.call_args_list]
+        self.assertEqual(requests[0], {'op': 'ping'})
+        self.assertEqual(requests[1], {'host': '192.168.1.100', 'method': 'websocket',
+                                       'op': 'send', 'key': 'KEY_MUTE'})
+        self.assertEqual(requests[2]['op'], 'macro')
+        self.assertEqual(requests[2]['file'], os.path.abspath('macro.csv'))
+
+    def test_scan_output_and_failure_status(self):
+        """Test scan results are printed and failed requests exit with 1"""
+        self.service.handle.return_value = {
+            'ok': True, 'tvs': [{'fn': 'Living Room TV', 'model': 'UN55F8000', 'ip': '192.168.1.100'}]
+        }
+        status, output = self._forward('-s')
+        self.assertEqual(status, 0)
+        self.assertIn('Living Room TV (UN55F8000) at 192.168.1.100', output)
+
+        self.service.handle.return_value = {'ok': False, 'error': 'No Samsung TV found'}
+        with patch('sys.stderr', new_callable=io.StringIO):
+            status, _ = self._forward('-a', '-k', 'KEY_MUTE')
+        self.assertEqual(status, 1)
+
+    def test_runs_in_process_when_not_forwardable(self):
+        """Test local-only options, bad arguments and a missing daemon fall back"""
+        for argv in (['--lint', 'macros'], ['-a', '-k', 'KEY_MUTE', '--no-cache'], ['-k'], ['-h'], [],
+                     ['-k', 'KEY_MUTE'], ['-m', 'macro.csv']):
+            with self.subTest(argv=argv):
+                self.assertIsNone(client.forward(argv + ['--socket', self.path]))
+        self.service.handle.assert_not_called()
+
+        missing = os.path.join(self.tmp.name, 'missing.sock')
+        self.assertIsNone(client.forward(['-a', '-k', 'KEY_MUTE', '--socket', missing]))
+
+    def test_runs_in_process_when_daemon_does_not_answer(self):
+        """Test a daemon that accepts but never replies does not hang the CLI"""
+        wedged_path = os.path.join(self.tmp.name, 'wedged.sock')
+        wedged = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.addCleanup(wedged.close)
+        wedged.bind(wedged_path)
+        wedged.listen(1)
+
+        with patch('helpers.client.PING_TIMEOUT', 0.1):
+            start = time.monotonic()
+            self.assertIsNone(client.forward(['-a', '-k', 'KEY_MUTE', '--socket', wedged_path]))
+        self.assertLess(time.monotonic() - start, 2)
+
+
 class TestSamsungRemote(unittest.TestCase):
     """Test cases for main samsung_remote module"""
 
     def test_get_tv_info_success(self):
         """Test get_tv_info function with successful TV info retrieval"""
-        tvs_found = [MagicMock()]
-        tvs_found[0].location = 'http://192.168.1.100:8001/ms/1.0/'
+        tvs_found = [ssdp.SSDPResponse('http://192.168.1.100:8001/ms/1.0/', 'uuid:1', ssdp_custom.SAMSUNG_ST)]
         
         with patch('samsung_remote.tvinfo.get') as mock_get:
             mock_get.return_value = {
@@ -576,8 +2305,7 @@ class TestSamsungRemote(unittest.TestCase):
 
     def test_get_tv_info_with_exception(self):
         """Test get_tv_info function when TV info retrieval fails"""
-        tvs_found = [MagicMock()]
-        tvs_found[0].location = 'http://192.168.1.100:8001/ms/1.0/'
+        tvs_found = [ssdp.SSDPResponse('http://192.168.1.100:8001/ms/1.0/', 'uuid:1', ssdp_custom.SAMSUNG_ST)]
         
         with patch('samsung_remote.tvinfo.get') as mock_get:
             mock_get.side_effect = Exception("Connection failed")
@@ -621,33 +2349,41 @@ class TestSamsungRemote(unittest.TestCase):
         expected = "Living Room TV (UN55F8000) at 192.168.1.100"
         self.assertEqual(str(tv_info), expected)
 
+    def _setup_logging(self, quiet):
+        fd, log_file = tempfile.mkstemp(suffix='.log')
+        os.close(fd)
+        self.addCleanup(os.unlink, log_file)
+        self.addCleanup(logqueue.stop)
+        return setup_logging(quiet=quiet, log_file=log_file) or logqueue._listener, log_file
+
     def test_setup_logging_quiet_mode(self):
         """Test setup_logging function in quiet mode"""
-        with patch('samsung_remote.logging.basicConfig') as mock_basic_config:
-            with patch('samsung_remote.logging.getLogger') as mock_get_logger:
-                mock_root = MagicMock()
-                mock_get_logger.return_value = mock_root
-                
-                setup_logging(quiet=True)
-                
-                mock_basic_config.assert_called_once()
-                # Should not add console handler in quiet mode
-                mock_root.addHandler.assert_not_called()
+        listener, log_file = self._setup_logging(quiet=True)
+
+        # Should not add console handler in quiet mode
+        self.assertEqual([type(h) for h in listener.handlers], [logging.FileHandler])
+        self.assertIn(logqueue._handler, logging.getLogger().handlers)
+
+        logging.getLogger('test').debug('queued %s', 'message')
+        logqueue.stop()
+        with open(log_file) as f:
+            self.assertIn('queued message', f.read())
 
     def test_setup_logging_verbose_mode(self):
         """Test setup_logging function in verbose mode"""
-        with patch('samsung_remote.logging.basicConfig') as mock_basic_config:
-            with patch('samsung_remote.logging.getLogger') as mock_get_logger:
-                with patch('samsung_remote.logging.StreamHandler') as mock_stream_handler:
-                    mock_root = MagicMock()
-                    mock_get_logger.return_value = mock_root
-                    mock_handler = MagicMock()
-                    mock_stream_handler.return_value = mock_handler
-                    
-                    setup_logging(quiet=False)
-                    
-                    mock_basic_config.assert_called_once()
-                    mock_root.addHandler.assert_called_once_with(mock_handler)
+        listener, _ = self._setup_logging(quiet=False)
+
+        console_handler = listener.handlers[1]
+        self.assertIs(console_handler.stream, sys.stdout)
+        self.assertEqual(console_handler.level, logging.INFO)
+
+    def test_setup_logging_replaces_pipeline(self):
+        """Test calling setup_logging again does not stack queue handlers"""
+        self._setup_logging(quiet=True)
+        self._setup_logging(quiet=True)
+
+        queued = [h for h in logging.getLogger().handlers if isinstance(h, logging.handlers.QueueHandler)]
+        self.assertEqual(len(queued), 1)
 
     def test_error_handler_context_manager(self):
         """Test error_handler context manager"""
@@ -693,6 +2429,15 @@ class TestSamsungRemote(unittest.TestCase):
         mock_args.key = None
         mock_args.power_off_all = False
         mock_args.macro = None
+        mock_args.lint = None
+        mock_args.sweep = None
+        mock_args.daemon = False
+        mock_args.http = None
+        mock_args.trace = False
+        mock_args.profile = None
+        mock_args.group = None
+        mock_args.all = False
+        mock_args.stdin = False
         mock_args.quiet = False
         mock_parse_args.return_value = mock_args
         
@@ -725,6 +2470,16 @@ class TestSamsungRemote(unittest.TestCase):
         mock_args.key = None
         mock_args.power_off_all = False
         mock_args.macro = None
+        mock_args.lint = None
+        mock_args.sweep = None
+        mock_args.daemon = False
+        mock_args.http = None
+        mock_args.trace = False
+        mock_args.profile = None
+        mock_args.group = None
+        mock_args.all = False
+        mock_args.stdin = False
+        mock_args.no_cache = True
         mock_args.quiet = False
         mock_parse_args.return_value = mock_args
         
@@ -737,7 +2492,7 @@ class TestSamsungRemote(unittest.TestCase):
             # scan_network is called with wait=1 for scan operation
             mock_scan_network.assert_any_call(wait=1)
             # get_tv_info is called with verbose=True for scan operation
-            mock_get_tv_info.assert_any_call([mock_tv], True)
+            mock_get_tv_info.assert_any_call([mock_tv], True, cache=None)
             mock_exit.assert_called_once_with(0)
 
     @patch('samsung_remote.sys.argv', ['samsung_remote.py', '-i', '192.168.1.100', '-k', 'KEY_POWER'])
@@ -751,9 +2506,11 @@ class TestSamsungRemote(unittest.TestCase):
     @patch('samsung_remote.ssdp.scan_network')
     @patch('samsung_remote.get_tv_info')
     @patch('samsung_remote.tvcon.send')
-    def test_main_power_off_all(self, mock_send, mock_get_tv_info, mock_scan_network):
+    @patch('samsung_remote.capability.detect')
+    def test_main_power_off_all(self, mock_detect, mock_send, mock_get_tv_info, mock_scan_network):
         """Test main function with power off all TVs argument"""
         mock_scan_network.return_value = [MagicMock()]
+        mock_detect.return_value = 'legacy'
         mock_tv_info = TVInfo('Living Room TV', '192.168.1.100', 'UN55F8000')
         mock_get_tv_info.return_value = [mock_tv_info]
         mock_send.return_value = True
@@ -764,14 +2521,14 @@ class TestSamsungRemote(unittest.TestCase):
             mock_send.assert_called_once()
             mock_logging.assert_called_once()
 
-    @patch('samsung_remote.sys.argv', ['samsung_remote.py', '-a', '-k', 'KEY_VOLUP'])
-    @patch('samsung_remote.ssdp.scan_network')
+    @patch('samsung_remote.sys.argv', ['samsung_remote.py', '-a', '--no-cache', '-k', 'KEY_VOLUP'])
+    @patch('samsung_remote.ssdp.iter_scan_network')
     @patch('samsung_remote.get_tv_info')
     @patch('samsung_remote.tvcon.send')
-    @patch('samsung_remote.tvinfo.getMethod')
+    @patch('samsung_remote.capability.detect')
     def test_main_auto_mode(self, mock_get_method, mock_send, mock_get_tv_info, mock_scan_network):
         """Test main function with auto mode"""
-        mock_scan_network.return_value = [MagicMock()]
+        mock_scan_network.return_value = iter([MagicMock()])
         mock_tv_info = TVInfo('Living Room TV', '192.168.1.100', 'UN55F8000')
         mock_get_tv_info.return_value = [mock_tv_info]
         mock_get_method.return_value = 'websocket'
@@ -782,6 +2539,8 @@ class TestSamsungRemote(unittest.TestCase):
             
             mock_send.assert_called_once()
             mock_logging.assert_called_once()
+            mock_get_method.assert_called_once_with('192.168.1.100', 'UN55F8000', use_cache=False)
+            self.assertEqual(mock_send.call_args[0][0]['method'], 'websocket')
 
     @patch('samsung_remote.sys.argv', ['samsung_remote.py', '-m', 'test_macro.csv'])
     @patch('samsung_remote.ssdp.scan_network')